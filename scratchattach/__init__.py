@@ -1,5 +1,7 @@
 from .cloud.cloud import ScratchCloud, TwCloud, get_cloud, get_scratch_cloud, get_tw_cloud
 from .cloud._base import BaseCloud, AnyCloud
+from .cloud.async_cloud import AsyncCloud
+from .cloud.cloud_pool import CloudPool
 
 from .eventhandlers.cloud_server import init_cloud_server
 from .eventhandlers._base import BaseEventHandler
@@ -8,7 +10,7 @@ from .eventhandlers.cloud_storage import Database
 from .eventhandlers.combine import MultiEventHandler
 
 from .other.other_apis import *
-from .other.project_json_capabilities import ProjectBody, get_empty_project_pb, get_pb_from_dict, read_sb3_file, download_asset
+from .other.project_json_capabilities import ProjectBody, get_empty_project_pb, get_pb_from_dict, read_sb3_file, download_asset, write_sb3
 from .utils.encoder import Encoding
 from .utils.enums import Languages, TTSVoices
 from .utils.exceptions import LoginDataWarning
@@ -18,11 +20,11 @@ from .site.backpack_asset import BackpackAsset
 from .site.comment import Comment
 from .site.cloud_activity import CloudActivity
 from .site.forum import ForumPost, ForumTopic, get_topic, get_topic_list, youtube_link_to_scratch
-from .site.project import Project, get_project, search_projects, explore_projects
+from .site.project import Project, get_project, get_projects, async_get_project, search_projects, explore_projects, download_sb3s
 from .site.session import Session, login, login_by_id, login_by_session_string, login_by_io, login_by_file, login_from_browser
-from .site.studio import Studio, get_studio, search_studios, explore_studios
+from .site.studio import Studio, get_studio, get_studios, async_get_studio, search_studios, explore_studios
 from .site.classroom import Classroom, get_classroom
-from .site.user import User, get_user
+from .site.user import User, get_user, get_users, async_get_user
 from .site._base import BaseSiteComponent
 from .site.browser_cookies import Browser, ANY, FIREFOX, CHROME, CHROMIUM, VIVALDI, EDGE, EDGE_DEV, SAFARI
 
@@ -1,11 +1,14 @@
 from __future__ import annotations
 
+import inspect
 import json
 import ssl
 import time
+from queue import Queue, Empty, Full
 from typing import Optional, Union, TypeVar, Generic, TYPE_CHECKING, Any
 from abc import ABC, abstractmethod, ABCMeta
-from threading import Lock
+from threading import Lock, Condition, Thread
+from concurrent.futures import Future, InvalidStateError, wait as wait_for_futures
 from collections.abc import Iterator
 
 if TYPE_CHECKING:
@@ -27,6 +30,8 @@ import websocket
 from ..site import session
 from ..eventhandlers import cloud_recorder
 from ..utils import exceptions
+from ..utils.retry import RetryPolicy
+from ..utils.ratelimit import CloudRateLimiter
 from ..eventhandlers.cloud_requests import CloudRequests
 from ..eventhandlers.cloud_events import CloudEvents
 from ..eventhandlers.cloud_storage import CloudStorage
@@ -44,7 +49,6 @@ class AnyCloud(ABC, Generic[T]):
     Represents a cloud that is not necessarily using a websocket.
     """
     active_connection: bool
-    var_stets_since_first: int
     _session: Optional[session.Session]
     
     @abstractmethod
@@ -108,57 +112,184 @@ class AnyCloud(ABC, Generic[T]):
     def create_event_stream(self) -> EventStream:
         pass
 
-class WebSocketEventStream(EventStream):
-    packets_left: list[Union[str, bytes]]
-    source_cloud: BaseCloud
-    reading: Lock
-    def __init__(self, cloud: BaseCloud):
-        super().__init__()
-        self.source_cloud = type(cloud)(project_id=cloud.project_id)
-        self.source_cloud._session = cloud._session
-        self.source_cloud.cookie = cloud.cookie
-        self.source_cloud.header = cloud.header
-        self.source_cloud.origin = cloud.origin
-        self.source_cloud.username = cloud.username
-        self.source_cloud.ws_timeout = None # No timeout -> allows continous listening
-        self.reading = Lock()
-        self.source_cloud.connect()
-        self.packets_left = []
-
-    def receive_new(self, non_blocking: bool = False):
-        if non_blocking:
-            self.source_cloud.websocket.settimeout(0)
+class CloudEventHub:
+    """
+    Owns a single receiving connection to the server of a cloud and hands the received activity to any number of
+    subscribers. cloud.create_event_stream() subscribes to the hub of the cloud, so CloudEvents, CloudRecorder
+    (used by get_var) and CloudRequests of the same cloud share one connection, and every message is parsed only once.
+
+    Every subscriber has its own bounded queue. If a subscriber doesn't keep up, its oldest unread activity is dropped
+    (counted in its .dropped attribute), without slowing down the other subscribers.
+
+    The connection is opened with the first subscription and closed when the last subscription is closed.
+    Lost connections are re-established with the backoff of reconnect_policy, and the subscribers are told about it
+    (see HubSubscription.read).
+    """
+
+    def __init__(self, cloud: BaseCloud, *, queue_size: int = 1000, reconnect_policy: Optional[RetryPolicy] = None):
+        self.cloud = cloud
+        self.queue_size = queue_size
+        if reconnect_policy is None:
+            reconnect_policy = RetryPolicy(base_delay=0.5, multiplier=2, max_delay=30)
+        self.reconnect_policy = reconnect_policy
+        self.subscriptions: list[HubSubscription] = []
+        self._lock = Lock()
+        self._thread: Optional[Thread] = None
+        self._source_cloud: Optional[BaseCloud] = None
+
+    def subscribe(self, *, queue_size: Optional[int] = None) -> HubSubscription:
+        """
+        Returns a new event stream that receives all activity of the cloud from now on.
+
+        Keyword Arguments:
+            queue_size (int): Max. amount of unread activity that is kept for this subscriber. Defaults to the queue_size of the hub.
+        """
+        subscription = HubSubscription(self, self.queue_size if queue_size is None else queue_size)
+        with self._lock:
+            if self._thread is None:
+                source_cloud = self._clone_cloud()
+                # Connect before returning, so the subscriber doesn't miss activity that happens right after.
+                # If connecting fails, nothing is registered.
+                source_cloud.connect()
+                self._source_cloud = source_cloud
+                self.subscriptions.append(subscription)
+                self._thread = Thread(target=self._receive, args=(source_cloud,),
+                                      name=f"cloud event hub {self.cloud.project_id}", daemon=True)
+                self._thread.start()
+            else:
+                self.subscriptions.append(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription: HubSubscription):
+        with self._lock:
+            if subscription in self.subscriptions:
+                self.subscriptions.remove(subscription)
+            if self.subscriptions or self._thread is None:
+                return
+            source_cloud, self._source_cloud, self._thread = self._source_cloud, None, None
+        source_cloud.disconnect()
+
+    def close(self):
+        """
+        Closes all subscriptions and the connection.
+        """
+        for subscription in list(self.subscriptions):
+            subscription.close()
+
+    def _clone_cloud(self) -> BaseCloud:
+        # A separate connection of the same cloud, so receiving never blocks sending. Only the connection settings
+        # are copied, the clone gets its own websocket, write-behind queue and ratelimiter
+        cloud = self.cloud
+        cloud_type = type(cloud)
+        if "cloud_host" in inspect.signature(cloud_type).parameters:
+            source_cloud = cloud_type(project_id=cloud.project_id, cloud_host=cloud.cloud_host)
+        else:
+            source_cloud = cloud_type(project_id=cloud.project_id)
+        source_cloud._session = cloud._session
+        source_cloud.cloud_host = cloud.cloud_host
+        source_cloud.cookie = cloud.cookie
+        source_cloud.header = cloud.header
+        source_cloud.origin = cloud.origin
+        source_cloud.username = cloud.username
+        source_cloud.print_connect_message = cloud.print_connect_message
+        source_cloud.ws_timeout = None  # No timeout -> allows continous listening
+        return source_cloud
+
+    def _receive(self, source_cloud: BaseCloud):
+        failures = 0
+        while self._source_cloud is source_cloud:
             try:
-                received = self.source_cloud.websocket.recv().splitlines()
-                self.packets_left.extend(received)
+                if not source_cloud.active_connection:
+                    source_cloud.connect()
+                    if failures:
+                        for subscription in list(self.subscriptions):
+                            subscription._put(_reconnected)
+                data = source_cloud.websocket.recv()
+                failures = 0
             except Exception:
-                pass
-            return
-        self.source_cloud.websocket.settimeout(None)
-        received = self.source_cloud.websocket.recv().splitlines()
-        self.packets_left.extend(received)
-    
+                if self._source_cloud is not source_cloud:
+                    return
+                source_cloud.active_connection = False
+                failures += 1
+                time.sleep(self.reconnect_policy.delay(failures))
+                continue
+            if isinstance(data, bytes):
+                data = data.decode("utf-8", errors="replace")
+            subscriptions = list(self.subscriptions)
+            for line in data.splitlines():
+                try:
+                    activity = json.loads(line)
+                except ValueError:
+                    continue
+                for subscription in subscriptions:
+                    # Every subscriber gets its own copy, because the event handlers modify the dicts
+                    subscription._put(dict(activity))
+
+# Put into the queues of the subscribers after the connection of a hub was re-established
+_reconnected: dict[str, Any] = {}
+
+
+class HubSubscription(EventStream):
+    """
+    An event stream of a CloudEventHub with its own bounded queue.
+
+    Attributes:
+        dropped: The amount of activity that was dropped because the queue was full
+    """
+    read_timeout: float = 1
+
+    def __init__(self, hub: CloudEventHub, queue_size: int):
+        super().__init__()
+        self.hub = hub
+        self.dropped = 0
+        self.closed = False
+        self._queue: Queue[dict[str, Any]] = Queue(maxsize=queue_size)
+
+    def _put(self, activity: dict[str, Any]):
+        while True:
+            try:
+                self._queue.put_nowait(activity)
+                return
+            except Full:
+                try:
+                    self._queue.get_nowait()
+                    self.dropped += 1
+                except Empty:
+                    pass
+
     def read(self, amount: int = -1) -> Iterator[dict[str, Any]]:
-        i = 0
-        with self.reading:
+        """
+        With amount=-1, waits (up to read_timeout seconds) until activity is available and then yields all activity
+        that is queued. Otherwise, yields exactly amount activities, waiting for them as long as needed.
+
+        Raises CloudConnectionError once the activity received before a lost connection was re-established has been
+        read (activity may have been missed in between), like the event streams of a single connection do.
+        """
+        if amount != -1:
+            for _ in range(amount):
+                yield self._check(self._queue.get())
+            return
+        try:
+            yield self._check(self._queue.get(timeout=self.read_timeout))
+        except Empty:
+            return
+        while True:
             try:
-                self.receive_new(True)
-                while (self.packets_left and amount == -1) or (amount != -1 and i < amount):
-                    if not self.packets_left and amount != -1:
-                        self.receive_new()
-                    yield json.loads(self.packets_left.pop(0))
-                    i += 1
-            except Exception:
-                self.source_cloud.reconnect()
-                self.receive_new(True)
-                while (self.packets_left and amount == -1) or (amount != -1 and i < amount):
-                    if not self.packets_left and amount != -1:
-                        self.receive_new()
-                    yield json.loads(self.packets_left.pop(0))
-                    i += 1
-    
+                activity = self._queue.get_nowait()
+            except Empty:
+                return
+            yield self._check(activity)
+
+    @staticmethod
+    def _check(activity: dict[str, Any]) -> dict[str, Any]:
+        if activity is _reconnected:
+            raise exceptions.CloudConnectionError("The connection to the cloud server was lost and re-established")
+        return activity
+
     def close(self) -> None:
-        self.source_cloud.disconnect()
+        if not self.closed:
+            self.closed = True
+            self.hub._unsubscribe(self)
 
 class BaseCloud(AnyCloud[Union[str, int]]):
     """
@@ -194,6 +325,16 @@ class BaseCloud(AnyCloud[Union[str, int]]):
         origin: The origin to send. Defaults to None
 
         print_connect_messages: Whether to print a message on every connect to the cloud server. Defaults to False.
+
+        send_retry_policy: The scratchattach.utils.retry.RetryPolicy that decides how often and after which delays
+        failed sends are retried (the connection is renewed before every retry).
+
+        ratelimiter: The scratchattach.utils.ratelimit.CloudRateLimiter that schedules the variable sets. Defaults to
+        a limiter created from ws_shortterm_ratelimit and ws_longterm_ratelimit on the first set. Assign the same
+        limiter to several clouds to limit their sets together.
+
+        write_behind_batch_size: Max. amount of variables the background writer of queue_var sends in one frame.
+        Defaults to 10.
     """
     project_id: Optional[Union[str, int]]
     cloud_host: str
@@ -207,8 +348,11 @@ class BaseCloud(AnyCloud[Union[str, int]]):
     origin: Optional[str]
     print_connect_message: bool
     ws_timeout: Optional[int]
+    send_retry_policy: RetryPolicy
+    ratelimiter: Optional[CloudRateLimiter]
     websocket: websocket.WebSocket
     event_stream: Optional[EventStream] = None
+    event_hub: Optional[CloudEventHub] = None
 
     def __init__(self, *, project_id: Optional[Union[int, str]] = None, _session=None):
 
@@ -219,9 +363,7 @@ class BaseCloud(AnyCloud[Union[str, int]]):
         self.websocket = websocket.WebSocket(sslopt={"cert_reqs": ssl.CERT_NONE})
         self.recorder = None  # A CloudRecorder object that records cloud activity for the values to be retrieved later,
         # which will be saved in this attribute as soon as .get_var is called
-        self.first_var_set = 0
-        self.last_var_set = 0
-        self.var_stets_since_first = 0
+        self.last_var_set = 0  # Time of the last variable set (CloudRequests reconnects connections that were idle)
 
         # Set default values for attributes that save configurations specific to the represented cloud:
         # (These attributes can be specifically in the constructors of classes inheriting from this base class)
@@ -236,65 +378,51 @@ class BaseCloud(AnyCloud[Union[str, int]]):
         self.cookie = None
         self.origin = None
         self.print_connect_message = False
+        self.ratelimiter = None
+        self.write_behind_batch_size = 10
+        self.send_retry_policy = RetryPolicy(max_attempts=4, base_delay=0.2, multiplier=4, max_delay=3,
+                                             max_elapsed=10, retry_on=(Exception,),
+                                             giveup_on=(exceptions.Unauthenticated,))
         
         self.project_id = project_id
 
+        # Write-behind queue of queue_var: variable name -> (latest packet, futures of the callers waiting for it)
+        self._pending_sets: dict[str, tuple[dict, list[Future]]] = {}
+        self._pending_condition = Condition()
+        self._writer: Optional[Thread] = None
+
     def _assert_auth(self):
         if self._session is None:
             raise exceptions.Unauthenticated(
                 "You need to use session.connect_cloud (NOT get_cloud) in order to perform this operation.")
 
+    def _send(self, data: str):
+        # Sends data, renewing the connection before every retry
+        reconnect = False
+
+        def send():
+            nonlocal reconnect
+            if reconnect:
+                self.connect()
+            reconnect = True
+            self.websocket.send(data)
+
+        self.send_retry_policy.call(send)
+
     def _send_packet(self, packet):
         try:
-            self.websocket.send(json.dumps(packet) + "\n")
+            self._send(json.dumps(packet) + "\n")
         except Exception:
-            time.sleep(0.1)
-            self.connect()
-            time.sleep(0.1)
-            try:
-                self.websocket.send(json.dumps(packet) + "\n")
-            except Exception:
-                time.sleep(0.2)
-                self.connect()
-                time.sleep(0.2)
-                try:
-                    self.websocket.send(json.dumps(packet) + "\n")
-                except Exception:
-                    time.sleep(1.6)
-                    self.connect()
-                    time.sleep(1.4)
-                    try:
-                        self.websocket.send(json.dumps(packet) + "\n")
-                    except Exception:
-                        self.active_connection = False
-                        raise exceptions.CloudConnectionError(f"Sending packet failed three times in a row: {packet}")
+            self.active_connection = False
+            raise exceptions.CloudConnectionError(f"Sending packet failed: {packet}")
 
     def _send_packet_list(self, packet_list):
         packet_string = "".join([json.dumps(packet) + "\n" for packet in packet_list])
         try:
-            self.websocket.send(packet_string)
+            self._send(packet_string)
         except Exception:
-            time.sleep(0.1)
-            self.connect()
-            time.sleep(0.1)
-            try:
-                self.websocket.send(packet_string)
-            except Exception:
-                time.sleep(0.2)
-                self.connect()
-                time.sleep(0.2)
-                try:
-                    self.websocket.send(packet_string)
-                except Exception:
-                    time.sleep(1.6)
-                    self.connect()
-                    time.sleep(1.4)
-                    try:
-                        self.websocket.send(packet_string)
-                    except Exception:
-                        self.active_connection = False
-                        raise exceptions.CloudConnectionError(
-                            f"Sending packet list failed four times in a row: {packet_list}")
+            self.active_connection = False
+            raise exceptions.CloudConnectionError(f"Sending packet list failed: {packet_list}")
 
     def _handshake(self):
         packet = {"method": "handshake", "user": self.username, "project_id": self.project_id}
@@ -316,6 +444,16 @@ class BaseCloud(AnyCloud[Union[str, int]]):
             print("Connected to cloud server ", self.cloud_host)
 
     def disconnect(self):
+        self._close_connection()
+        if self.event_hub is not None:
+            self.event_hub.close()
+
+    def reconnect(self):
+        # Only renews the sending connection, the subscriptions of the event hub stay open
+        self._close_connection()
+        self.connect()
+
+    def _close_connection(self):
         self.active_connection = False
         if self.recorder is not None:
             self.recorder.stop()
@@ -341,18 +479,29 @@ class BaseCloud(AnyCloud[Union[str, int]]):
                         "Value not numeric"
                     ))
 
+    def _get_ratelimiter(self) -> CloudRateLimiter:
+        # The limiter is created on first use, because the rate limits are configured after BaseCloud.__init__
+        if self.ratelimiter is None:
+            self.ratelimiter = CloudRateLimiter(self.ws_shortterm_ratelimit, self.ws_longterm_ratelimit)
+        return self.ratelimiter
+
     def _enforce_ratelimit(self, *, n):
-        # n is the amount of variables being set
-        if (time.time() - self.first_var_set) / (
-                self.var_stets_since_first + 1) > self.ws_longterm_ratelimit:  # if the average delay between cloud variable sets has been bigger than the long-term rate-limit, cloud variables can be set fast (wait time smaller than long-term rate limit) again
-            self.var_stets_since_first = 0
-            self.first_var_set = time.time()
-
-        wait_time = self.ws_shortterm_ratelimit * n
-        if time.time() - self.first_var_set > 25:  # if cloud variables have been continously set fast (wait time smaller than long-term rate limit) for 25 seconds, they should be set slow now (wait time = long-term rate limit) to avoid getting rate-limited
-            wait_time = self.ws_longterm_ratelimit * n
-        while self.last_var_set + wait_time >= time.time():
-            time.sleep(0.001)
+        # n is the amount of variables being set. Sleeps until the rate limiter allows the sets
+        self._get_ratelimiter().acquire(n)
+
+    def _set_packet(self, variable, value) -> dict:
+        # Checks the variable and value and returns the packet that sets the variable
+        self._assert_valid_value(value)
+        if not isinstance(variable, str):
+            raise ValueError("cloud var name must be a string")
+        variable = variable.removeprefix("☁ ")
+        return {
+            "method": "set",
+            "name": "☁ " + variable,
+            "value": value,
+            "user": self.username,
+            "project_id": self.project_id,
+        }
 
     def set_var(self, variable, value):
         """
@@ -362,24 +511,19 @@ class BaseCloud(AnyCloud[Union[str, int]]):
             variable (str): The name of the cloud variable that should be set (provided without the cloud emoji)
             value (str): The value the cloud variable should be set to
         """
-        self._assert_valid_value(value)
-        if not isinstance(variable, str):
-            raise ValueError("cloud var name must be a string")
-        variable = variable.removeprefix("☁ ")
+        packet = self._set_packet(variable, value)
         if not self.active_connection:
             self.connect()
         self._enforce_ratelimit(n=1)
 
-        self.var_stets_since_first += 1
-
-        packet = {
-            "method": "set",
-            "name": "☁ " + variable,
-            "value": value,
-            "user": self.username,
-            "project_id": self.project_id,
-        }
-        self._send_packet(packet)
+        # A queued value of the variable would overwrite this newer one later
+        futures = self._discard_pending([packet["name"]])
+        try:
+            self._send_packet(packet)
+        except Exception as e:
+            self._resolve(futures, e)
+            raise
+        self._resolve(futures)
         self.last_var_set = time.time()
 
     def set_vars(self, var_value_dict, *, intelligent_waits=True):
@@ -396,27 +540,146 @@ class BaseCloud(AnyCloud[Union[str, int]]):
             self.connect()
         if intelligent_waits:
             self._enforce_ratelimit(n=len(list(var_value_dict.keys())))
+        else:
+            # The sets still count towards the rate limit of later sets
+            self._get_ratelimiter().reserve(len(var_value_dict))
 
-        self.var_stets_since_first += len(list(var_value_dict.keys()))
-
-        packet_list = []
-        for variable in var_value_dict:
-            value = var_value_dict[variable]
-            variable = variable.removeprefix("☁ ")
-            self._assert_valid_value(value)
-            if not isinstance(variable, str):
-                raise ValueError("cloud var name must be a string")
-            packet = {
-                "method": "set",
-                "name": "☁ " + variable,
-                "value": value,
-                "user": self.username,
-                "project_id": self.project_id,
-            }
-            packet_list.append(packet)
-        self._send_packet_list(packet_list)
+        packet_list = [self._set_packet(variable, value) for variable, value in var_value_dict.items()]
+        futures = self._discard_pending([packet["name"] for packet in packet_list])
+        try:
+            self._send_packet_list(packet_list)
+        except Exception as e:
+            self._resolve(futures, e)
+            raise
+        self._resolve(futures)
         self.last_var_set = time.time()
 
+    def queue_var(self, variable, value) -> Future:
+        """
+        Sets a cloud variable in the background (write-behind) and returns immediately.
+
+        If a variable is queued again before its previous value was sent, only the latest value is sent.
+        A background thread sends the queued variables in batches (of up to write_behind_batch_size variables per
+        frame) as fast as the rate limiter allows.
+
+        Args:
+            variable (str): The name of the cloud variable that should be set (provided without the cloud emoji)
+            value (str): The value the cloud variable should be set to
+
+        Returns:
+            concurrent.futures.Future: Resolves once the value (or a newer value of the variable) was sent. Fails with
+            a CloudConnectionError if sending failed. Use asyncio.wrap_future to await it in async code.
+        """
+        return self.queue_vars({variable: value})
+
+    def queue_vars(self, var_value_dict) -> Future:
+        """
+        Sets multiple cloud variables in the background (see queue_var).
+
+        Returns:
+            concurrent.futures.Future: Resolves once all values (or newer values of the variables) were sent
+        """
+        packets = [self._set_packet(variable, value) for variable, value in var_value_dict.items()]
+        future = Future()
+        futures = []
+        with self._pending_condition:
+            for packet in packets:
+                # Replacing the packet keeps the variable's position in the queue
+                _, waiting = self._pending_sets.get(packet["name"], (None, []))
+                variable_future = Future()
+                waiting.append(variable_future)
+                futures.append(variable_future)
+                self._pending_sets[packet["name"]] = (packet, waiting)
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = Thread(target=self._write_behind, name=f"cloud writer {self.project_id}", daemon=True)
+                self._writer.start()
+            self._pending_condition.notify_all()
+
+        def done(_):
+            if future.done() or not all(f.done() for f in futures):
+                return
+            errors = [f.exception() for f in futures if f.exception() is not None]
+            try:
+                if errors:
+                    future.set_exception(errors[0])
+                else:
+                    future.set_result(None)
+            except InvalidStateError:
+                # Resolved by the callback of another variable in the meantime
+                pass
+
+        for variable_future in futures:
+            variable_future.add_done_callback(done)
+        if not futures:
+            future.set_result(None)
+        return future
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until all variables that are currently queued (see queue_var) have been sent.
+
+        Returns:
+            bool: False if the timeout passed before, True otherwise
+        """
+        with self._pending_condition:
+            futures = [f for _, waiting in self._pending_sets.values() for f in waiting]
+        _, not_done = wait_for_futures(futures, timeout=timeout)
+        return not not_done
+
+    def pending_vars(self) -> dict:
+        """
+        Returns the queued variables that haven't been sent yet (name -> value).
+        """
+        with self._pending_condition:
+            return {name: packet["value"] for name, (packet, _) in self._pending_sets.items()}
+
+    def _discard_pending(self, names: list[str]) -> list[Future]:
+        with self._pending_condition:
+            futures = []
+            for name in names:
+                _, waiting = self._pending_sets.pop(name, (None, []))
+                futures += waiting
+            return futures
+
+    @staticmethod
+    def _resolve(futures: list[Future], error: Optional[BaseException] = None):
+        for future in futures:
+            if error is None:
+                future.set_result(None)
+            else:
+                future.set_exception(error)
+
+    def _write_behind(self):
+        # Background thread of queue_var: sends the queued variables in batches at the allowed rate
+        while True:
+            with self._pending_condition:
+                if not self._pending_sets:
+                    if not self._pending_condition.wait(timeout=5) and not self._pending_sets:
+                        # Stop when idle, queue_var starts a new writer when needed
+                        self._writer = None
+                        return
+                    continue
+                n = min(len(self._pending_sets), max(1, self.write_behind_batch_size))
+            # Values that are queued while waiting for the rate limiter still replace the pending ones
+            self._enforce_ratelimit(n=n)
+            with self._pending_condition:
+                names = list(self._pending_sets)[:n]
+                batch = [self._pending_sets.pop(name) for name in names]
+            if not batch:
+                continue
+            futures = [f for _, waiting in batch for f in waiting]
+            try:
+                if not self.active_connection:
+                    self.connect()
+                self._send_packet_list([packet for packet, _ in batch])
+                self.last_var_set = time.time()
+            except Exception as e:
+                if not isinstance(e, exceptions.CloudConnectionError):
+                    e = exceptions.CloudConnectionError(f"Sending queued variables failed: {e}")
+                self._resolve(futures, e)
+            else:
+                self._resolve(futures)
+
     def get_var(self, var, *, recorder_initial_values={}):
         var = "☁ "+var.removeprefix("☁ ")
         if self.recorder is None:
@@ -436,10 +699,25 @@ class BaseCloud(AnyCloud[Union[str, int]]):
                 time.sleep(0.01)
         return self.recorder.get_all_vars()
 
+    def as_async(self, **kwargs):
+        """
+        Returns an asyncio client for this cloud (see scratchattach.cloud.async_cloud.AsyncCloud). Requires aiohttp.
+        Keyword arguments are passed to the AsyncCloud constructor.
+        """
+        from .async_cloud import AsyncCloud
+        return AsyncCloud(self, **kwargs)
+
+    def _get_event_hub(self) -> CloudEventHub:
+        if self.event_hub is None:
+            self.event_hub = CloudEventHub(self)
+        return self.event_hub
+
     def create_event_stream(self):
-        if self.event_stream:
-            raise ValueError("Cloud already has an event stream.")
-        self.event_stream = WebSocketEventStream(self)
+        """
+        Returns a new event stream that receives the activity of this cloud. All event streams of a cloud
+        share one connection (see CloudEventHub).
+        """
+        self.event_stream = self._get_event_hub().subscribe()
         return self.event_stream
 
 class LogCloudMeta(ABCMeta):
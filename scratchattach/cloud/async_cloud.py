@@ -0,0 +1,271 @@
+"""AsyncCloud class: asyncio client for the cloud servers of ScratchCloud, TwCloud and CustomCloud. Requires aiohttp."""
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+import weakref
+from collections.abc import AsyncIterator
+from typing import Optional, Union
+
+from ._base import BaseCloud
+from ..site import cloud_activity
+from ..utils import exceptions
+from ..utils.async_requests import aiohttp, _assert_aiohttp
+from ..utils.retry import RetryPolicy
+
+# Websocket connections are kept open, so they get their own sessions without a connection limit
+# (the pooled sessions of AsyncRequests are limited to async_requests.limit connections)
+_ws_sessions: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aiohttp.ClientSession] = weakref.WeakKeyDictionary()
+
+
+def _get_ws_session() -> aiohttp.ClientSession:
+    _assert_aiohttp()
+    loop = asyncio.get_running_loop()
+    session = _ws_sessions.get(loop)
+    if session is None or session.closed:
+        session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0), cookie_jar=aiohttp.DummyCookieJar())
+        _ws_sessions[loop] = session
+    return session
+
+
+async def close():
+    """
+    Closes the websocket session of the running event loop. Open AsyncCloud connections are closed too.
+    """
+    session = _ws_sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None and not session.closed:
+        await session.close()
+
+
+class AsyncCloud:
+    """
+    Asynchronous version of a cloud object (ScratchCloud, TwCloud, CustomCloud or any other class inheriting from
+    BaseCloud). Uses the host, login, value checks and rate limiter of the given cloud, but sends and receives with an
+    asyncio websocket connection, so many clouds can be handled on one event loop without any threads.
+
+    .. code-block:: python
+
+        async with session.connect_cloud(project_id).as_async() as cloud:
+            await cloud.set_var("score", 10)
+            async for activity in cloud:
+                print(activity.var, activity.value)
+
+    Args:
+        cloud (BaseCloud): The cloud to connect to
+
+    Keyword Arguments:
+        reconnect_policy (RetryPolicy): Decides how often and after which delays a lost connection is re-established.
+            By default, reconnection is retried forever with an exponential backoff of up to 30 seconds.
+
+    Attributes:
+        active_connection: Whether the websocket connection is currently established
+
+        closed: Whether the connection was closed with disconnect() (lost connections are only re-established while
+            this is False)
+    """
+
+    def __init__(self, cloud: BaseCloud, *, reconnect_policy: Optional[RetryPolicy] = None):
+        _assert_aiohttp()
+        self.cloud = cloud
+        self.project_id = cloud.project_id
+        self._session = cloud._session
+        if reconnect_policy is None:
+            reconnect_policy = RetryPolicy(max_attempts=None, base_delay=0.5, multiplier=2, max_delay=30,
+                                           max_elapsed=None, retry_on=(Exception,),
+                                           giveup_on=(exceptions.Unauthenticated,))
+        self.reconnect_policy = reconnect_policy
+
+        self.websocket: Optional[aiohttp.ClientWebSocketResponse] = None
+        self.active_connection = False
+        self.closed = False
+        self.connected_at = 0.0
+        self._send_lock = asyncio.Lock()
+        self._set_lock = asyncio.Lock()
+        self._connect_lock = asyncio.Lock()
+
+    def __repr__(self):
+        return f"<AsyncCloud {self.cloud.cloud_host} project_id={self.project_id}>"
+
+    async def __aenter__(self) -> AsyncCloud:
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.disconnect()
+
+    def __aiter__(self) -> AsyncIterator[cloud_activity.CloudActivity]:
+        return self.events()
+
+    async def connect(self):
+        """
+        Connects to the cloud server and performs the handshake.
+        """
+        self.closed = False
+        await self._connect()
+
+    async def _connect(self):
+        from .cloud import ScratchCloud
+        if isinstance(self.cloud, ScratchCloud):
+            # Connecting to Scratch's cloud websocket requires a login to the Scratch website
+            self.cloud._assert_auth()
+
+        async with self._connect_lock:
+            if self.websocket is not None and not self.websocket.closed:
+                await self.websocket.close()
+            headers = dict(self.cloud.header or {})
+            if self.cloud.cookie:
+                headers["Cookie"] = self.cloud.cookie
+            # Like the blocking client, certificates are not verified
+            self.websocket = await asyncio.wait_for(
+                _get_ws_session().ws_connect(self.cloud.cloud_host, headers=headers, origin=self.cloud.origin,
+                                             ssl=False, max_msg_size=0),
+                self.cloud.ws_timeout
+            )
+            packet = {"method": "handshake", "user": self.cloud.username, "project_id": self.project_id}
+            await self.websocket.send_str(json.dumps(packet) + "\n")
+            if self.closed:
+                # disconnect() was called during the handshake
+                await self.websocket.close()
+                return
+            self.active_connection = True
+            self.connected_at = time.time()
+        if self.cloud.print_connect_message:
+            print("Connected to cloud server ", self.cloud.cloud_host)
+
+    async def disconnect(self):
+        """
+        Closes the connection. Running events() iterators end instead of reconnecting.
+        """
+        self.closed = True
+        await self._close_websocket()
+
+    async def _close_websocket(self):
+        self.active_connection = False
+        if self.websocket is not None:
+            try:
+                await self.websocket.close()
+            except Exception:
+                pass
+
+    async def reconnect(self):
+        """
+        Re-establishes the connection, retrying with the backoff of the reconnect policy.
+        """
+        self.closed = False
+        await self._reconnect()
+
+    async def _reconnect(self):
+        # Stops retrying once disconnect() is called
+        async def connect():
+            if not self.closed:
+                await self._connect()
+
+        await self._close_websocket()
+        await self.reconnect_policy.async_call(connect)
+
+    async def _send(self, data: str):
+        # Sends data, renewing the connection before every retry (like BaseCloud._send)
+        reconnect = False
+
+        async def send():
+            nonlocal reconnect
+            if reconnect or not self.active_connection:
+                await self.connect()
+            reconnect = True
+            await self.websocket.send_str(data)
+
+        async with self._send_lock:
+            try:
+                await self.cloud.send_retry_policy.async_call(send)
+            except Exception:
+                self.active_connection = False
+                raise exceptions.CloudConnectionError(f"Sending data failed: {data.strip()}")
+
+    async def _enforce_ratelimit(self, *, n: int):
+        # Uses the rate limiter of the wrapped cloud, so blocking and async sets of the cloud are limited together
+        await self.cloud._get_ratelimiter().async_acquire(n)
+
+    async def set_var(self, variable: str, value: Union[str, int]):
+        """
+        Sets a cloud variable.
+
+        Args:
+            variable (str): The name of the cloud variable that should be set (provided without the cloud emoji)
+            value (str): The value the cloud variable should be set to
+        """
+        await self.set_vars({variable: value})
+
+    async def set_vars(self, var_value_dict: dict[str, Union[str, int]], *, intelligent_waits: bool = True):
+        """
+        Sets multiple cloud variables at once, in a single websocket frame.
+
+        Args:
+            var_value_dict (dict): variable:value dictionary with the variables / values to set
+
+        Kwargs:
+            intelligent_waits (boolean): When enabled, the method waits as long as needed to make sure no rate limits are triggered
+        """
+        from .cloud import ScratchCloud
+        if isinstance(self.cloud, ScratchCloud):
+            # Setting a cloud var requires a login to the Scratch website
+            self.cloud._assert_auth()
+        packet_list = [self.cloud._set_packet(variable, value) for variable, value in var_value_dict.items()]
+        # Sets of concurrent tasks are sent one after another, so the rate limit applies to all of them
+        async with self._set_lock:
+            if intelligent_waits:
+                await self._enforce_ratelimit(n=len(packet_list))
+            else:
+                self.cloud._get_ratelimiter().reserve(len(packet_list))
+            await self._send("".join(json.dumps(packet) + "\n" for packet in packet_list))
+
+    async def events(self, *, include_initial: bool = False,
+                     initial_window: float = 0.5) -> AsyncIterator[cloud_activity.CloudActivity]:
+        """
+        Yields the cloud activity received from the cloud server (as CloudActivity objects). Lost connections are
+        re-established automatically. Ends when disconnect() is called.
+
+        Servers may send the current values of the variables right after the handshake (or nothing, e.g. when no
+        variable is set). Like CloudEvents, everything received in the first initial_window seconds after a
+        (re)connect is treated as such values and skipped, so activity of other clients in that time is skipped too.
+
+        Keyword Arguments:
+            include_initial (bool): Whether to yield the activity received right after (re)connecting
+            initial_window (float): Seconds after every (re)connect in which received activity is skipped
+        """
+        if not self.active_connection:
+            await self.connect()
+        while not self.closed:
+            if not self.active_connection or self.websocket is None or self.websocket.closed:
+                await self._reconnect()
+                continue
+            websocket = self.websocket
+            try:
+                message = await websocket.receive()
+            except Exception:
+                self.active_connection = False
+                continue
+            if message.type not in (aiohttp.WSMsgType.TEXT, aiohttp.WSMsgType.BINARY):
+                # CLOSE, CLOSED or ERROR: the connection was lost
+                if websocket is self.websocket:
+                    self.active_connection = False
+                continue
+            received_at = time.time()
+            if not include_initial and received_at < self.connected_at + initial_window:
+                continue
+            data = message.data.decode() if isinstance(message.data, bytes) else message.data
+            for line in data.splitlines():
+                activity = self._parse_activity(line, received_at)
+                if activity is not None:
+                    yield activity
+
+    def _parse_activity(self, line: str, received_at: float) -> Optional[cloud_activity.CloudActivity]:
+        try:
+            data = json.loads(line)
+            _a = cloud_activity.CloudActivity(timestamp=received_at * 1000, _session=self._session, cloud=self.cloud)
+            data["variable_name"] = data["name"]
+            data["name"] = data["variable_name"].replace("☁ ", "")
+            _a._update_from_dict(data)
+            return _a
+        except Exception:
+            return None
@@ -36,6 +36,10 @@ class ScratchCloud(BaseCloud):
         self._assert_auth() 
         super().set_vars(var_value_dict, intelligent_waits=intelligent_waits)
 
+    def queue_vars(self, var_value_dict):
+        self._assert_auth()
+        return super().queue_vars(var_value_dict)
+
     def logs(self, *, filter_by_var_named=None, limit=100, offset=0) -> list[cloud_activity.CloudActivity]:
         """
         Gets the data from Scratch's clouddata logs.
@@ -0,0 +1,221 @@
+"""CloudPool class: the cloud connections of many projects on one asyncio event loop. Requires aiohttp."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator, Iterable
+from typing import Callable, Optional, Union
+
+from ._base import BaseCloud
+from .async_cloud import AsyncCloud
+from ..site import cloud_activity
+from ..utils.retry import RetryPolicy
+
+ProjectId = Union[int, str]
+
+
+class PoolSubscription:
+    """
+    A stream of the cloud activity of some (or all) projects of a CloudPool, with its own bounded queue.
+    Iterate over it with async for to get (project_id, activity) tuples.
+
+    Attributes:
+        project_ids: The projects whose activity is received (None means all projects of the pool)
+
+        dropped: The amount of activity that was dropped because the queue was full
+    """
+
+    def __init__(self, pool: CloudPool, project_ids: Optional[set], queue_size: int):
+        self.pool = pool
+        self.project_ids = project_ids
+        self.dropped = 0
+        self.closed = False
+        self._queue: asyncio.Queue[Optional[tuple[ProjectId, cloud_activity.CloudActivity]]] = \
+            asyncio.Queue(maxsize=queue_size)
+
+    def _put(self, item: Optional[tuple[ProjectId, cloud_activity.CloudActivity]]):
+        if self._queue.full():
+            # The oldest activity is dropped, so slow subscribers don't hold up the others
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(item)
+
+    def __aiter__(self) -> AsyncIterator[tuple[ProjectId, cloud_activity.CloudActivity]]:
+        return self
+
+    async def __anext__(self) -> tuple[ProjectId, cloud_activity.CloudActivity]:
+        if self.closed and self._queue.empty():
+            raise StopAsyncIteration
+        item = await self._queue.get()
+        if item is None:
+            # Put by close()
+            raise StopAsyncIteration
+        return item
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.pool._subscriptions.remove(self)
+            if not self._queue.full():
+                # Wakes up a waiting reader. A full queue doesn't block the reader, it stops once the queue is empty
+                self._queue.put_nowait(None)
+
+
+class CloudPool:
+    """
+    Keeps the cloud connections of many projects on one asyncio event loop (using AsyncCloud), instead of one or more
+    threads and blocking websockets per project. Lost connections are re-established with exponential backoff, and
+    the activity of all projects is available as one stream of (project_id, activity) tuples.
+
+    .. code-block:: python
+
+        async with CloudPool(lambda project_id: session.connect_cloud(project_id)) as pool:
+            for project_id in project_ids:
+                await pool.add(project_id)
+            async for project_id, activity in pool:
+                print(project_id, activity.var, activity.value)
+
+    Args:
+        cloud_factory: Returns the cloud object (e.g. session.connect_cloud) for a project id. Required to add projects by id.
+
+    Keyword Arguments:
+        queue_size (int): Max. amount of unread activity per subscription (the oldest activity is dropped when it's full)
+        max_concurrent_connects (int): Max. amount of handshakes that are performed at the same time
+        reconnect_policy (RetryPolicy): Passed to the AsyncCloud objects (decides the reconnect backoff)
+        initial_window (float): Seconds after every (re)connect in which received activity is skipped
+            (see AsyncCloud.events)
+    """
+
+    def __init__(self, cloud_factory: Optional[Callable[[ProjectId], BaseCloud]] = None, *,
+                 queue_size: int = 10000, max_concurrent_connects: int = 20,
+                 reconnect_policy: Optional[RetryPolicy] = None, initial_window: float = 0.5):
+        self.cloud_factory = cloud_factory
+        self.queue_size = queue_size
+        self.reconnect_policy = reconnect_policy
+        self.initial_window = initial_window
+        self.clouds: dict[ProjectId, AsyncCloud] = {}
+        self.errors: dict[ProjectId, BaseException] = {}
+        self._tasks: dict[ProjectId, asyncio.Task] = {}
+        self._subscriptions: list[PoolSubscription] = []
+        self._connect_semaphore = asyncio.Semaphore(max_concurrent_connects)
+
+    async def __aenter__(self) -> CloudPool:
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    def __aiter__(self) -> AsyncIterator[tuple[ProjectId, cloud_activity.CloudActivity]]:
+        return self.subscribe()
+
+    def __len__(self):
+        return len(self.clouds)
+
+    @property
+    def project_ids(self) -> list[ProjectId]:
+        return list(self.clouds)
+
+    async def add(self, cloud: Union[ProjectId, BaseCloud]) -> AsyncCloud:
+        """
+        Connects to the cloud of a project and starts receiving its activity.
+
+        Args:
+            cloud: A cloud object (like ScratchCloud or TwCloud), or a project id (requires the cloud_factory)
+
+        Returns:
+            AsyncCloud: The connection, which can also be used to set variables
+        """
+        if not isinstance(cloud, BaseCloud):
+            if self.cloud_factory is None:
+                raise ValueError("Adding projects by id requires the cloud_factory argument")
+            cloud = self.cloud_factory(cloud)
+        project_id = cloud.project_id
+        if project_id in self.clouds:
+            return self.clouds[project_id]
+
+        kwargs = {} if self.reconnect_policy is None else {"reconnect_policy": self.reconnect_policy}
+        async_cloud = AsyncCloud(cloud, **kwargs)
+        async with self._connect_semaphore:
+            await async_cloud.connect()
+        if project_id in self.clouds:
+            # Added concurrently
+            await async_cloud.disconnect()
+            return self.clouds[project_id]
+        self.clouds[project_id] = async_cloud
+        self.errors.pop(project_id, None)
+        self._tasks[project_id] = asyncio.create_task(self._receive(project_id, async_cloud))
+        return async_cloud
+
+    async def add_many(self, clouds: Iterable[Union[ProjectId, BaseCloud]]) -> dict[ProjectId, BaseException]:
+        """
+        Adds many projects concurrently (with at most max_concurrent_connects handshakes at the same time).
+
+        Returns:
+            dict: The projects that couldn't be connected to, mapped to the raised exceptions
+        """
+        clouds = list(clouds)
+        results = await asyncio.gather(*(self.add(cloud) for cloud in clouds), return_exceptions=True)
+        failed = {}
+        for cloud, result in zip(clouds, results):
+            if isinstance(result, BaseException):
+                failed[cloud.project_id if isinstance(cloud, BaseCloud) else cloud] = result
+        return failed
+
+    async def remove(self, project_id: ProjectId):
+        """
+        Stops receiving the activity of a project and closes its connection.
+        """
+        task = self._tasks.pop(project_id, None)
+        async_cloud = self.clouds.pop(project_id, None)
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        if async_cloud is not None:
+            await async_cloud.disconnect()
+
+    async def close(self):
+        """
+        Closes all connections and ends all subscriptions.
+        """
+        await asyncio.gather(*(self.remove(project_id) for project_id in list(self.clouds)))
+        for subscription in list(self._subscriptions):
+            subscription.close()
+
+    def subscribe(self, project_ids: Optional[Iterable[ProjectId]] = None, *,
+                  queue_size: Optional[int] = None) -> PoolSubscription:
+        """
+        Returns a new stream of (project_id, activity) tuples that receives the activity from now on.
+
+        Args:
+            project_ids: Only receive the activity of these projects. None means all projects (also ones added later).
+        """
+        subscription = PoolSubscription(self, None if project_ids is None else set(project_ids),
+                                        self.queue_size if queue_size is None else queue_size)
+        self._subscriptions.append(subscription)
+        return subscription
+
+    async def set_var(self, project_id: ProjectId, variable: str, value):
+        """
+        Sets a cloud variable of a project that was added to the pool.
+        """
+        await self.clouds[project_id].set_var(variable, value)
+
+    async def set_vars(self, project_id: ProjectId, var_value_dict: dict):
+        await self.clouds[project_id].set_vars(var_value_dict)
+
+    async def _receive(self, project_id: ProjectId, async_cloud: AsyncCloud):
+        try:
+            async for activity in async_cloud.events(initial_window=self.initial_window):
+                for subscription in self._subscriptions:
+                    if subscription.project_ids is None or project_id in subscription.project_ids:
+                        subscription._put((project_id, activity))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # The reconnect policy gave up
+            self.errors[project_id] = e
+            self.clouds.pop(project_id, None)
+            self._tasks.pop(project_id, None)
+            await async_cloud.disconnect()
@@ -1,11 +1,12 @@
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass, field
 from hashlib import md5
-import requests
 
 from . import base, commons, sprite, build_defaulting
-from typing import Optional
+from ..utils import asset_store, exceptions
+from typing import Optional, Iterable, Callable
 
 
 @dataclass(init=True, repr=True)
@@ -17,12 +18,12 @@ class AssetFile:
     @property
     def data(self):
         if self._data is None:
-            # Download and cache
-            rq = requests.get(f"https://assets.scratch.mit.edu/internalapi/asset/{self.filename}/get/")
-            if rq.status_code != 200:
-                raise ValueError(f"Can't download asset {self.filename}\nIs not uploaded to scratch! Response: {rq.text}")
-
-            self._data = rq.content
+            # Download and cache (in the asset store too, if it is enabled)
+            try:
+                self._data = asset_store.fetch_asset(
+                    self.filename, f"https://assets.scratch.mit.edu/internalapi/asset/{self.filename}/get/")
+            except exceptions.FetchError as e:
+                raise ValueError(f"Can't download asset {self.filename}\nIs not uploaded to scratch! ({e})")
 
         return self._data
 
@@ -34,6 +35,61 @@ class AssetFile:
         return self._md5
 
 
+def prefetch(asset_files: Iterable[AssetFile], *, max_workers: int = 8,
+             on_progress: Optional[Callable[[int, int, AssetFile], None]] = None) -> list[AssetFile]:
+    """
+    Downloads the data of all given asset files that haven't been loaded yet, using up to max_workers concurrent
+    requests (which still go through the rate limiter of the Requests layer).
+
+    Args:
+        asset_files: The asset files. Files that already have their data are skipped. Files with the same filename
+            are downloaded once and all get the data.
+
+    Keyword Arguments:
+        max_workers (int): Max. amount of concurrent downloads
+        on_progress: Called with (done, total, asset_file) after each finished download
+
+    Returns:
+        list[AssetFile]: The asset files that were downloaded
+    """
+    missing = {}
+    duplicates: dict[str, list[AssetFile]] = {}
+    for asset_file in asset_files:
+        if asset_file._data is None:
+            if missing.setdefault(asset_file.filename, asset_file) is not asset_file:
+                duplicates.setdefault(asset_file.filename, []).append(asset_file)
+    missing = list(missing.values())
+    if not missing:
+        return []
+
+    def load(asset_file: AssetFile):
+        data = asset_file.data
+        for duplicate in duplicates.get(asset_file.filename, ()):
+            duplicate._data = data
+        return data
+
+    total = len(missing)
+    if max_workers <= 1 or total == 1:
+        for done, asset_file in enumerate(missing, 1):
+            load(asset_file)
+            if on_progress is not None:
+                on_progress(done, total, asset_file)
+        return missing
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, total)) as pool:
+        futures = {pool.submit(load, asset_file): asset_file for asset_file in missing}
+        try:
+            for done, future in enumerate(as_completed(futures), 1):
+                # Raises the first error (if any)
+                future.result()
+                if on_progress is not None:
+                    on_progress(done, total, futures[future])
+        except BaseException:
+            pool.shutdown(wait=True, cancel_futures=True)
+            raise
+    return missing
+
+
 class Asset(base.SpriteSubComponent):
     def __init__(self,
                  name: str = "costume1",
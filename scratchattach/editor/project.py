@@ -4,7 +4,7 @@ import json
 import os
 import warnings
 from io import BytesIO, TextIOWrapper
-from typing import Optional, Iterable, Generator, BinaryIO
+from typing import Optional, Iterable, Generator, BinaryIO, Callable
 from zipfile import ZipFile
 
 from . import base, meta, extension, monitor, sprite, asset, vlb, twconfig, comment, commons
@@ -249,15 +249,22 @@ class Project(base.JSONExtractable):
         if multiple:
             return _ret
 
-    def export(self, fp: str, *, auto_open: bool = False, export_as_zip: bool = True):
+    def export(self, fp: str, *, auto_open: bool = False, export_as_zip: bool = True, max_workers: int = 8,
+               on_progress: Optional[Callable[[int, int, asset.AssetFile], None]] = None):
+        """
+        Exports the project as .sb3 file (or as project.json, if export_as_zip is False).
+        Asset files that haven't been loaded yet are downloaded first, with up to max_workers concurrent downloads.
+        on_progress is called with (done, total, asset_file) after each download.
+        """
         data = self.to_json()
 
         if export_as_zip:
+            asset_files = list({_asset.file_name: _asset.asset_file for _asset in self.assets}.values())
+            asset.prefetch(asset_files, max_workers=max_workers, on_progress=on_progress)
+
             with ZipFile(fp, "w") as archive:
-                for _asset in self.assets:
-                    asset_file = _asset.asset_file
-                    if asset_file.filename not in archive.namelist():
-                        archive.writestr(asset_file.filename, asset_file.data)
+                for asset_file in asset_files:
+                    archive.writestr(asset_file.filename, asset_file.data)
 
                 archive.writestr("project.json", json.dumps(data))
         else:
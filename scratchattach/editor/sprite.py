@@ -3,7 +3,7 @@ from __future__ import annotations
 import json
 import warnings
 from io import BytesIO, TextIOWrapper
-from typing import Optional, Any, BinaryIO
+from typing import Optional, Any, BinaryIO, Callable
 from zipfile import ZipFile
 from typing import Iterable, TYPE_CHECKING
 from . import base, project, vlb, asset, comment, prim, block, commons, build_defaulting
@@ -495,18 +495,20 @@ class Sprite(base.ProjectSubcomponent, base.JSONExtractable):
         if multiple:
             return _ret
 
-    def export(self, fp: Optional[str] = None, *, export_as_zip: bool = True):
+    def export(self, fp: Optional[str] = None, *, export_as_zip: bool = True, max_workers: int = 8,
+               on_progress: Optional[Callable[[int, int, asset.AssetFile], None]] = None):
         if fp is None:
             fp = commons.sanitize_fn(f"{self.name}.sprite3")
 
         data = self.to_json()
 
         if export_as_zip:
+            asset_files = list({_asset.file_name: _asset.asset_file for _asset in self.assets}.values())
+            asset.prefetch(asset_files, max_workers=max_workers, on_progress=on_progress)
+
             with ZipFile(fp, "w") as archive:
-                for _asset in self.assets:
-                    asset_file = _asset.asset_file
-                    if asset_file.filename not in archive.namelist():
-                        archive.writestr(asset_file.filename, asset_file.data)
+                for asset_file in asset_files:
+                    archive.writestr(asset_file.filename, asset_file.data)
 
                 archive.writestr("sprite.json", json.dumps(data))
         else:
@@ -34,6 +34,8 @@ class CloudEvents(BaseEventHandler):
         while True:
             try:
                 while True:
+                    if self.running is False:
+                        return
                     for data in self.source_stream.read():
                         try:
                             _a = cloud_activity.CloudActivity(timestamp=time.time()*1000, _session=self._session, cloud=self.cloud)
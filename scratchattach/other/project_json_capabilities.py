@@ -6,13 +6,17 @@ from __future__ import annotations
 
 import hashlib
 import json
+import os
 import random
 import string
+import tempfile
 import zipfile
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Optional
 from ..utils import exceptions
 from ..utils.commons import empty_project_json
-from ..utils.requests import Requests as requests
+from ..utils import asset_store, download
 # noinspection PyPep8Naming
 def load_components(json_data: list, ComponentClass: type, target_list: list):
     for element in json_data:
@@ -341,11 +345,7 @@ class ProjectBody:
             try:
                 if filename is None:
                     filename = str(self.filename)
-                response = requests.get(
-                    self.download_url,
-                    timeout=10,
-                )
-                open(f"{dir}{filename}", "wb").write(response.content)
+                asset_store.save_asset(self.filename, self.download_url, f"{dir}{filename}")
             except Exception:
                 raise (
                     exceptions.FetchError(
@@ -415,18 +415,23 @@ class ProjectBody:
         return matching[0]
     def user_agent(self):
         return self.meta["agent"]
-    def save(self, *, filename=None, dir=""):
+    def save(self, *, filename=None, dir="", include_assets=False, max_workers=8):
         """
         Saves the project body to the given directory.
         Args:
             filename (str): The name that will be given to the downloaded file.
             dir (str): The path of the directory the file will be saved in.
+            include_assets (bool): If True, the assets are downloaded (concurrently) and a complete .sb3 zip file is saved. Otherwise, only the project JSON is saved.
+            max_workers (int): Max. amount of concurrent asset downloads
         """
         if not (dir.endswith("/") or dir.endswith("\\")):
             dir = dir + "/"
         if filename is None:
             filename = "project"
         filename = filename.replace(".sb3", "")
+        if include_assets:
+            write_sb3(self.to_json(), f"{dir}{filename}.sb3", max_workers=max_workers)
+            return
         with open(f"{dir}{filename}.sb3", "w") as d:
             json.dump(self.to_json(), d, indent=4)
 def get_empty_project_pb():
@@ -454,17 +459,104 @@ def read_sb3_file(path_to_file):
     pb = ProjectBody()
     pb.from_json(_load_sb3_file(path_to_file))
     return pb
-def download_asset(asset_id_with_file_ext, *, filename=None, dir=""):
+def project_json_assets(project_json: dict) -> list[str]:
+    """
+    Returns the md5ext (like "83a9787d4cb6f3b7632b4ddfebf74367.wav") of every costume and sound of a Scratch 3 project JSON.
+    Assets used by several sprites are only contained once.
+    """
+    if not isinstance(project_json, dict) or "targets" not in project_json:
+        raise ValueError("Not a Scratch 3 project JSON")
+    md5exts = {}
+    for target in project_json["targets"]:
+        for asset in target.get("costumes", []) + target.get("sounds", []):
+            md5ext = asset.get("md5ext")
+            if md5ext is None and "assetId" in asset and "dataFormat" in asset:
+                md5ext = f"{asset['assetId']}.{asset['dataFormat']}"
+            if md5ext is not None:
+                md5exts[md5ext] = None
+    return list(md5exts)
+def write_sb3(project_json: dict, fp: str, *, max_workers: int = 8,
+              on_progress: Optional[Callable[[int, int, str], None]] = None) -> str:
+    """
+    Writes a Scratch 3 project JSON together with all of its assets to an .sb3 file.
+
+    The assets are downloaded concurrently into the asset store (into a temporary one, if scratchattach.utils.asset_store
+    isn't enabled) and copied from there into the zip file, so they are never all held in memory.
+    The zip file is written to a temporary file first, which is then renamed to fp.
+    Raises ChecksumError if the content of an asset doesn't match the md5 checksum in its name.
+
+    Args:
+        project_json (dict): The project JSON
+        fp (str): The path of the .sb3 file
+
+    Keyword Arguments:
+        max_workers (int): Max. amount of concurrent asset downloads
+        on_progress: Called with (done, total, md5ext) after each downloaded asset
+
+    Returns:
+        str: The path of the .sb3 file
+    """
+    md5exts = project_json_assets(project_json)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = asset_store.default_store or asset_store.AssetStore(tmp_dir)
+        other_dir = os.path.join(tmp_dir, "unstored")
+        os.makedirs(other_dir)
+
+        def fetch(md5ext: str) -> str:
+            url = f"https://assets.scratch.mit.edu/internalapi/asset/{md5ext}/get/"
+            if store.storable(md5ext):
+                # Raises ChecksumError if the content doesn't match the name (the downloaded content isn't kept)
+                return store.fetch(md5ext, url)
+            # The asset name isn't a md5 checksum, so it can't go through the store
+            path = os.path.join(other_dir, hashlib.md5(md5ext.encode()).hexdigest())
+            download.download_to_file(url, path)
+            return path
+
+        paths = {}
+        if md5exts:
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(md5exts)))) as pool:
+                futures = {pool.submit(fetch, md5ext): md5ext for md5ext in md5exts}
+                try:
+                    for done, future in enumerate(as_completed(futures), 1):
+                        paths[futures[future]] = future.result()
+                        if on_progress is not None:
+                            on_progress(done, len(md5exts), futures[future])
+                except BaseException:
+                    pool.shutdown(wait=True, cancel_futures=True)
+                    raise
+
+        fd, tmp_path = download._create_temp_file(fp)
+        try:
+            with os.fdopen(fd, "wb") as f, zipfile.ZipFile(f, "w", zipfile.ZIP_DEFLATED) as archive:
+                archive.writestr("project.json", json.dumps(project_json))
+                for md5ext in md5exts:
+                    path = paths[md5ext]
+                    if not os.path.isfile(path):
+                        # Evicted from the store in the meantime
+                        path = fetch(md5ext)
+                    archive.write(path, md5ext)
+            os.replace(tmp_path, fp)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    return fp
+def download_asset(asset_id_with_file_ext, *, filename=None, dir="", verify=False, chunk_size=None):
+    """
+    Downloads an asset to the given directory. The asset is streamed to the file in chunks of chunk_size bytes.
+    If verify is True, the md5 checksum of the downloaded asset is compared to the asset id.
+    """
     if not (dir.endswith("/") or dir.endswith("\\")):
         dir = dir + "/"
     try:
         if filename is None:
             filename = str(asset_id_with_file_ext)
-        response = requests.get(
-            "https://assets.scratch.mit.edu/" + str(asset_id_with_file_ext),
-            timeout=10,
+        asset_store.save_asset(
+            str(asset_id_with_file_ext), "https://assets.scratch.mit.edu/" + str(asset_id_with_file_ext),
+            f"{dir}{filename}", verify=verify, chunk_size=chunk_size
         )
-        open(f"{dir}{filename}", "wb").write(response.content)
+    except exceptions.ChecksumError:
+        raise
     except Exception:
         raise (
             exceptions.FetchError(
@@ -2,8 +2,8 @@ from __future__ import annotations
 
 from abc import ABC, abstractmethod
 
-import requests
 from ..utils import exceptions, commons
+from ..utils.requests import Requests as requests
 from typing import TypeVar
 from types import FunctionType
 
@@ -25,9 +25,25 @@ class BaseSiteComponent(ABC):
             headers=self._headers,
             cookies=self._cookies, timeout=10
         )
-        # Check for 429 error:
-        # Note, this is a bit naïve
-        if "429" in str(response):
+        return self._update_from_response(response)
+
+    async def async_update(self):
+        """
+        Asynchronous version of update. Requires aiohttp.
+        """
+        from ..utils.async_requests import AsyncRequests
+        # The asynchronous request uses the same HTTP method as the update_function
+        update_function = getattr(AsyncRequests, self.update_function.__name__)
+        response = await update_function(
+            self.update_API,
+            headers=self._headers,
+            cookies=self._cookies, timeout=10
+        )
+        return self._update_from_response(response)
+
+    def _update_from_response(self, response):
+        # Check for 429 error (only reached if the rate limiter of the Requests layer gave up retrying):
+        if response.status_code == 429:
             return "429"
 
         if response.text == '{\n  "response": "Too many requests"\n}':
@@ -59,7 +75,14 @@ class BaseSiteComponent(ABC):
         """
         return commons._get_object(identificator_id, identificator, Class, NotFoundException, self._session)
 
+    async def _async_make_linked_object(self, identificator_id, identificator, Class: type[C], NotFoundException) -> C:
+        """
+        Asynchronous version of _make_linked_object
+        """
+        return await commons._async_get_object(identificator_id, identificator, Class, NotFoundException,
+                                               self._session)
+
     update_function: FunctionType = requests.get
     """
-    Internal function run on update. Function is a method of the 'requests' module/class
+    Internal function run on update. Function is a method of the 'Requests' class
     """
@@ -3,10 +3,12 @@ from __future__ import annotations
 import json
 import time
 import logging
+from typing import Optional
 
 from ._base import BaseSiteComponent
 from ..utils import exceptions
 from ..utils.requests import Requests as requests
+from ..utils import asset_store
 
 
 
@@ -77,7 +79,7 @@ class BackpackAsset(BaseSiteComponent):
     @property
     def _data_bytes(self) -> bytes:
         try:
-            return requests.get(self.download_url).content
+            return asset_store.fetch_asset(self.filename, self.download_url)
         except Exception as e:
             raise exceptions.FetchError(f"Failed to download asset: {e}")
 
@@ -97,16 +99,25 @@ class BackpackAsset(BaseSiteComponent):
             # It's either a zip
             return self._data_bytes
 
-    def download(self, *, fp: str = ''):
+    def download(self, *, fp: str = '', verify: bool = False, chunk_size: Optional[int] = None):
         """
         Downloads the asset content to the given directory. The given filename is equal to the value saved in the .filename attribute.
+        The content is streamed to the file in chunks.
 
         Args:
             fp (str): The path of the directory the file will be saved in.
+            verify (bool): Whether to compare the md5 checksum of the content to the filename (raises ChecksumError)
+            chunk_size (int): Size of the written chunks in bytes
         """
         if not (fp.endswith("/") or fp.endswith("\\")):
             fp = fp + "/"
-        open(f"{fp}{self.filename}", "wb").write(self._data_bytes)
+        try:
+            asset_store.save_asset(self.filename, self.download_url, f"{fp}{self.filename}", verify=verify,
+                                   chunk_size=chunk_size)
+        except exceptions.FetchError:
+            raise
+        except Exception as e:
+            raise exceptions.FetchError(f"Failed to download asset: {e}")
 
     def delete(self):
         self._assert_auth()
@@ -5,16 +5,22 @@ import json
 import random
 import base64
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from . import user, comment, studio
 from ..utils import exceptions
 from ..utils import commons
 from ..utils.commons import empty_project_json, headers
 from ._base import BaseSiteComponent
-from ..other.project_json_capabilities import ProjectBody
+from ..other.project_json_capabilities import ProjectBody, write_sb3
 from ..utils.requests import Requests as requests
+from ..utils import download as _download
+from ..utils import requests as _requests
 
 CREATE_PROJECT_USES = []
 
+project_token_margin: float = 30
+"""Seconds before their expiry at which cached project tokens are refreshed"""
+
 class PartialProject(BaseSiteComponent):
     """
     Represents an unshared Scratch project that can't be accessed.
@@ -239,26 +245,63 @@ class Project(PartialProject):
         # Overrides the load_description method that exists for unshared projects
         self.update()
 
-    def download(self, *, filename=None, dir=""):
+    def _project_token_expired(self) -> bool:
+        # Project tokens start with the unix timestamp they expire at ("1712345678_7d1b...")
+        if not self.project_token:
+            return True
+        try:
+            expires_at = int(str(self.project_token).split("_")[0])
+        except ValueError:
+            # Unknown format: The token is used until a request is rejected
+            return False
+        return expires_at - project_token_margin <= time.time()
+
+    def _refresh_project_token(self):
+        # A cached response of the project API would contain the same token again
+        cache = _requests.cache
+        if cache is not None:
+            cache.invalidate(self.update_API)
+        self.update()
+
+    def _with_project_token(self, func):
+        # Calls func with the url of the project JSON. The project token is only fetched again (with .update())
+        # if it is missing or expired, or if the request is rejected
+        if self._project_token_expired():
+            self._refresh_project_token()
+        try:
+            return func(f"https://projects.scratch.mit.edu/{self.id}?token={self.project_token}")
+        except exceptions.Unauthorized:
+            self._refresh_project_token()
+            return func(f"https://projects.scratch.mit.edu/{self.id}?token={self.project_token}")
+
+    async def _async_with_project_token(self, func):
+        # Asynchronous version of _with_project_token (func is a coroutine function)
+        if self._project_token_expired():
+            await self.async_update()
+        try:
+            return await func(f"https://projects.scratch.mit.edu/{self.id}?token={self.project_token}")
+        except exceptions.Unauthorized:
+            await self.async_update()
+            return await func(f"https://projects.scratch.mit.edu/{self.id}?token={self.project_token}")
+
+    def download(self, *, filename=None, dir="", chunk_size=None):
         """
-        Downloads the project json to the given directory.
+        Downloads the project json to the given directory. The file is written in chunks while it is downloaded.
 
         Args:
             filename (str): The name that will be given to the downloaded file.
             dir (str): The path of the directory the file will be saved in.
+            chunk_size (int): Size of the written chunks in bytes. Defaults to scratchattach.utils.download.default_chunk_size.
         """
         try:
             if filename is None:
                 filename = str(self.id)
             if not (dir.endswith("/") or dir.endswith("\\")):
                 dir = dir+"/"
-            self.update()
-            response = requests.get(
-                f"https://projects.scratch.mit.edu/{self.id}?token={self.project_token}",
-                timeout=10,
-            )
             filename = filename.replace(".sb3", "")
-            open(f"{dir}{filename}.sb3", "wb").write(response.content)
+            self._with_project_token(
+                lambda url: _download.download_to_file(url, f"{dir}{filename}.sb3", chunk_size=chunk_size)
+            )
         except Exception:
             raise (
                 exceptions.FetchError(
@@ -266,17 +309,46 @@ class Project(PartialProject):
                 )
             )
 
+    def download_sb3(self, *, filename=None, dir="", max_workers: int = 8, on_progress=None) -> str:
+        """
+        Downloads the project json and all costumes and sounds of the project and saves them as .sb3 file that can be
+        opened in the Scratch editor. The project token is only fetched if it isn't known or has expired, and the assets are
+        downloaded concurrently (through the asset store, see scratchattach.utils.asset_store).
+
+        Args:
+            filename (str): The name that will be given to the downloaded file.
+            dir (str): The path of the directory the file will be saved in.
+
+        Keyword Arguments:
+            max_workers (int): Max. amount of concurrent asset downloads
+            on_progress: Called with (done, total, md5ext) after each downloaded asset
+
+        Returns:
+            str: The path of the saved file
+        """
+        if filename is None:
+            filename = str(self.id)
+        if not (dir.endswith("/") or dir.endswith("\\")):
+            dir = dir+"/"
+        filename = filename.replace(".sb3", "")
+        try:
+            project_json = self._with_project_token(lambda url: requests.get(url, timeout=10).json())
+        except Exception:
+            raise (
+                exceptions.FetchError(
+                    "Either the project was created with an old Scratch version, or you're not authorized for accessing it"
+                )
+            )
+        if "targets" not in project_json:
+            raise exceptions.FetchError("Method only works for projects created with Scratch 3")
+        return write_sb3(project_json, f"{dir}{filename}.sb3", max_workers=max_workers, on_progress=on_progress)
+
     def get_json(self) -> str:
         """
         Downloads the project json and returns it as a string
         """
         try:
-            self.update()
-            response = requests.get(
-                f"https://projects.scratch.mit.edu/{self.id}?token={self.project_token}",
-                timeout=10,
-            )
-            return response.text
+            return self._with_project_token(lambda url: requests.get(url, timeout=10).text)
 
         except Exception:
             raise (
@@ -305,11 +377,7 @@ class Project(PartialProject):
             dict: The raw project JSON as decoded Python dictionary
         """
         try:
-            self.update()
-            return requests.get(
-                f"https://projects.scratch.mit.edu/{self.id}?token={self.project_token}",
-                timeout=10,
-            ).json()
+            return self._with_project_token(lambda url: requests.get(url, timeout=10).json())
         except Exception:
             raise (
                 exceptions.FetchError(
@@ -317,6 +385,22 @@ class Project(PartialProject):
                 )
             )
     
+    async def async_raw_json(self):
+        """
+        Asynchronous version of raw_json. Requires aiohttp.
+        """
+        from ..utils.async_requests import AsyncRequests
+        try:
+            async def fetch(url):
+                return (await AsyncRequests.get(url, timeout=10)).json()
+            return await self._async_with_project_token(fetch)
+        except Exception:
+            raise (
+                exceptions.FetchError(
+                    "Either the project was created with an old Scratch version, or you're not authorized for accessing it"
+                )
+            )
+
     def creator_agent(self):
         """
         Method only works for project created with Scratch 3.
@@ -333,6 +417,12 @@ class Project(PartialProject):
         """
         return self._make_linked_object("username", self.author_name, user.User, exceptions.UserNotFound)
 
+    async def async_author(self):
+        """
+        Asynchronous version of author. Requires aiohttp.
+        """
+        return await self._async_make_linked_object("username", self.author_name, user.User, exceptions.UserNotFound)
+
     def studios(self, *, limit=40, offset=0):
         """
         Returns:
@@ -361,6 +451,17 @@ class Project(PartialProject):
             i["source_id"] = self.id
         return commons.parse_object_list(response, comment.Comment, self._session)
 
+    async def async_comments(self, *, limit=40, offset=0) -> list['comment.Comment']:
+        """
+        Asynchronous version of comments. Requires aiohttp.
+        """
+        response = await commons.async_api_iterative(
+            f"https://api.scratch.mit.edu/users/{self.author_name}/projects/{self.id}/comments/", limit=limit, offset=offset, add_params=f"&cachebust={random.randint(0,9999)}")
+        for i in response:
+            i["source"] = "project"
+            i["source_id"] = self.id
+        return commons.parse_object_list(response, comment.Comment, self._session)
+
     def comment_replies(self, *, comment_id, limit=40, offset=0):
         response = commons.api_iterative(
             f"https://api.scratch.mit.edu/users/{self.author_name}/projects/{self.id}/comments/{comment_id}/replies/", limit=limit, offset=offset, add_params=f"&cachebust={random.randint(0,9999)}")
@@ -764,6 +865,75 @@ def get_project(project_id) -> Project:
     print("Warning: For methods that require authentication, use session.connect_project instead of get_project")
     return commons._get_object("id", project_id, Project, exceptions.ProjectNotFound)
 
+def get_projects(project_ids, *, max_workers: int = 8) -> tuple[dict[int, Project], list[int]]:
+    """
+    Gets many projects without logging in. Duplicate ids are only fetched once.
+
+    Args:
+        project_ids (Iterable<int>): Ids of the requested projects
+
+    Keyword Arguments:
+        max_workers (int): Max. amount of projects that are fetched concurrently
+
+    Returns:
+        tuple: A dict that maps the ids to the found projects, and a list of the ids that weren't found
+    """
+    print("Warning: For methods that require authentication, use session.connect_project instead of get_projects")
+    return commons._get_objects("id", project_ids, Project, exceptions.ProjectNotFound, max_workers=max_workers)
+
+def download_sb3s(project_ids, *, dir="", session=None, max_workers: int = 8, project_workers: int = 2,
+                  lookup_workers: int = 8, on_progress=None) -> tuple[dict[int, str], dict[int, Exception]]:
+    """
+    Downloads many projects (with all of their assets) as .sb3 files named <project id>.sb3.
+    Assets that are used by several projects are only downloaded once if the asset store is enabled
+    (see scratchattach.utils.asset_store). A failing project doesn't stop the other downloads.
+
+    Args:
+        project_ids (Iterable<int>): Ids of the projects
+
+    Keyword Arguments:
+        dir (str): The path of the directory the files will be saved in.
+        session (scratchattach.Session): If provided, the projects are fetched with this session (required for unshared projects)
+        max_workers (int): Max. amount of concurrent asset downloads per project
+        project_workers (int): Max. amount of projects that are downloaded concurrently
+        lookup_workers (int): Max. amount of concurrent requests for the project metadata (which contains the project tokens)
+        on_progress: Called with (done, total, project_id) after each finished project
+
+    Returns:
+        tuple: A dict that maps the ids to the paths of the saved files, and a dict that maps the ids of the failed projects to the raised exceptions
+    """
+    failed = {}
+    projects, not_found = commons._get_objects("id", project_ids, Project, exceptions.ProjectNotFound, session,
+                                               max_workers=lookup_workers, errors=failed)
+    saved = {}
+    for project_id in not_found:
+        failed[project_id] = exceptions.ProjectNotFound(f"Project {project_id} wasn't found")
+    total = len(projects) + len(failed)
+    done = len(failed)
+
+    def download(project: Project) -> str:
+        return project.download_sb3(dir=dir, max_workers=max_workers)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(project_workers, len(projects) or 1))) as pool:
+        futures = {pool.submit(download, project): project_id for project_id, project in projects.items()}
+        for future in as_completed(futures):
+            project_id = futures[future]
+            try:
+                saved[project_id] = future.result()
+            except Exception as e:
+                failed[project_id] = e
+            done += 1
+            if on_progress is not None:
+                on_progress(done, total, project_id)
+    return saved, failed
+
+async def async_get_project(project_id) -> Project:
+    """
+    Asynchronous version of get_project. Requires aiohttp.
+    """
+    print("Warning: For methods that require authentication, use session.async_connect_project instead of async_get_project")
+    return await commons._async_get_object("id", project_id, Project, exceptions.ProjectNotFound)
+
 def search_projects(*, query="", mode="trending", language="en", limit=40, offset=0):
     '''
     Uses the Scratch search to search projects.
@@ -8,9 +8,8 @@ import json
 import pathlib
 import random
 import re
-import time
 import warnings
-from typing import Optional, TypeVar, TYPE_CHECKING, overload
+from typing import Optional, TypeVar, TYPE_CHECKING, overload, Callable, Iterator
 from contextlib import contextmanager
 from threading import local
 
@@ -41,26 +40,11 @@ from ..utils import commons
 from ..utils import exceptions
 from ..utils.commons import headers, empty_project_json, webscrape_count, get_class_sort_mode
 from ..utils.requests import Requests as requests
+from ..utils import asset_store
 from .browser_cookies import Browser, ANY, cookies_from_browser
 
-ratelimit_cache: dict[str, list[float]] = {}
+from ..utils.ratelimit import enforce_ratelimit
 
-def enforce_ratelimit(__type: str, name: str, amount: int = 5, duration: int = 60) -> None:
-    cache = ratelimit_cache
-    cache.setdefault(__type, [])
-    uses = cache[__type]
-    while uses[-1] < time.time() - duration:
-        uses.pop()
-    if len(uses) < amount:
-        uses.insert(0, time.time())
-        return
-    raise exceptions.RateLimitedError(
-        f"Rate limit for {name} exceeded.\n"
-        "This rate limit is enforced by scratchattach, not by the Scratch API.\n"
-        "For security reasons, it cannot be turned off.\n\n"
-        "Don't spam-create studios or similar, it WILL get you banned."
-    )
-   
 C = TypeVar("C", bound=BaseSiteComponent) 
 
 class Session(BaseSiteComponent):
@@ -240,6 +224,50 @@ class Session(BaseSiteComponent):
         )
         return commons.parse_object_list(data, activity.Activity, self)
 
+    async def async_messages(self, *, limit: int = 40, offset: int = 0, date_limit=None, filter_by=None) \
+            -> list[activity.Activity]:
+        """
+        Asynchronous version of messages. Requires aiohttp.
+        """
+        add_params = ""
+        if date_limit is not None:
+            add_params += f"&dateLimit={date_limit}"
+        if filter_by is not None:
+            add_params += f"&filter={filter_by}"
+
+        data = await commons.async_api_iterative(
+            f"https://api.scratch.mit.edu/users/{self._username}/messages",
+            limit=limit, offset=offset, _headers=self._headers, cookies=self._cookies, add_params=add_params
+        )
+        return commons.parse_object_list(data, activity.Activity, self)
+
+    def iter_messages(self, *, limit: Optional[int] = None, offset: int = 0, date_limit=None, filter_by=None,
+                      stop_when: Optional[Callable[[activity.Activity], bool]] = None) -> Iterator[activity.Activity]:
+        """
+        Lazy version of messages: Returns a generator that yields the messages page by page.
+        Stop iterating (or use stop_when) to avoid requesting more pages than needed.
+
+        Keyword arguments:
+            limit (int or None): Max amount of yielded messages. None means no limit.
+            offset, date_limit, filter_by: Same as in messages
+            stop_when (Callable): If provided, the iteration stops at the first message it returns True for,
+                e.g. lambda message: message.datetime_created < "2024-01-01"
+
+        Returns:
+            Iterator<scratch.activity.Activity>
+        """
+        add_params = ""
+        if date_limit is not None:
+            add_params += f"&dateLimit={date_limit}"
+        if filter_by is not None:
+            add_params += f"&filter={filter_by}"
+
+        data = commons.api_iterative_iter(
+            f"https://api.scratch.mit.edu/users/{self._username}/messages",
+            limit=limit, offset=offset, _headers=self._headers, cookies=self._cookies, add_params=add_params
+        )
+        return commons.iter_object_list(data, activity.Activity, self, stop_when=stop_when)
+
     def admin_messages(self, *, limit=40, offset=0) -> list[dict]:
         """
         Returns your messages sent by the Scratch team (alerts).
@@ -385,17 +413,23 @@ class Session(BaseSiteComponent):
         return pb
 
     @staticmethod
-    def download_asset(asset_id_with_file_ext, *, filename: Optional[str] = None, fp=""):
+    def download_asset(asset_id_with_file_ext, *, filename: Optional[str] = None, fp="", verify: bool = False,
+                       chunk_size: Optional[int] = None):
+        """
+        Downloads an asset to the given directory. The asset is streamed to the file in chunks of chunk_size bytes.
+        If verify is True, the md5 checksum of the downloaded asset is compared to the asset id.
+        """
         if not (fp.endswith("/") or fp.endswith("\\")):
             fp = fp + "/"
         try:
             if filename is None:
                 filename = str(asset_id_with_file_ext)
-            response = requests.get(
-                "https://assets.scratch.mit.edu/" + str(asset_id_with_file_ext),
-                timeout=10,
+            asset_store.save_asset(
+                str(asset_id_with_file_ext), "https://assets.scratch.mit.edu/" + str(asset_id_with_file_ext),
+                f"{fp}{filename}", verify=verify, chunk_size=chunk_size
             )
-            open(f"{fp}{filename}", "wb").write(response.content)
+        except exceptions.ChecksumError:
+            raise
         except Exception:
             raise (
                 exceptions.FetchError(
@@ -790,6 +824,15 @@ class Session(BaseSiteComponent):
         # _get_object is protected
         return commons._get_object(identificator_name, identificator, __class, NotFoundException, self)
 
+    # noinspection PyPep8Naming
+    async def _async_make_linked_object(self, identificator_name, identificator, __class: type[C],
+                                        NotFoundException: type[Exception]) -> C:
+        """
+        Asynchronous version of _make_linked_object
+        """
+        # noinspection PyProtectedMember
+        return await commons._async_get_object(identificator_name, identificator, __class, NotFoundException, self)
+
     def connect_user(self, username: str) -> user.User:
         """
         Gets a user using this session, connects the session to the User object to allow authenticated actions
@@ -802,6 +845,12 @@ class Session(BaseSiteComponent):
         """
         return self._make_linked_object("username", username, user.User, exceptions.UserNotFound)
 
+    async def async_connect_user(self, username: str) -> user.User:
+        """
+        Asynchronous version of connect_user. Requires aiohttp.
+        """
+        return await self._async_make_linked_object("username", username, user.User, exceptions.UserNotFound)
+
     @deprecated("Finding usernames by user ids has been fixed.")
     def find_username_from_id(self, user_id: int) -> str:
         """
@@ -863,6 +912,13 @@ sess
         """
         return self._make_linked_object("id", int(project_id), project.Project, exceptions.ProjectNotFound)
 
+    async def async_connect_project(self, project_id) -> project.Project:
+        """
+        Asynchronous version of connect_project. Requires aiohttp.
+        """
+        return await self._async_make_linked_object("id", int(project_id), project.Project,
+                                                    exceptions.ProjectNotFound)
+
     def connect_studio(self, studio_id) -> studio.Studio:
         """
         Gets a studio using this session, connects the session to the Studio object to allow authenticated actions
@@ -875,6 +931,12 @@ sess
         """
         return self._make_linked_object("id", int(studio_id), studio.Studio, exceptions.StudioNotFound)
 
+    async def async_connect_studio(self, studio_id) -> studio.Studio:
+        """
+        Asynchronous version of connect_studio. Requires aiohttp.
+        """
+        return await self._async_make_linked_object("id", int(studio_id), studio.Studio, exceptions.StudioNotFound)
+
     def connect_classroom(self, class_id) -> classroom.Classroom:
         """
         Gets a class using this session.
@@ -306,6 +306,27 @@ class Studio(BaseSiteComponent):
             f"https://api.scratch.mit.edu/studios/{self.id}/projects", limit=limit, offset=offset)
         return commons.parse_object_list(response, project.Project, self._session)
 
+    async def async_projects(self, limit=40, offset=0):
+        """
+        Asynchronous version of projects. Requires aiohttp.
+        """
+        response = await commons.async_api_iterative(
+            f"https://api.scratch.mit.edu/studios/{self.id}/projects", limit=limit, offset=offset)
+        return commons.parse_object_list(response, project.Project, self._session)
+
+    def iter_projects(self, *, limit=None, offset=0, stop_when=None):
+        """
+        Lazy version of projects: Returns a generator that yields the studio projects page by page.
+
+        Keyword arguments:
+            limit (int or None): Max amount of yielded projects. None means no limit.
+            offset (int): Offset of the first yielded project.
+            stop_when (Callable): If provided, the iteration stops at the first project it returns True for.
+        """
+        response = commons.api_iterative_iter(
+            f"https://api.scratch.mit.edu/studios/{self.id}/projects", limit=limit, offset=offset)
+        return commons.iter_object_list(response, project.Project, self._session, stop_when=stop_when)
+
     def curators(self, limit=40, offset=0):
         """
         Gets the studio curators.
@@ -321,6 +342,21 @@ class Studio(BaseSiteComponent):
             f"https://api.scratch.mit.edu/studios/{self.id}/curators", limit=limit, offset=offset)
         return commons.parse_object_list(response, user.User, self._session, "username")
 
+    async def async_curators(self, limit=40, offset=0):
+        """
+        Asynchronous version of curators. Requires aiohttp.
+        """
+        response = await commons.async_api_iterative(
+            f"https://api.scratch.mit.edu/studios/{self.id}/curators", limit=limit, offset=offset)
+        return commons.parse_object_list(response, user.User, self._session, "username")
+
+    def iter_curators(self, *, limit=None, offset=0, stop_when=None):
+        """
+        Lazy version of curators. Takes the same keyword arguments as iter_projects.
+        """
+        response = commons.api_iterative_iter(
+            f"https://api.scratch.mit.edu/studios/{self.id}/curators", limit=limit, offset=offset)
+        return commons.iter_object_list(response, user.User, self._session, "username", stop_when)
 
     def invite_curator(self, curator):
         """
@@ -595,6 +631,29 @@ def get_studio(studio_id) -> Studio:
     print("Warning: For methods that require authentication, use session.connect_studio instead of get_studio")
     return commons._get_object("id", studio_id, Studio, exceptions.StudioNotFound)
 
+def get_studios(studio_ids, *, max_workers: int = 8) -> tuple[dict[int, Studio], list[int]]:
+    """
+    Gets many studios without logging in. Duplicate ids are only fetched once.
+
+    Args:
+        studio_ids (Iterable<int>): Ids of the requested studios
+
+    Keyword Arguments:
+        max_workers (int): Max. amount of studios that are fetched concurrently
+
+    Returns:
+        tuple: A dict that maps the ids to the found studios, and a list of the ids that weren't found
+    """
+    print("Warning: For methods that require authentication, use session.connect_studio instead of get_studios")
+    return commons._get_objects("id", studio_ids, Studio, exceptions.StudioNotFound, max_workers=max_workers)
+
+async def async_get_studio(studio_id) -> Studio:
+    """
+    Asynchronous version of get_studio. Requires aiohttp.
+    """
+    print("Warning: For methods that require authentication, use session.async_connect_studio instead of async_get_studio")
+    return await commons._async_get_object("id", studio_id, Studio, exceptions.StudioNotFound)
+
 def search_studios(*, query="", mode="trending", language="en", limit=40, offset=0):
     if not query:
         raise ValueError("The query can't be empty for search")
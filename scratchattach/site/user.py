@@ -191,6 +191,26 @@ class User(BaseSiteComponent):
             f"https://api.scratch.mit.edu/users/{self.username}/followers/", limit=limit, offset=offset)
         return commons.parse_object_list(response, User, self._session, "username")
 
+    async def async_followers(self, *, limit=40, offset=0):
+        """
+        Asynchronous version of followers. Requires aiohttp.
+        """
+        response = await commons.async_api_iterative(
+            f"https://api.scratch.mit.edu/users/{self.username}/followers/", limit=limit, offset=offset)
+        return commons.parse_object_list(response, User, self._session, "username")
+
+    def iter_followers(self, *, limit=None, offset=0, stop_when=None):
+        """
+        Lazy version of followers: Returns a generator that yields the followers page by page.
+
+        Keyword arguments:
+            limit (int or None): Max amount of yielded users. None means no limit.
+            stop_when (Callable): If provided, the iteration stops at the first user it returns True for.
+        """
+        response = commons.api_iterative_iter(
+            f"https://api.scratch.mit.edu/users/{self.username}/followers/", limit=limit, offset=offset)
+        return commons.iter_object_list(response, User, self._session, "username", stop_when)
+
     def follower_names(self, *, limit=40, offset=0):
         """
         Returns:
@@ -207,6 +227,22 @@ class User(BaseSiteComponent):
             f"https://api.scratch.mit.edu/users/{self.username}/following/", limit=limit, offset=offset)
         return commons.parse_object_list(response, User, self._session, "username")
 
+    async def async_following(self, *, limit=40, offset=0):
+        """
+        Asynchronous version of following. Requires aiohttp.
+        """
+        response = await commons.async_api_iterative(
+            f"https://api.scratch.mit.edu/users/{self.username}/following/", limit=limit, offset=offset)
+        return commons.parse_object_list(response, User, self._session, "username")
+
+    def iter_following(self, *, limit=None, offset=0, stop_when=None):
+        """
+        Lazy version of following. Takes the same keyword arguments as iter_followers.
+        """
+        response = commons.api_iterative_iter(
+            f"https://api.scratch.mit.edu/users/{self.username}/following/", limit=limit, offset=offset)
+        return commons.iter_object_list(response, User, self._session, "username", stop_when)
+
     def following_names(self, *, limit=40, offset=0):
         """
         Returns:
@@ -285,6 +321,30 @@ class User(BaseSiteComponent):
             p["author"] = {"username":self.username}
         return commons.parse_object_list(_projects, project.Project, self._session)
 
+    async def async_projects(self, *, limit=40, offset=0) -> list[project.Project]:
+        """
+        Asynchronous version of projects. Requires aiohttp.
+        """
+        _projects = await commons.async_api_iterative(
+            f"https://api.scratch.mit.edu/users/{self.username}/projects/", limit=limit, offset=offset, _headers= self._headers)
+        for p in _projects:
+            p["author"] = {"username":self.username}
+        return commons.parse_object_list(_projects, project.Project, self._session)
+
+    def iter_projects(self, *, limit=None, offset=0, stop_when=None):
+        """
+        Lazy version of projects. Takes the same keyword arguments as iter_followers.
+        """
+        def with_author(_projects):
+            for p in _projects:
+                p["author"] = {"username": self.username}
+                yield p
+
+        _projects = commons.api_iterative_iter(
+            f"https://api.scratch.mit.edu/users/{self.username}/projects/", limit=limit, offset=offset,
+            _headers=self._headers)
+        return commons.iter_object_list(with_author(_projects), project.Project, self._session, stop_when=stop_when)
+
     def loves(self, *, limit=40, offset=0, get_full_project: bool = False) -> list[project.Project]:
         """
         Returns:
@@ -832,3 +892,26 @@ def get_user(username) -> User:
     """
     print("Warning: For methods that require authentication, use session.connect_user instead of get_user")
     return commons._get_object("username", username, User, exceptions.UserNotFound)
+
+def get_users(usernames, *, max_workers: int = 8) -> tuple[dict[str, User], list[str]]:
+    """
+    Gets many users without logging in. Duplicate usernames are only fetched once.
+
+    Args:
+        usernames (Iterable<str>): Usernames of the requested users
+
+    Keyword Arguments:
+        max_workers (int): Max. amount of users that are fetched concurrently
+
+    Returns:
+        tuple: A dict that maps the usernames to the found users, and a list of the usernames that weren't found
+    """
+    print("Warning: For methods that require authentication, use session.connect_user instead of get_users")
+    return commons._get_objects("username", usernames, User, exceptions.UserNotFound, max_workers=max_workers)
+
+async def async_get_user(username) -> User:
+    """
+    Asynchronous version of get_user. Requires aiohttp.
+    """
+    print("Warning: For methods that require authentication, use session.async_connect_user instead of async_get_user")
+    return await commons._async_get_object("username", username, User, exceptions.UserNotFound)
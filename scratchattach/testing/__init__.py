@@ -0,0 +1,5 @@
+"""
+scratchattach.testing - tools for testing and benchmarking code that uses scratchattach without the live Scratch servers
+"""
+
+from .fake_api import FakeScratchAPI
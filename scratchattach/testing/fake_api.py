@@ -0,0 +1,527 @@
+"""Local stand-in for the Scratch API that serves synthetic data"""
+from __future__ import annotations
+
+import hashlib
+import json
+import random
+import re
+import threading
+from datetime import datetime, timedelta, timezone
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlsplit
+
+from ..utils import async_requests as _async_requests
+from ..utils import requests as _requests
+from ..utils.http_backends import HTTPBackend
+
+scratch_hosts: tuple[str, ...] = (
+    "api.scratch.mit.edu", "scratch.mit.edu", "clouddata.scratch.mit.edu", "projects.scratch.mit.edu",
+    "assets.scratch.mit.edu",
+)
+"""The hosts whose requests are sent to the fake API once it is installed"""
+
+_epoch = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+
+def _date(rng: random.Random) -> str:
+    return (_epoch + timedelta(seconds=rng.randint(0, 4 * 365 * 24 * 3600))).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+def _redirect_url(base_url: str, url: str) -> Optional[str]:
+    # https://api.scratch.mit.edu/x -> <fake api>/api.scratch.mit.edu/x (None for urls of other hosts)
+    parts = urlsplit(url)
+    if parts.netloc not in scratch_hosts:
+        return None
+    return f"{base_url}/{parts.netloc}{parts.path}" + (f"?{parts.query}" if parts.query else "")
+
+
+class _RedirectBackend(HTTPBackend):
+    # Sends requests to the Scratch hosts to the fake API
+    name = "fake"
+
+    def __init__(self, base_url: str, inner: HTTPBackend):
+        self.base_url = base_url
+        self.inner = inner
+
+    def request(self, method: str, url: str, *, proxies: Optional[dict] = None, **kwargs):
+        redirected = _redirect_url(self.base_url, url)
+        if redirected is not None:
+            url, proxies = redirected, None
+        return self.inner.request(method, url, proxies=proxies, **kwargs)
+
+    def close(self):
+        self.inner.close()
+
+
+class _AsyncRedirectBackend(_async_requests.AsyncHTTPBackend):
+    # The same for the AsyncRequests class
+    name = "fake"
+
+    def __init__(self, base_url: str, inner: _async_requests.AsyncHTTPBackend):
+        self.base_url = base_url
+        self.inner = inner
+
+    async def request(self, method: str, url: str, *, proxy: Optional[str] = None, **kwargs):
+        redirected = _redirect_url(self.base_url, url)
+        if redirected is not None:
+            url, proxy = redirected, None
+        return await self.inner.request(method, url, proxy=proxy, **kwargs)
+
+    async def close(self):
+        await self.inner.close()
+
+
+class FakeScratchAPI:
+    """
+    Small local HTTP server that implements the endpoints the site layer uses, with deterministic synthetic data:
+
+    - api.scratch.mit.edu: /users/<username>, /users/<username>/followers, /following, /projects,
+      /projects/<id>, /studios/<id>, /studios/<id>/projects, /studios/<id>/curators
+    - clouddata.scratch.mit.edu: /logs
+    - projects.scratch.mit.edu: /<id>?token=<project token> (project JSON; 403 if the token is missing or expired)
+    - assets.scratch.mit.edu: /internalapi/asset/<md5ext>/get/ and /<md5ext> (the costumes and sounds of the projects)
+    - scratch.mit.edu: /site-api/comments/user/<username>/ (profile comment HTML), /discuss/topic/<id>/,
+      /discuss/feeds/topic/<id>/ and /discuss/<category id>/ (forum pages)
+
+    The users are named user0, user1, ..., the projects and studios have the ids 1, 2, ...
+    Other users, projects and studios don't exist (404).
+
+    Once installed (or when used as context manager), all requests that scratchattach sends to the Scratch hosts with
+    the Requests and AsyncRequests classes go to the fake API instead:
+
+    .. code-block:: python
+
+        with FakeScratchAPI(users=5000) as api:
+            user = scratchattach.get_user("user42")
+            followers = user.followers(limit=200)
+        print(api.request_count)
+
+    Attributes:
+        request_count: Amount of requests that were handled
+    """
+
+    def __init__(self, *, users: int = 1000, projects: int = 10000, studios: int = 1000, followers: int = 100,
+                 studio_projects: int = 200, comments: int = 100, forum_posts: int = 100, cloud_logs: int = 1000,
+                 assets: int = 500, project_assets: int = 10, latency: float = 0, seed: int = 0,
+                 host: str = "127.0.0.1", port: int = 0):
+        self.users = users
+        self.projects = projects
+        self.studios = studios
+        self.followers = followers
+        self.studio_projects = studio_projects
+        self.comments = comments
+        self.forum_posts = forum_posts
+        self.cloud_logs = cloud_logs
+        self.assets = assets
+        self.project_assets = project_assets
+        self._asset_indices: Optional[dict[str, int]] = None
+        self.latency = latency
+        self.seed = seed
+        self.request_count = 0
+        self._count_lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+        self._previous_backend: Optional[HTTPBackend] = None
+        self._previous_async_backend: Optional[_async_requests.AsyncHTTPBackend] = None
+        self._routes = [
+            ("api.scratch.mit.edu", re.compile(r"^/users/([^/]+)/?$"), self._user),
+            ("api.scratch.mit.edu", re.compile(r"^/users/([^/]+)/(followers|following)/?$"), self._user_follows),
+            ("api.scratch.mit.edu", re.compile(r"^/users/([^/]+)/projects/?$"), self._user_projects),
+            ("api.scratch.mit.edu", re.compile(r"^/projects/(\d+)/?$"), self._project),
+            ("api.scratch.mit.edu", re.compile(r"^/studios/(\d+)/?$"), self._studio),
+            ("api.scratch.mit.edu", re.compile(r"^/studios/(\d+)/projects/?$"), self._studio_projects),
+            ("api.scratch.mit.edu", re.compile(r"^/studios/(\d+)/curators/?$"), self._studio_curators),
+            ("clouddata.scratch.mit.edu", re.compile(r"^/logs/?$"), self._cloud_logs),
+            ("projects.scratch.mit.edu", re.compile(r"^/(\d+)/?$"), self._project_json),
+            ("assets.scratch.mit.edu", re.compile(r"^/internalapi/asset/([0-9a-f]{32}\.\w+)/get/?$"), self._asset),
+            ("assets.scratch.mit.edu", re.compile(r"^/([0-9a-f]{32}\.\w+)$"), self._asset),
+            ("scratch.mit.edu", re.compile(r"^/site-api/comments/user/([^/]+)/?$"), self._profile_comments),
+            ("scratch.mit.edu", re.compile(r"^/discuss/feeds/topic/(\d+)/?$"), self._topic_feed),
+            ("scratch.mit.edu", re.compile(r"^/discuss/topic/(\d+)/?$"), self._topic),
+            ("scratch.mit.edu", re.compile(r"^/discuss/(\d+)/?$"), self._category),
+        ]
+
+    def __enter__(self):
+        self.start()
+        self.install()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.uninstall()
+        self.stop()
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """
+        Starts serving in a background thread.
+        """
+        if self._thread is None:
+            # A short poll interval, so stop() doesn't wait long
+            self._thread = threading.Thread(target=self._server.serve_forever, kwargs={"poll_interval": 0.05},
+                                            daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+
+    def install(self):
+        """
+        Makes the Requests and AsyncRequests classes send the requests to the Scratch hosts to this fake API.
+        """
+        if self._previous_backend is None:
+            self._previous_backend = _requests.backend
+            _requests.backend = _RedirectBackend(self.url, self._previous_backend)
+            self._previous_async_backend = _async_requests.backend
+            _async_requests.set_backend(_AsyncRedirectBackend(self.url, self._previous_async_backend))
+
+    def uninstall(self):
+        if self._previous_backend is not None:
+            _requests.backend = self._previous_backend
+            self._previous_backend = None
+            _async_requests.set_backend(self._previous_async_backend)
+            self._previous_async_backend = None
+
+    # Request handling
+
+    def _make_handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Keep-alive, like the real servers
+
+            def do_GET(self):
+                api._handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def _handle(self, handler: BaseHTTPRequestHandler):
+        with self._count_lock:
+            self.request_count += 1
+        if self.latency:
+            threading.Event().wait(self.latency)
+        parts = urlsplit(handler.path)
+        host, _, path = parts.path.lstrip("/").partition("/")
+        path = "/" + path
+        query = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+
+        status, content_type, body = 404, "application/json", {"code": "NotFound", "message": ""}
+        for route_host, pattern, route in self._routes:
+            match = pattern.match(path)
+            if route_host == host and match:
+                result = route(query, *match.groups())
+                if result is not None:
+                    status, content_type, body = result
+                break
+
+        if not isinstance(body, (str, bytes)):
+            body = json.dumps(body)
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        handler.send_response(status)
+        handler.send_header("Content-Type", content_type)
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    @staticmethod
+    def _page(query: dict, total: int, max_limit: int = 40) -> range:
+        try:
+            limit = min(int(query.get("limit", max_limit)), max_limit)
+            offset = int(query.get("offset", 0))
+        except ValueError:
+            return range(0)
+        return range(max(offset, 0), min(offset + limit, total))
+
+    def _rng(self, *key) -> random.Random:
+        return random.Random("-".join(map(str, (self.seed,) + key)))
+
+    def _user_index(self, username: str) -> Optional[int]:
+        match = re.fullmatch(r"user(\d+)", username, re.IGNORECASE)
+        if match is None or int(match.group(1)) >= self.users:
+            return None
+        return int(match.group(1))
+
+    # Synthetic data
+
+    def user_data(self, index: int) -> dict:
+        rng = self._rng("user", index)
+        return {
+            "id": 10000 + index,
+            "username": f"user{index}",
+            "scratchteam": index == 0,
+            "history": {"joined": _date(rng)},
+            "profile": {
+                "id": 20000 + index,
+                "images": {size: f"https://cdn2.scratch.mit.edu/get_image/user/{10000 + index}_{size}.png"
+                           for size in ("90x90", "60x60", "55x55", "50x50", "32x32")},
+                "status": f"Working on project {rng.randint(1, max(self.projects, 1))}",
+                "bio": f"Hi, I'm user{index}!",
+                "country": rng.choice(["Germany", "United States", "Japan", "Brazil", "India"]),
+            },
+        }
+
+    def project_data(self, project_id: int) -> dict:
+        rng = self._rng("project", project_id)
+        author = self.user_data(project_id % max(self.users, 1))
+        created = _date(rng)
+        return {
+            "id": project_id,
+            "title": f"Project {project_id}",
+            "description": "Synthetic project",
+            "instructions": "Press the green flag",
+            "visibility": "visible",
+            "public": True,
+            "comments_allowed": True,
+            "is_published": True,
+            "author": {"id": author["id"], "username": author["username"], "scratchteam": author["scratchteam"],
+                       "history": author["history"], "profile": {"id": None, "images": author["profile"]["images"]}},
+            "image": f"https://cdn2.scratch.mit.edu/get_image/project/{project_id}_480x360.png",
+            "history": {"created": created, "modified": created, "shared": created},
+            "stats": {"views": rng.randint(0, 100000), "loves": rng.randint(0, 5000),
+                      "favorites": rng.randint(0, 5000), "remixes": rng.randint(0, 100)},
+            "remix": {"parent": None, "root": None},
+            "project_token": f"{int(datetime.now(timezone.utc).timestamp()) + 3600}_{rng.getrandbits(128):032x}",
+        }
+
+    def studio_data(self, studio_id: int) -> dict:
+        rng = self._rng("studio", studio_id)
+        created = _date(rng)
+        return {
+            "id": studio_id,
+            "title": f"Studio {studio_id}",
+            "host": 10000 + studio_id % max(self.users, 1),
+            "description": "Synthetic studio",
+            "visibility": "visibile",
+            "public": True,
+            "open_to_all": rng.random() < 0.5,
+            "comments_allowed": True,
+            "image": f"https://cdn2.scratch.mit.edu/get_image/gallery/{studio_id}_170x100.png",
+            "history": {"created": created, "modified": created},
+            "stats": {"comments": rng.randint(0, 1000), "followers": rng.randint(0, 1000), "managers": 1,
+                      "projects": self.studio_projects},
+        }
+
+    def asset_data(self, index: int) -> tuple[str, bytes]:
+        """
+        Returns the md5ext and the content of the asset with the given index.
+        """
+        rng = self._rng("asset", index)
+        data_format = "wav" if index % 3 == 0 else "png"
+        content = bytes(rng.getrandbits(8) for _ in range(256)) * rng.randint(4, 32)
+        return f"{hashlib.md5(content).hexdigest()}.{data_format}", content
+
+    def project_json(self, project_id: int) -> dict:
+        rng = self._rng("project json", project_id)
+        asset_indices = [rng.randrange(max(self.assets, 1)) for _ in range(self.project_assets)]
+
+        def asset_json(index: int, kind: str) -> dict:
+            md5ext, _ = self.asset_data(index)
+            asset_id, data_format = md5ext.split(".")
+            data = {"name": f"{kind}{index}", "assetId": asset_id, "md5ext": md5ext, "dataFormat": data_format}
+            if data_format == "wav":
+                data.update({"rate": 48000, "sampleCount": 1024})
+            else:
+                data.update({"bitmapResolution": 1, "rotationCenterX": 0, "rotationCenterY": 0})
+            return data
+
+        costumes = [asset_json(i, "costume") for i in asset_indices if i % 3 != 0]
+        sounds = [asset_json(i, "sound") for i in asset_indices if i % 3 == 0]
+        target = {"variables": {}, "lists": {}, "broadcasts": {}, "blocks": {}, "comments": {}, "currentCostume": 0,
+                  "volume": 100, "layerOrder": 0}
+        return {
+            "targets": [
+                dict(target, isStage=True, name="Stage", costumes=costumes[:1], sounds=[], tempo=60,
+                     videoTransparency=50, videoState="on", textToSpeechLanguage=None),
+                dict(target, isStage=False, name="Sprite1", costumes=costumes[1:], sounds=sounds, layerOrder=1,
+                     visible=True, x=0, y=0, size=100, direction=90, draggable=False, rotationStyle="all around"),
+            ],
+            "monitors": [],
+            "extensions": [],
+            "meta": {"semver": "3.0.0", "vm": "0.2.0", "agent": "scratchattach.testing"},
+        }
+
+    # Routes (return None for 404)
+
+    def _user(self, query, username):
+        index = self._user_index(username)
+        if index is not None:
+            return 200, "application/json", self.user_data(index)
+
+    def _user_follows(self, query, username, kind):
+        index = self._user_index(username)
+        if index is None:
+            return None
+        step = 1 if kind == "followers" else 7
+        return 200, "application/json", [self.user_data((index + step * (i + 1)) % self.users)
+                                         for i in self._page(query, self.followers)]
+
+    def _user_projects(self, query, username):
+        index = self._user_index(username)
+        if index is None:
+            return None
+        # The projects of a user are the ones whose id is congruent to the user's index
+        project_ids = range(index if index > 0 else self.users, self.projects + 1, max(self.users, 1))
+        return 200, "application/json", [self.project_data(project_ids[i]) for i in self._page(query, len(project_ids))]
+
+    def _project(self, query, project_id):
+        project_id = int(project_id)
+        if 1 <= project_id <= self.projects:
+            return 200, "application/json", self.project_data(project_id)
+
+    def _project_json(self, query, project_id):
+        project_id = int(project_id)
+        if not 1 <= project_id <= self.projects:
+            return None
+        expires, _, _ = query.get("token", "").partition("_")
+        if not expires.isdigit() or int(expires) < datetime.now(timezone.utc).timestamp():
+            return 403, "application/json", {"code": "Forbidden", "message": ""}
+        return 200, "application/json", self.project_json(project_id)
+
+    def _asset(self, query, md5ext):
+        if self._asset_indices is None:
+            self._asset_indices = {self.asset_data(i)[0]: i for i in range(self.assets)}
+        index = self._asset_indices.get(md5ext)
+        if index is not None:
+            return 200, "application/octet-stream", self.asset_data(index)[1]
+
+    def _studio(self, query, studio_id):
+        studio_id = int(studio_id)
+        if 1 <= studio_id <= self.studios:
+            return 200, "application/json", self.studio_data(studio_id)
+
+    def _studio_projects(self, query, studio_id):
+        studio_id = int(studio_id)
+        if not 1 <= studio_id <= self.studios:
+            return None
+        result = []
+        for i in self._page(query, self.studio_projects):
+            project = self.project_data((studio_id * 31 + i) % self.projects + 1)
+            result.append({"id": project["id"], "title": project["title"], "image": project["image"],
+                           "creator_id": project["author"]["id"], "username": project["author"]["username"],
+                           "avatar": project["author"]["profile"]["images"], "actor_id": project["author"]["id"]})
+        return 200, "application/json", result
+
+    def _studio_curators(self, query, studio_id):
+        studio_id = int(studio_id)
+        if not 1 <= studio_id <= self.studios:
+            return None
+        return 200, "application/json", [self.user_data((studio_id + i) % self.users)
+                                         for i in self._page(query, min(self.followers, self.users))]
+
+    def _cloud_logs(self, query):
+        try:
+            project_id = int(query.get("projectid", 0))
+        except ValueError:
+            return 400, "application/json", {"code": "BadRequest", "message": ""}
+        result = []
+        for i in self._page(query, self.cloud_logs, max_limit=100):
+            rng = self._rng("cloud", project_id, i)
+            result.append({"user": f"user{rng.randrange(max(self.users, 1))}", "verb": "set_var",
+                           "name": f"☁ var{rng.randrange(5)}", "value": str(rng.randrange(10 ** 9)),
+                           "timestamp": 1700000000000 - i * 1000})
+        return 200, "application/json", result
+
+    def _comment_html(self, comment_id: int, rng: random.Random, reply: bool) -> str:
+        author = f"user{rng.randrange(max(self.users, 1))}"
+        return (
+            f'<div id="comments-{comment_id}" class="comment" data-comment-id="{comment_id}">'
+            f'<div class="info"><div class="name"><a href="/users/{author}">{author}</a></div>'
+            f'<div class="content">{"Reply" if reply else "Comment"} {comment_id}</div>'
+            f'<div><span class="time" title="{_date(rng)}">1 day ago</span></div></div>'
+            f'<a id="comment-user" data-comment-user="{author}" href="/users/{author}"></a></div>'
+        )
+
+    def _profile_comments(self, query, username):
+        index = self._user_index(username)
+        if index is None:
+            return None
+        try:
+            page = int(query.get("page", 1))
+        except ValueError:
+            page = 1
+        items = []
+        for i in range((page - 1) * 40, min(page * 40, self.comments)):
+            rng = self._rng("comment", index, i)
+            comment_id = 100000 * (index + 1) + i * 10
+            replies = "".join(f'<li class="reply">{self._comment_html(comment_id + r + 1, rng, True)}</li>'
+                              for r in range(rng.randrange(3)))
+            items.append(f'<li class="top-level-reply">{self._comment_html(comment_id, rng, False)}'
+                         f'<ul class="replies">{replies}</ul></li>')
+        return 200, "text/html; charset=utf-8", f'<ul class="comments">{"".join(items)}</ul>'
+
+    def _topic_title(self, topic_id: int) -> tuple[str, str]:
+        return f"Topic {topic_id}", ["Suggestions", "Help with Scripts", "Questions about Scratch"][topic_id % 3]
+
+    def _topic_feed(self, query, topic_id):
+        title, category = self._topic_title(int(topic_id))
+        return 200, "application/atom+xml; charset=utf-8", (
+            '<?xml version="1.0" encoding="utf-8"?>\n'
+            '<feed xmlns="http://www.w3.org/2005/Atom" xml:lang="en-us">'
+            f'<title>Latest posts on {escape(title)}</title><updated>2024-01-01T00:00:00+00:00</updated>'
+            f'<entry><title>Scratch Forums :: {escape(category)} :: {escape(title)}</title></entry></feed>'
+        )
+
+    def _topic(self, query, topic_id):
+        topic_id = int(topic_id)
+        title, category = self._topic_title(topic_id)
+        try:
+            page = int(query.get("page", 1))
+        except ValueError:
+            page = 1
+        num_pages = max(1, -(-self.forum_posts // 20))
+        posts = []
+        for i in range((page - 1) * 20, min(page * 20, self.forum_posts)):
+            rng = self._rng("post", topic_id, i)
+            post_id = topic_id * 1000 + i
+            author = f"user{rng.randrange(max(self.users, 1))}"
+            posts.append(
+                f'<div id="p{post_id}" class="blockpost roweven firstpost">'
+                f'<h2><span><span class="conr">#{i + 1}</span> <a href="/discuss/post/{post_id}/">{_date(rng)}</a>'
+                f'</span></h2><div class="box"><div class="box-inner"><div class="postleft"><dl><dt>'
+                f'<a class="black username" href="/users/{author}/">{author}</a></dt></dl></div>'
+                f'<div class="postright"><h3>{escape(title)}</h3><div class="postmsg">'
+                f'<div class="post_body_html">Post {i + 1} of topic {topic_id}</div></div></div></div></div></div>'
+            )
+        pages = "".join(f'<a class="page" href="?page={p}">{p}</a>' for p in range(1, num_pages + 1))
+        return 200, "text/html; charset=utf-8", (
+            '<html><body><div class="djangobb">'
+            f'<div class="pagination">{pages}</div>'
+            '<ul><li>Navigation</li></ul>'
+            f'<ul><li><a href="/discuss/">Discussion Home</a></li><li><a href="/discuss/1/">{escape(category)}</a>'
+            f'</li><li>{escape(title)}</li></ul>'
+            f'{"".join(posts)}</div></body></html>'
+        )
+
+    def _category(self, query, category_id):
+        category_id = int(category_id)
+        try:
+            page = int(query.get("page", 1))
+        except ValueError:
+            page = 1
+        rows = []
+        for i in range((page - 1) * 25, page * 25):
+            topic_id = category_id * 100000 + i + 1
+            rng = self._rng("topic", topic_id)
+            rows.append(
+                f'<tr><td><a href="/discuss/topic/{topic_id}/">Topic {topic_id}</a></td>'
+                f'<td>{rng.randrange(1000)}</td><td>{rng.randrange(100000)}</td>'
+                f'<td>{_date(rng)[:10]} {_date(rng)[11:19]} by user{rng.randrange(max(self.users, 1))}</td></tr>'
+            )
+        return 200, "text/html; charset=utf-8", (
+            '<html><body><div class="djangobb"><h4><span>Category {0}</span></h4><table>'
+            '<tr><th>Topic</th><th>Replies</th><th>Views</th><th>Last Post</th></tr>{1}</table></div></body></html>'
+        ).format(category_id, "".join(rows))
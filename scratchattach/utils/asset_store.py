@@ -0,0 +1,306 @@
+"""Content-addressed on-disk store for asset files (costumes, sounds, backpack assets)"""
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+from collections import OrderedDict
+from threading import Lock
+from typing import Optional
+
+from . import exceptions
+from .download import download_to_file, md5_from_asset_id, _create_temp_file
+from .requests import Requests as requests
+from .singleflight import SingleFlight
+
+
+class AssetStore:
+    """
+    Keeps asset files in a directory, keyed by their md5 checksum and file extension (like Scratch does),
+    so an asset that is used by many projects is only downloaded and stored once.
+
+    Files are written atomically (to a temporary file that is then renamed) and are verified against their md5 before
+    they are stored. Once the stored files take up more than max_bytes, the least recently used ones are deleted.
+
+    Args:
+        root (str): The directory the assets are stored in. Created if it doesn't exist.
+
+    Keyword Arguments:
+        max_bytes (int or None): Max. total size of the stored files. None means no limit.
+    """
+
+    def __init__(self, root: str, *, max_bytes: Optional[int] = None):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._size: Optional[int] = None
+        self._index: Optional[OrderedDict[str, int]] = None
+        self._pinned: dict[str, int] = {}
+        self._flights = SingleFlight()
+        self._lock = Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, md5ext: str) -> str:
+        """
+        Returns the path an asset is (or would be) stored at.
+        """
+        md5ext = md5ext.lower()
+        return os.path.join(self.root, md5ext[:2], md5ext)
+
+    @staticmethod
+    def storable(md5ext: str) -> bool:
+        # Only assets whose name is their md5 checksum can be stored (that's how the content is verified)
+        return md5_from_asset_id(md5ext) is not None and "/" not in md5ext and "\\" not in md5ext
+
+    def has(self, md5ext: str) -> bool:
+        return self.storable(md5ext) and os.path.isfile(self.path(md5ext))
+
+    def get(self, md5ext: str) -> Optional[bytes]:
+        """
+        Returns the content of a stored asset, or None if it isn't stored.
+        """
+        if not self.storable(md5ext):
+            return None
+        path = self.path(md5ext)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        self._touch(path)
+        return data
+
+    def put(self, md5ext: str, data: bytes) -> str:
+        """
+        Stores the content of an asset. Raises ChecksumError if the content doesn't match the md5 in md5ext.
+
+        Returns:
+            str: The path of the stored file
+        """
+        md5 = md5_from_asset_id(md5ext)
+        if md5 is None:
+            raise ValueError(f"{md5ext} is not a md5 checksum with a file extension")
+        if hashlib.md5(data).hexdigest() != md5:
+            raise exceptions.ChecksumError(f"Content doesn't match the md5 checksum of {md5ext}")
+        path = self.path(md5ext)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = _create_temp_file(path)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._add(path, len(data))
+        self._evict()
+        return path
+
+    def fetch(self, md5ext: str, url: str, *, chunk_size: Optional[int] = None) -> str:
+        """
+        Downloads an asset into the store, unless it is already stored. Concurrent fetches of the same asset share
+        one download.
+
+        Returns:
+            str: The path of the stored file
+        """
+        path = self.path(md5ext)
+        self._pin(path)
+        try:
+            self._download(path, md5ext, url, chunk_size)
+        finally:
+            self._unpin(path)
+        self._evict()
+        return path
+
+    def fetch_data(self, md5ext: str, url: str, *, chunk_size: Optional[int] = None) -> bytes:
+        """
+        Like fetch, but returns the content of the asset. The content is read before the store is trimmed to
+        max_bytes, so it is returned even if the asset doesn't fit into the store.
+        """
+        path = self.path(md5ext)
+        self._pin(path)
+        try:
+            self._download(path, md5ext, url, chunk_size)
+            with open(path, "rb") as f:
+                data = f.read()
+        finally:
+            self._unpin(path)
+        self._evict()
+        return data
+
+    def _download(self, path: str, md5ext: str, url: str, chunk_size: Optional[int]):
+        def download():
+            if os.path.isfile(path):
+                self._touch(path)
+                return
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            download_to_file(url, path, md5=md5_from_asset_id(md5ext), chunk_size=chunk_size)
+            self._add(path, os.path.getsize(path))
+
+        self._flights.do(path, download)
+
+    def _pin(self, path: str):
+        # Pinned files are in use and are not evicted
+        with self._lock:
+            self._pinned[path] = self._pinned.get(path, 0) + 1
+
+    def _unpin(self, path: str):
+        with self._lock:
+            self._pinned[path] -= 1
+            if not self._pinned[path]:
+                del self._pinned[path]
+
+    def _add(self, path: str, size: int):
+        with self._lock:
+            if self._index is None:
+                # The size isn't known yet, it is counted (with this file) when the store is first walked
+                return
+            self._size += size - self._index.pop(path, 0)
+            self._index[path] = size
+
+    def _touch(self, path: str):
+        # The modification time is used as last-used time for the eviction
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        with self._lock:
+            if self._index is not None and path in self._index:
+                self._index.move_to_end(path)
+
+    def _files(self) -> list[tuple[float, int, str]]:
+        files = []
+        for directory, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if filename.endswith(".part"):
+                    continue
+                path = os.path.join(directory, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    def _load_index(self):
+        # Only walks the store the first time, after that the index is kept up to date (ordered by last use)
+        if self._index is None:
+            self._index = OrderedDict((path, size) for _, size, path in sorted(self._files()))
+            self._size = sum(self._index.values())
+
+    def size(self) -> int:
+        """
+        Returns the total size of the stored files in bytes.
+        """
+        with self._lock:
+            self._load_index()
+            return self._size
+
+    def _evict(self):
+        if self.max_bytes is None:
+            return
+        with self._lock:
+            self._load_index()
+            for path in list(self._index):
+                if self._size <= self.max_bytes:
+                    break
+                if path in self._pinned:
+                    continue
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                except OSError:
+                    continue
+                self._size -= self._index.pop(path)
+
+    def clear(self):
+        """
+        Deletes all stored files.
+        """
+        with self._lock:
+            for _, _, path in self._files():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._index = OrderedDict()
+            self._size = 0
+
+
+default_store: Optional[AssetStore] = None
+"""The asset store used by scratchattach (see enable_asset_store). None means assets aren't stored."""
+
+
+def enable_asset_store(root: Optional[str] = None, *, max_bytes: Optional[int] = 1024 ** 3) -> AssetStore:
+    """
+    Makes scratchattach keep downloaded assets in an on-disk store. Used by editor.AssetFile.data,
+    ProjectBody.Asset.download, download_asset, Session.download_asset and BackpackAsset.
+
+    Args:
+        root (str): The directory of the store. Defaults to ~/.cache/scratchattach/assets
+        max_bytes (int or None): Max. total size of the stored assets (1 GiB by default)
+    """
+    global default_store
+    if root is None:
+        root = os.path.join(os.path.expanduser("~"), ".cache", "scratchattach", "assets")
+    default_store = AssetStore(root, max_bytes=max_bytes)
+    return default_store
+
+
+def disable_asset_store():
+    """
+    Stops using the asset store. The stored files are kept.
+    """
+    global default_store
+    default_store = None
+
+
+def fetch_asset(md5ext: str, url: str) -> bytes:
+    """
+    Returns the content of an asset. Uses the default store if it is enabled.
+    """
+    store = default_store
+    if store is not None and store.storable(md5ext):
+        data = store.get(md5ext)
+        if data is not None:
+            return data
+        try:
+            return store.fetch_data(md5ext, url)
+        except exceptions.ChecksumError:
+            # The content doesn't match its name, so it can't be stored
+            pass
+
+    response = requests.get(url, timeout=10)
+    if response.status_code != 200:
+        raise exceptions.FetchError(f"Failed to download asset {md5ext} (status code {response.status_code})")
+    return response.content
+
+
+def save_asset(md5ext: str, url: str, path: str, *, verify: bool = False, chunk_size: Optional[int] = None):
+    """
+    Saves an asset to a file. If the default store is enabled, the asset is taken from (or downloaded into) the store,
+    otherwise it is streamed to the file directly.
+    """
+    store = default_store
+    if store is not None and store.storable(md5ext):
+        try:
+            stored_path = store.fetch(md5ext, url, chunk_size=chunk_size)
+        except exceptions.ChecksumError:
+            if verify:
+                raise
+        else:
+            # Copy to a temporary file first, so the target file is replaced atomically
+            fd, tmp_path = _create_temp_file(path)
+            try:
+                with os.fdopen(fd, "wb") as dst, open(stored_path, "rb") as src:
+                    shutil.copyfileobj(src, dst)
+                os.replace(tmp_path, path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            return
+
+    download_to_file(url, path, md5=md5_from_asset_id(md5ext) if verify else None, chunk_size=chunk_size)
@@ -0,0 +1,229 @@
+"""Asynchronous counterpart of the Requests class. Requires the aiohttp package."""
+from __future__ import annotations
+
+import asyncio
+import json as _json
+import time
+import weakref
+from typing import Optional
+
+aiohttp_err = None
+try:
+    import aiohttp
+except Exception as e:
+    aiohttp = None
+    aiohttp_err = e
+
+from . import exceptions, metrics
+from . import requests as _requests
+from .requests import Requests, ratelimiter, retry_policy, retry_statuses, _idempotent_methods
+from .retry import TransientError
+
+limit: int = 100
+"""Max. amount of simultaneously open connections per event loop"""
+limit_per_host: int = 0
+"""Max. amount of simultaneously open connections to a single host (0 means no limit)"""
+
+_sessions: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aiohttp.ClientSession] = weakref.WeakKeyDictionary()
+
+
+class AsyncResponse:
+    """
+    The response of an AsyncRequests call. Has the attributes of requests.Response that scratchattach uses,
+    so it can be handled the same way as a response returned by the Requests class.
+    """
+
+    def __init__(self, *, status_code: int, headers, content: bytes, url: str, encoding: Optional[str] = None):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.url = url
+        self.encoding = encoding or "utf-8"
+
+    def __repr__(self):
+        return f"<AsyncResponse [{self.status_code}]>"
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding, errors="replace")
+
+    def json(self):
+        return _json.loads(self.content)
+
+
+def _assert_aiohttp():
+    if aiohttp is None:
+        raise aiohttp_err or ModuleNotFoundError("The async API requires aiohttp: pip install aiohttp")
+
+
+def get_session() -> aiohttp.ClientSession:
+    """
+    Returns the pooled aiohttp session of the running event loop.
+    """
+    _assert_aiohttp()
+    loop = asyncio.get_running_loop()
+    session = _sessions.get(loop)
+    if session is None or session.closed:
+        # Cookies set by responses must never be sent with later requests (the session is shared by all logins)
+        session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=limit, limit_per_host=limit_per_host),
+            cookie_jar=aiohttp.DummyCookieJar()
+        )
+        _sessions[loop] = session
+    return session
+
+
+async def close():
+    """
+    Closes the pooled connections of the running event loop.
+    """
+    await backend.close()
+
+
+class AsyncHTTPBackend:
+    """
+    Base class of the transports used by the AsyncRequests class (the asynchronous counterpart of
+    scratchattach.utils.http_backends.HTTPBackend).
+
+    request() is called with the arguments of aiohttp.ClientSession.request, except that timeout is a number of
+    seconds (or None). It has to return an AsyncResponse and raise a TransientError for failures that are worth
+    retrying (connection errors, timeouts). Rate limiting, retries and error handling are done by the AsyncRequests
+    class, not by the backend.
+    """
+    name: str = ""
+
+    async def request(self, method: str, url: str, *, proxy: Optional[str] = None, timeout: Optional[float] = None,
+                      **kwargs) -> AsyncResponse:
+        raise NotImplementedError
+
+    async def close(self):
+        """
+        Closes the open connections of the running event loop.
+        """
+
+
+class AiohttpBackend(AsyncHTTPBackend):
+    """
+    Default backend: Sends the requests with the pooled aiohttp session of the running event loop (see get_session).
+    """
+    name = "aiohttp"
+
+    async def request(self, method: str, url: str, *, proxy: Optional[str] = None, timeout: Optional[float] = None,
+                      **kwargs) -> AsyncResponse:
+        session = get_session()
+        try:
+            async with session.request(method, url, proxy=proxy, timeout=aiohttp.ClientTimeout(total=timeout),
+                                       **kwargs) as resp:
+                return AsyncResponse(status_code=resp.status, headers=resp.headers, content=await resp.read(),
+                                     url=str(resp.url), encoding=resp.get_encoding())
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+            raise TransientError(e)
+        except aiohttp.ClientError as e:
+            raise exceptions.FetchError(e)
+
+    async def close(self):
+        session = _sessions.pop(asyncio.get_running_loop(), None)
+        if session is not None:
+            await session.close()
+
+
+backend: AsyncHTTPBackend = AiohttpBackend()
+"""The transport all asynchronous requests are sent with (see set_backend)"""
+
+
+def set_backend(new_backend: AsyncHTTPBackend) -> AsyncHTTPBackend:
+    """
+    Sets the transport that the AsyncRequests class sends requests with.
+
+    Args:
+        new_backend (AsyncHTTPBackend): An instance of AiohttpBackend (default) or of a custom AsyncHTTPBackend subclass
+
+    Returns:
+        AsyncHTTPBackend: The new backend
+    """
+    global backend
+    backend = new_backend
+    return backend
+
+
+def _proxy_for(url: str) -> Optional[str]:
+    if not _requests.proxies:
+        return None
+    return _requests.proxies.get(url.split("://")[0])
+
+
+class AsyncRequests:
+    """
+    Centralized asynchronous HTTP request handler. Mirrors the Requests class, but all methods are coroutines.
+    """
+
+    @staticmethod
+    async def _send(method, url, _on_retry=None, **kwargs) -> AsyncResponse:
+        retries = 0
+        while True:
+            await asyncio.sleep(ratelimiter.reserve(method, url))
+            r = await backend.request(method, url, proxy=_proxy_for(url), **kwargs)
+            wait = ratelimiter.feedback(method, url, r.status_code, r.headers.get("Retry-After"))
+            if r.status_code != 429 or retries >= ratelimiter.max_retries or wait > ratelimiter.max_wait:
+                break
+            retries += 1
+            if _on_retry is not None:
+                _on_retry()
+        if r.status_code in retry_statuses:
+            raise TransientError(response=r)
+        return r
+
+    @staticmethod
+    async def _request(method, url, *, errorhandling=True, params=None, timeout=None, **kwargs) -> AsyncResponse:
+        if params is not None:
+            params = {k: str(v) for k, v in params.items() if v is not None}
+        kwargs.update(params=params, timeout=timeout)
+        start = time.perf_counter()
+        retries = 0
+
+        def on_retry(*_):
+            nonlocal retries
+            retries += 1
+
+        try:
+            if method in _idempotent_methods:
+                r = await retry_policy.async_call(
+                    lambda: AsyncRequests._send(method, url, on_retry, **kwargs), on_retry=on_retry)
+            else:
+                r = await AsyncRequests._send(method, url, on_retry, **kwargs)
+        except TransientError as e:
+            if e.response is None:
+                metrics.record(method, url, None, start, retries, e.cause)
+                raise exceptions.FetchError(e.cause)
+            r = e.response
+        except exceptions.FetchError as e:
+            metrics.record(method, url, None, start, retries, e)
+            raise
+        metrics.record(method, url, r, start, retries)
+        if errorhandling:
+            Requests.check_response(r)
+        return r
+
+    @staticmethod
+    async def get(url, *, data=None, json=None, headers=None, cookies=None, timeout=None, params=None):
+        return await AsyncRequests._request("GET", url, data=data, json=json, headers=headers, cookies=cookies,
+                                            params=params, timeout=timeout)
+
+    @staticmethod
+    async def post(url, *, data=None, json=None, headers=None, cookies=None, timeout=None, params=None, errorhandling=True):
+        return await AsyncRequests._request("POST", url, data=data, json=json, headers=headers, cookies=cookies,
+                                            params=params, timeout=timeout, errorhandling=errorhandling)
+
+    @staticmethod
+    async def delete(url, *, data=None, json=None, headers=None, cookies=None, timeout=None, params=None):
+        return await AsyncRequests._request("DELETE", url, data=data, json=json, headers=headers, cookies=cookies,
+                                            params=params, timeout=timeout)
+
+    @staticmethod
+    async def put(url, *, data=None, json=None, headers=None, cookies=None, timeout=None, params=None):
+        return await AsyncRequests._request("PUT", url, data=data, json=json, headers=headers, cookies=cookies,
+                                            params=params, timeout=timeout)
@@ -0,0 +1,268 @@
+"""Response cache used by the Requests layer"""
+from __future__ import annotations
+
+import copy
+import hashlib
+import json
+import re
+import sqlite3
+import time
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from threading import Lock
+from typing import Any, Optional, Union
+
+from .http_backends import make_response
+
+default_rules: list[tuple[str, float]] = [
+    (r"^https://api\.scratch\.mit\.edu/users/[^/?]+/?$", 60),
+    (r"^https://api\.scratch\.mit\.edu/projects/\d+/?$", 60),
+    (r"^https://api\.scratch\.mit\.edu/studios/\d+/?$", 60),
+    (r"^https://api\.scratch\.mit\.edu/proxy/featured/?$", 300),
+    (r"^https://api\.scratch\.mit\.edu/news", 300),
+    (r"^https://scratch\.mit\.edu/statistics/data/", 3600),
+]
+"""The (url pattern, ttl in seconds) rules used by a ResponseCache if no rules are given"""
+
+
+@dataclass
+class CacheEntry:
+    response: Any
+    expires_at: float
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    @property
+    def fresh(self) -> bool:
+        return time.monotonic() < self.expires_at
+
+    @property
+    def revalidatable(self) -> bool:
+        return self.etag is not None or self.last_modified is not None
+
+
+class ResponseCache:
+    """
+    In-memory LRU cache for the responses of GET requests.
+
+    Only responses to urls that match one of the rules are cached. A rule is a (regex pattern, ttl in seconds) tuple,
+    the first rule whose pattern matches the url (re.search) decides the ttl.
+    When an expired entry has an ETag or a Last-Modified header, it is revalidated with a conditional request
+    (If-None-Match / If-Modified-Since) instead of being fetched again.
+
+    Responses to requests with different cookies or X-Token headers are cached separately.
+    """
+
+    def __init__(self, rules: Optional[list[tuple[Union[str, re.Pattern], float]]] = None, *, max_entries: int = 1024):
+        if rules is None:
+            rules = default_rules
+        self.rules = [(re.compile(pattern), ttl) for pattern, ttl in rules]
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+        self._rule_stats: defaultdict[str, dict[str, int]] = defaultdict(lambda: {"hits": 0, "misses": 0})
+        self._entries: OrderedDict[tuple, CacheEntry] = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def rule_for(self, url: str) -> Optional[tuple[re.Pattern, float]]:
+        """
+        Returns the rule that applies to the url, or None if responses to the url aren't cached.
+        """
+        for pattern, ttl in self.rules:
+            if pattern.search(url):
+                return pattern, ttl
+        return None
+
+    @staticmethod
+    def key(url: str, *, params=None, headers=None, cookies=None) -> tuple:
+        params_key = tuple(sorted((str(k), str(v)) for k, v in params.items())) if params else ()
+        cookies_key = tuple(sorted((str(k), str(v)) for k, v in cookies.items())) if cookies else ()
+        xtoken = None
+        if headers:
+            xtoken = next((v for k, v in headers.items() if k.lower() == "x-token"), None)
+        return url, params_key, cookies_key, xtoken
+
+    def get(self, key: tuple) -> Optional[CacheEntry]:
+        """
+        Returns the entry saved for the key (no matter whether it is fresh) or None.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def record(self, pattern: re.Pattern, *, hit: bool, revalidated: bool = False):
+        with self._lock:
+            if hit:
+                self.hits += 1
+                self._rule_stats[pattern.pattern]["hits"] += 1
+            else:
+                self.misses += 1
+                self._rule_stats[pattern.pattern]["misses"] += 1
+            if revalidated:
+                self.revalidations += 1
+
+    def store(self, key: tuple, response, ttl: float) -> CacheEntry:
+        entry = CacheEntry(response, time.monotonic() + ttl, response.headers.get("ETag"),
+                           response.headers.get("Last-Modified"))
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return entry
+
+    def refresh(self, key: tuple, entry: CacheEntry, ttl: float):
+        """
+        Marks an entry as fresh again (after the server confirmed it is unchanged).
+        """
+        entry.expires_at = time.monotonic() + ttl
+
+    @staticmethod
+    def conditional_headers(entry: CacheEntry, headers: Optional[dict]) -> dict:
+        """
+        Returns a copy of the headers with the validators of the entry added.
+        """
+        headers = dict(headers or {})
+        if entry.etag is not None:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified is not None:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    @staticmethod
+    def copy_response(response):
+        # Callers get their own response object, so they can't change the cached one
+        return copy.copy(response)
+
+    def invalidate(self, url: Optional[str] = None):
+        """
+        Removes all entries for the url, or all entries if no url is given.
+        """
+        with self._lock:
+            if url is None:
+                self._entries.clear()
+                return
+            for key in [key for key in self._entries if key[0] == url]:
+                del self._entries[key]
+
+    def clear(self):
+        self.invalidate()
+
+    def stats(self) -> dict:
+        """
+        Returns the hit, miss, revalidation and eviction counters, overall and for every rule.
+        """
+        entries = len(self)
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "revalidations": self.revalidations,
+                "evictions": self.evictions,
+                "entries": entries,
+                "rules": {pattern: dict(counters) for pattern, counters in self._rule_stats.items()},
+            }
+
+
+class SQLiteResponseCache(ResponseCache):
+    """
+    ResponseCache that keeps the responses in an SQLite database file, so they survive restarts.
+
+    Besides max_entries, the total size of the cached response bodies can be limited with max_bytes.
+    The least recently used responses are evicted first.
+
+    The cache keys contain the cookies and X-Token of the requests, therefore only their hashes are written to the file.
+    """
+
+    def __init__(self, path: str, rules: Optional[list[tuple[Union[str, re.Pattern], float]]] = None, *,
+                 max_entries: int = 1024, max_bytes: Optional[int] = None):
+        super().__init__(rules, max_entries=max_entries)
+        self.path = path
+        self.max_bytes = max_bytes
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._db:
+            columns = [row[1] for row in self._db.execute("PRAGMA table_info(responses)")]
+            if columns and "request_url" not in columns:
+                # Written by an older version. It's only a cache, so it's started over.
+                self._db.execute("DROP TABLE responses")
+            # request_url is the url the response is cached for (used by invalidate), url is the url of the response
+            # (which contains the query string and can be a redirect target)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, request_url TEXT, url TEXT, status INTEGER, headers TEXT, content BLOB, "
+                "encoding TEXT, expires_at REAL, etag TEXT, last_modified TEXT, last_used REAL, size INTEGER)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_request_url ON responses (request_url)")
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    @staticmethod
+    def _hash(key: tuple) -> str:
+        return hashlib.sha256(json.dumps(key, default=str).encode()).hexdigest()
+
+    def get(self, key: tuple) -> Optional[CacheEntry]:
+        hashed = self._hash(key)
+        with self._lock, self._db:
+            row = self._db.execute(
+                "SELECT url, status, headers, content, encoding, expires_at, etag, last_modified "
+                "FROM responses WHERE key = ?", (hashed,)).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), hashed))
+
+        url, status, headers, content, encoding, expires_at, etag, last_modified = row
+        response = make_response(status_code=status, headers=json.loads(headers), content=content, url=url,
+                                 encoding=encoding)
+        # Wall clock time is stored in the file, CacheEntry uses monotonic time
+        return CacheEntry(response, time.monotonic() + expires_at - time.time(), etag, last_modified)
+
+    def store(self, key: tuple, response, ttl: float) -> CacheEntry:
+        entry = CacheEntry(response, time.monotonic() + ttl, response.headers.get("ETag"),
+                           response.headers.get("Last-Modified"))
+        content = response.content
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (self._hash(key), key[0], response.url, response.status_code, json.dumps(dict(response.headers)), content,
+                 response.encoding, now + ttl, entry.etag, entry.last_modified, now, len(content)))
+            self._evict()
+        return entry
+
+    def _evict(self):
+        # Must be called with the lock held
+        count, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        while count > self.max_entries or (self.max_bytes is not None and size > self.max_bytes and count > 0):
+            key, entry_size = self._db.execute(
+                "SELECT key, size FROM responses ORDER BY last_used LIMIT 1").fetchone()
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            count -= 1
+            size -= entry_size
+            self.evictions += 1
+
+    def refresh(self, key: tuple, entry: CacheEntry, ttl: float):
+        super().refresh(key, entry, ttl)
+        with self._lock, self._db:
+            self._db.execute("UPDATE responses SET expires_at = ? WHERE key = ?", (time.time() + ttl, self._hash(key)))
+
+    def invalidate(self, url: Optional[str] = None):
+        with self._lock, self._db:
+            if url is None:
+                self._db.execute("DELETE FROM responses")
+            else:
+                self._db.execute("DELETE FROM responses WHERE request_url = ?", (url,))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,135 @@
+"""Record / replay transport for the Requests layer (for offline tests and benchmarks)"""
+from __future__ import annotations
+
+import base64
+import gzip
+import json
+import time
+from collections import defaultdict
+from threading import Lock
+from typing import Optional, Union
+
+import requests
+
+from .http_backends import HTTPBackend, make_response
+
+sensitive_headers: tuple[str, ...] = ("set-cookie", "authorization", "x-token")
+"""Response headers that are never written to a cassette (compared case-insensitively)"""
+
+
+class CassetteBackend(HTTPBackend):
+    """
+    HTTP backend that records responses to a cassette file and replays them later without network access.
+
+    The cassette is a gzip compressed JSON lines file. Every line holds one response, keyed by the method and
+    the full url (including the query parameters). When the same request was recorded multiple times, the responses
+    are replayed in the recorded order (the last one is repeated), so replays are deterministic.
+    The response headers that can hold credentials (see sensitive_headers) are left out of the recorded responses,
+    so cassettes of logged in sessions can be shared.
+
+    Args:
+        path (str): Path of the cassette file
+
+    Keyword Arguments:
+        mode (str): "record" (send the requests with the inner backend and write the responses to the cassette,
+            replacing the responses recorded before), "replay" (only answer from the cassette) or "auto" (replay
+            recorded requests, record the others and append them to the cassette)
+        inner (HTTPBackend): The backend used for recording. Defaults to the requests backend.
+        latency (float or str or None): Simulated latency when replaying: None (no delay), a fixed amount of seconds
+            or "recorded" (the latency that was measured when the response was recorded)
+    """
+    name = "cassette"
+
+    def __init__(self, path: str, *, mode: str = "replay", inner: Optional[HTTPBackend] = None,
+                 latency: Union[float, str, None] = None):
+        if mode not in ("record", "replay", "auto"):
+            raise ValueError("mode must be 'record', 'replay' or 'auto'")
+        if inner is None:
+            from .requests import RequestsBackend
+            inner = RequestsBackend()
+        self.path = path
+        self.mode = mode
+        self.inner = inner
+        self.latency = latency
+        self._recorded: defaultdict[tuple[str, str], list[dict]] = defaultdict(list)
+        self._replayed: defaultdict[tuple[str, str], int] = defaultdict(int)
+        self._file = None
+        # Whether the cassette was already opened for writing (a new recording starts with an empty cassette)
+        self._opened = False
+        self._lock = Lock()
+        if mode != "record":
+            self._load()
+
+    def _load(self):
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._recorded[(entry["method"], entry["url"])].append(entry)
+        except FileNotFoundError:
+            if self.mode == "replay":
+                raise
+
+    @staticmethod
+    def request_url(method: str, url: str, params: Optional[dict] = None) -> str:
+        # The key of a request is its method and its full url (normalized like requests does it)
+        return requests.Request(method, url, params=params).prepare().url
+
+    def request(self, method: str, url: str, *, proxies: Optional[dict] = None, **kwargs) -> requests.Response:
+        key = (method.upper(), self.request_url(method, url, kwargs.get("params")))
+        with self._lock:
+            entries = self._recorded.get(key)
+            if self.mode != "record" and entries:
+                index = min(self._replayed[key], len(entries) - 1)
+                self._replayed[key] += 1
+                entry = entries[index]
+            else:
+                entry = None
+        if entry is not None:
+            return self._replay(entry)
+        if self.mode == "replay":
+            raise LookupError(f"No recorded response for {key[0]} {key[1]} in cassette {self.path}")
+
+        start = time.perf_counter()
+        response = self.inner.request(method, url, proxies=proxies, **kwargs)
+        self._record(key, response, time.perf_counter() - start)
+        return response
+
+    def _replay(self, entry: dict) -> requests.Response:
+        delay = entry["elapsed"] if self.latency == "recorded" else self.latency
+        if delay:
+            time.sleep(delay)
+        return make_response(status_code=entry["status"], headers=entry["headers"],
+                             content=base64.b64decode(entry["content"]), url=entry["response_url"],
+                             encoding=entry["encoding"], reason=entry["reason"])
+
+    def _record(self, key: tuple[str, str], response: requests.Response, elapsed: float):
+        entry = {
+            "method": key[0],
+            "url": key[1],
+            "status": response.status_code,
+            "reason": response.reason,
+            "headers": {name: value for name, value in response.headers.items()
+                        if name.lower() not in sensitive_headers},
+            "content": base64.b64encode(response.content).decode("ascii"),
+            "encoding": response.encoding,
+            "response_url": response.url,
+            "elapsed": round(elapsed, 4),
+        }
+        with self._lock:
+            self._recorded[key].append(entry)
+            if self._file is None:
+                # Appending to a gzip file adds a new gzip member, gzip.open reads all of them
+                file_mode = "wt" if self.mode == "record" and not self._opened else "at"
+                self._file = gzip.open(self.path, file_mode, encoding="utf-8")
+                self._opened = True
+            self._file.write(json.dumps(entry) + "\n")
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        self.inner.close()
@@ -1,11 +1,15 @@
 """v2 ready: Common functions used by various internal modules"""
 from __future__ import annotations
 
-from typing import Optional, Final, Any, TypeVar, Callable, TYPE_CHECKING, Union
+import asyncio
+from typing import Optional, Final, Any, TypeVar, Callable, Awaitable, Iterable, Iterator, TYPE_CHECKING, Union
+from concurrent.futures import ThreadPoolExecutor
 from threading import Lock
 
 from . import exceptions
 from .requests import Requests as requests
+from .identity_map import IdentityMap
+from .singleflight import SingleFlight
 
 from ..site import _base
 
@@ -63,39 +67,72 @@ empty_project_json: Final = {
 }
 
 
+prefetch_workers: int = 1
+"""Default amount of pages that api_iterative_data / api_iterative request concurrently (1 = one after another)"""
+
+
+def _fetch_pages(fetch_func: Callable[[int, int], list], offsets: range, max_req_limit: int,
+                 max_workers: int) -> Iterator[Optional[list]]:
+    # Yields the pages in order. With max_workers > 1, the pages are requested in windows of max_workers concurrent
+    # requests. The requests still go through the shared rate limiter of the Requests layer.
+    if max_workers <= 1 or len(offsets) <= 1:
+        for offs in offsets:
+            yield fetch_func(offs, max_req_limit)
+        return
+
+    pool = ThreadPoolExecutor(max_workers=min(max_workers, len(offsets)))
+    try:
+        for i in range(0, len(offsets), max_workers):
+            futures = [pool.submit(fetch_func, offs, max_req_limit) for offs in offsets[i:i + max_workers]]
+            for future in futures:
+                yield future.result()
+    finally:
+        # Pages after the last one (or after an error) are not needed anymore
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
 def api_iterative_data(fetch_func: Callable[[int, int], list], limit: int, offset: int, max_req_limit: int = 40,
-                       unpack: bool = True) -> list:
+                       unpack: bool = True, *, max_workers: Optional[int] = None) -> list:
     """
     Iteratively gets data by calling fetch_func with a moving offset and a limit.
     Once fetch_func returns None, the retrieval is completed.
+
+    If max_workers is > 1, up to max_workers pages are requested concurrently (defaults to prefetch_workers).
+    The results are still returned in order and nothing after the first short page is used.
     """
     if limit is None:
         limit = max_req_limit
+    if max_workers is None:
+        max_workers = prefetch_workers
 
     end = offset + limit
     api_data = []
-    for offs in range(offset, end, max_req_limit):
-        # Mimic actual scratch by only requesting the max amount
-        data = fetch_func(offs, max_req_limit)
-        if data is None:
-            break
+    # Mimic actual scratch by only requesting the max amount
+    pages = _fetch_pages(fetch_func, range(offset, end, max_req_limit), max_req_limit, max_workers)
+    try:
+        for data in pages:
+            if data is None:
+                break
 
-        if unpack:
-            api_data.extend(data)
-        else:
-            api_data.append(data)
+            if unpack:
+                api_data.extend(data)
+            else:
+                api_data.append(data)
 
-        if len(data) < max_req_limit:
-            break
+            if len(data) < max_req_limit:
+                break
+    finally:
+        pages.close()
 
     api_data = api_data[:limit]
     return api_data
 
 
 def api_iterative(url: str, *, limit: int, offset: int, max_req_limit: int = 40, add_params: str = "",
-                  _headers: Optional[dict] = None, cookies: Optional[dict] = None):
+                  _headers: Optional[dict] = None, cookies: Optional[dict] = None, max_workers: Optional[int] = None):
     """
     Function for getting data from one of Scratch's iterative JSON API endpoints (like /users/<user>/followers, or /users/<user>/projects)
+    max_workers is the amount of pages that are requested concurrently (see api_iterative_data).
     """
     if _headers is None:
         _headers = headers.copy()
@@ -122,41 +159,263 @@ def api_iterative(url: str, *, limit: int, offset: int, max_req_limit: int = 40,
         return resp
 
     api_data = api_iterative_data(
-        fetch, limit, offset, max_req_limit=max_req_limit, unpack=True
+        fetch, limit, offset, max_req_limit=max_req_limit, unpack=True, max_workers=max_workers
     )
     return api_data
 
+def api_iterative_gen(fetch_func: Callable[[int, int], list], limit: Optional[int] = None, offset: int = 0,
+                      max_req_limit: int = 40) -> Iterator:
+    """
+    Lazy version of api_iterative_data: Yields the items one page after another. The next page is only requested
+    once the consumer has used up the previous one, so no more pages are requested after the consumer stops.
+    A limit of None means that all items are yielded.
+    """
+    remaining = limit
+    offs = offset
+    while remaining is None or remaining > 0:
+        data = fetch_func(offs, max_req_limit)
+        if data is None:
+            return
+        yield from data if remaining is None else data[:remaining]
+
+        if remaining is not None:
+            remaining -= len(data)
+        if len(data) < max_req_limit:
+            return
+        offs += max_req_limit
+
+
+def api_iterative_iter(url: str, *, limit: Optional[int] = None, offset: int = 0, max_req_limit: int = 40,
+                       add_params: str = "", _headers: Optional[dict] = None, cookies: Optional[dict] = None) -> Iterator:
+    """
+    Lazy version of api_iterative: Returns a generator that yields the raw items page by page.
+    """
+    if _headers is None:
+        _headers = headers.copy()
+    if cookies is None:
+        cookies = {}
+
+    if offset < 0:
+        raise exceptions.BadRequest("offset parameter must be >= 0")
+    if limit is not None and limit < 0:
+        raise exceptions.BadRequest("limit parameter must be >= 0")
+
+    def fetch(off: int, lim: int):
+        resp = requests.get(
+            f"{url}?limit={lim}&offset={off}{add_params}", headers=_headers, cookies=cookies, timeout=10
+        ).json()
+
+        if not resp:
+            return None
+        if resp == {"code": "BadRequest", "message": ""}:
+            raise exceptions.BadRequest("The passed arguments are invalid")
+        return resp
+
+    return api_iterative_gen(fetch, limit, offset, max_req_limit=max_req_limit)
+
+
+async def async_api_iterative_data(fetch_func: Callable[[int, int], Awaitable[list]], limit: int, offset: int,
+                                   max_req_limit: int = 40, unpack: bool = True, *,
+                                   max_workers: Optional[int] = None) -> list:
+    """
+    Asynchronous version of api_iterative_data. fetch_func has to be a coroutine function.
+    With max_workers > 1, windows of max_workers pages are requested concurrently.
+    """
+    if limit is None:
+        limit = max_req_limit
+    if max_workers is None:
+        max_workers = prefetch_workers
+    max_workers = max(1, max_workers)
+
+    offsets = range(offset, offset + limit, max_req_limit)
+    api_data = []
+    for i in range(0, len(offsets), max_workers):
+        pages = await asyncio.gather(*(fetch_func(offs, max_req_limit) for offs in offsets[i:i + max_workers]))
+        for data in pages:
+            if data is None:
+                return api_data[:limit]
+
+            if unpack:
+                api_data.extend(data)
+            else:
+                api_data.append(data)
+
+            if len(data) < max_req_limit:
+                return api_data[:limit]
+
+    api_data = api_data[:limit]
+    return api_data
+
+
+async def async_api_iterative(url: str, *, limit: int, offset: int, max_req_limit: int = 40, add_params: str = "",
+                              _headers: Optional[dict] = None, cookies: Optional[dict] = None,
+                              max_workers: Optional[int] = None):
+    """
+    Asynchronous version of api_iterative. Requires aiohttp.
+    """
+    from .async_requests import AsyncRequests
+    if _headers is None:
+        _headers = headers.copy()
+    if cookies is None:
+        cookies = {}
+
+    if offset < 0:
+        raise exceptions.BadRequest("offset parameter must be >= 0")
+    if limit < 0:
+        raise exceptions.BadRequest("limit parameter must be >= 0")
+
+    async def fetch(off: int, lim: int):
+        """
+        Performs a single API request
+        """
+        resp = (await AsyncRequests.get(
+            f"{url}?limit={lim}&offset={off}{add_params}", headers=_headers, cookies=cookies, timeout=10
+        )).json()
+
+        if not resp:
+            return None
+        if resp == {"code": "BadRequest", "message": ""}:
+            raise exceptions.BadRequest("The passed arguments are invalid")
+        return resp
+
+    return await async_api_iterative_data(
+        fetch, limit, offset, max_req_limit=max_req_limit, unpack=True, max_workers=max_workers
+    )
+
+
+def _make_object(identificator_name, identificator, __class: type[C], session=None) -> C:
+    # Internal function: Builds the object that _get_object / _async_get_object update
+    from ..site import project
+    use_class: type = __class
+    if __class is project.PartialProject:
+        use_class = project.Project
+        assert issubclass(use_class, __class)
+    return use_class(**{identificator_name: identificator, "_session": session})
+
+
+def _check_object(r, _object: C, identificator_name, identificator, __class: type[C], NotFoundException,
+                  session=None) -> C:
+    # Internal function: Handles the return value of the update method called by _get_object / _async_get_object
+    from ..site import project
+    if r == "429":
+        raise exceptions.Response429(
+            "Your network is blocked or rate-limited by Scratch.\n"
+            "If you're using an online IDE like replit.com, try running the code on your computer.")
+    if not r:
+        # Target is unshared. The cases that this can happen in are hardcoded:
+        if __class is project.PartialProject:  # Case: Target is an unshared project.
+            _object = project.PartialProject(**{identificator_name: identificator,
+                                             "shared": False, "_session": session})
+            assert isinstance(_object, __class)
+            return _object
+        else:
+            raise NotFoundException
+    else:
+        return _object
+
+
+_object_flights = SingleFlight()
+
+identity_map: Optional[IdentityMap] = None
+"""Opt-in identity map (see enable_identity_map). None means every lookup fetches a new object."""
+
+
+def enable_identity_map(*, max_entries: int = 1024, ttl: float = 60) -> IdentityMap:
+    """
+    Makes get_user, get_project, session.connect_user, comment.author() etc. reuse the objects they returned before
+    (for the same class, identifier and session) for ttl seconds, instead of fetching a new object every time.
+
+    Returns:
+        scratchattach.utils.identity_map.IdentityMap: The identity map. Call .invalidate() on it to drop objects.
+    """
+    global identity_map
+    identity_map = IdentityMap(max_entries=max_entries, ttl=ttl)
+    return identity_map
+
+
+def disable_identity_map():
+    global identity_map
+    identity_map = None
+
+
 def _get_object(identificator_name, identificator, __class: type[C], NotFoundException, session=None) -> C:
     # Internal function: Generalization of the process ran by get_user, get_studio etc.
     # Builds an object of class that is inheriting from BaseSiteComponent
     # # Class must inherit from BaseSiteComponent
-    from ..site import project
-    try:
-        use_class: type = __class
-        if __class is project.PartialProject:
-            use_class = project.Project
-            assert issubclass(use_class, __class)
-        _object = use_class(**{identificator_name: identificator, "_session": session})
-        r = _object.update()
-        if r == "429":
-            raise exceptions.Response429(
-                "Your network is blocked or rate-limited by Scratch.\n"
-                "If you're using an online IDE like replit.com, try running the code on your computer.")
-        if not r:
-            # Target is unshared. The cases that this can happen in are hardcoded:
-            if __class is project.PartialProject:  # Case: Target is an unshared project.
-                _object = project.PartialProject(**{identificator_name: identificator,
-                                                 "shared": False, "_session": session})
-                assert isinstance(_object, __class)
-                return _object
-            else:
-                raise NotFoundException
-        else:
+    # Concurrent calls for the same object (and session) share one fetch and get the same object
+    _identity_map = identity_map
+    key = IdentityMap.key(__class, identificator_name, identificator, session)
+    if _identity_map is not None:
+        _object = _identity_map.get(key)
+        if _object is not None:
             return _object
+
+    def fetch():
+        try:
+            _object = _make_object(identificator_name, identificator, __class, session)
+            r = _object.update()
+            _object = _check_object(r, _object, identificator_name, identificator, __class, NotFoundException,
+                                    session)
+        except KeyError as e:
+            raise NotFoundException(f"Key error at key {e} when reading API response")
+        if _identity_map is not None:
+            _identity_map.put(key, _object)
+        return _object
+
+    return _object_flights.do(key, fetch)[0]
+
+
+def _get_objects(identificator_name, identificators: Iterable, __class: type[C], NotFoundException, session=None,
+                 max_workers: int = 8, errors: Optional[dict] = None) -> tuple[dict[Any, C], list]:
+    # Internal function: Bulk version of _get_object used by get_users, get_projects etc.
+    # Duplicate identificators are only fetched once. Returns the found objects (by identificator, in input order)
+    # and the identificators that weren't found. Other errors (e.g. rate limits) are raised, or, if an errors dict
+    # is given, saved in it (identificator -> exception) so the other objects are still fetched.
+    identificators = list(dict.fromkeys(identificators))
+    results: dict[Any, Optional[C]] = {}
+
+    def fetch(identificator):
+        try:
+            results[identificator] = _get_object(identificator_name, identificator, __class, NotFoundException, session)
+        except NotFoundException:
+            results[identificator] = None
+        except Exception as e:
+            if errors is None:
+                raise
+            errors[identificator] = e
+
+    if max_workers <= 1 or len(identificators) <= 1:
+        for identificator in identificators:
+            fetch(identificator)
+    else:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(identificators))) as pool:
+            # Raises the first error (if any)
+            for future in [pool.submit(fetch, identificator) for identificator in identificators]:
+                future.result()
+
+    found = {i: results[i] for i in identificators if results.get(i) is not None}
+    not_found = [i for i in identificators if i in results and results[i] is None]
+    return found, not_found
+
+
+async def _async_get_object(identificator_name, identificator, __class: type[C], NotFoundException, session=None) -> C:
+    # Internal function: Asynchronous version of _get_object
+    _identity_map = identity_map
+    key = IdentityMap.key(__class, identificator_name, identificator, session)
+    if _identity_map is not None:
+        _object = _identity_map.get(key)
+        if _object is not None:
+            return _object
+
+    try:
+        _object = _make_object(identificator_name, identificator, __class, session)
+        r = await _object.async_update()
+        _object = _check_object(r, _object, identificator_name, identificator, __class, NotFoundException, session)
     except KeyError as e:
         raise NotFoundException(f"Key error at key {e} when reading API response")
-    except Exception as e:
-        raise e
+    if _identity_map is not None:
+        _identity_map.put(key, _object)
+    return _object
 
 
 def webscrape_count(raw, text_before, text_after, cls: type = int) -> int | Any:
@@ -178,6 +437,24 @@ def parse_object_list(raw, __class: type[C], session=None, primary_key="id") ->
     return results
 
 
+def iter_object_list(raw: Iterable, __class: type[C], session=None, primary_key="id",
+                     stop_when: Optional[Callable[[C], bool]] = None) -> Iterator[C]:
+    """
+    Lazy version of parse_object_list. If stop_when is provided, the iteration stops at the first object that
+    stop_when returns True for (that object isn't yielded).
+    """
+    for raw_dict in raw:
+        try:
+            _obj = __class(**{primary_key: raw_dict[primary_key], "_session": session})
+            _obj._update_from_dict(raw_dict)
+        except Exception as e:
+            print("Warning raised by scratchattach: failed to parse ", raw_dict, "error", e)
+            continue
+        if stop_when is not None and stop_when(_obj):
+            return
+        yield _obj
+
+
 class LockEvent:
     """
     Can be waited on and triggered. Not to be confused with threading.Event, which has to be reset.
@@ -0,0 +1,84 @@
+"""Streaming downloads to files"""
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import secrets
+from typing import Optional
+
+from . import exceptions
+from .requests import Requests as requests
+
+default_chunk_size: int = 64 * 1024
+"""Default amount of bytes that are read from the network and written to the file at once"""
+
+_md5_pattern = re.compile(r"^[0-9a-fA-F]{32}$")
+
+
+
+def _create_temp_file(path: str) -> tuple[int, str]:
+    # Like tempfile.mkstemp, creates a new temporary file (suffix .part) next to the file at path and returns its
+    # descriptor and path. The temporary file replaces the target file later, so it is created with the mode open()
+    # would give the target file (0666 minus the current umask, applied by the kernel) instead of 0600.
+    directory = os.path.dirname(os.path.abspath(path))
+    while True:
+        tmp_path = os.path.join(directory, f"tmp{secrets.token_hex(8)}.part")
+        try:
+            return os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0), 0o666), tmp_path
+        except FileExistsError:
+            continue
+
+
+def md5_from_asset_id(asset_id_with_file_ext: str) -> Optional[str]:
+    """
+    Returns the md5 checksum contained in an asset id like "83a9787d4cb6f3b7632b4ddfebf74367.wav",
+    or None if the asset id isn't an md5 checksum.
+    """
+    md5 = str(asset_id_with_file_ext).split(".")[0]
+    return md5.lower() if _md5_pattern.match(md5) else None
+
+
+def download_to_file(url: str, path: str, *, md5: Optional[str] = None, chunk_size: Optional[int] = None,
+                     headers: Optional[dict] = None, cookies: Optional[dict] = None, timeout=10) -> str:
+    """
+    Downloads the response body of a GET request to a file chunk by chunk, so it is never fully held in memory.
+
+    The body is written to a temporary file next to the target file first, which is then renamed to the target file.
+    If the download fails, the target file is left untouched.
+
+    Args:
+        url (str): The url to download
+        path (str): The path of the file the body is saved to
+
+    Keyword Arguments:
+        md5 (str): If provided, the md5 checksum of the body is compared to it. Raises ChecksumError if it differs.
+        chunk_size (int): Size of the chunks the body is read and written in. Defaults to download.default_chunk_size.
+
+    Returns:
+        str: The md5 checksum of the downloaded body
+    """
+    if chunk_size is None:
+        chunk_size = default_chunk_size
+    response = requests.get(url, headers=headers, cookies=cookies, timeout=timeout, stream=True)
+    try:
+        if response.status_code != 200:
+            raise exceptions.FetchError(f"Download of {url} failed with status code {response.status_code}")
+
+        checksum = hashlib.md5()
+        fd, tmp_path = _create_temp_file(path)
+        try:
+            with os.fdopen(fd, "wb", buffering=chunk_size) as f:
+                for chunk in response.iter_content(chunk_size):
+                    checksum.update(chunk)
+                    f.write(chunk)
+            if md5 is not None and checksum.hexdigest() != md5.lower():
+                raise exceptions.ChecksumError(
+                    f"md5 checksum of {url} is {checksum.hexdigest()}, expected {md5.lower()}")
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+    finally:
+        response.close()
+    return checksum.hexdigest()
@@ -106,6 +106,12 @@ class FetchError(Exception):
     """
 
 
+class ChecksumError(FetchError):
+    """
+    Raised when the md5 checksum of a downloaded file doesn't match the expected one (the file is not saved).
+    """
+
+
 class BadRequest(Exception):
     """
     Raised when the Scratch API responds with a "Bad Request" error message. This can have various reasons. Make sure all provided arguments are valid.
@@ -0,0 +1,149 @@
+"""Transports the Requests class can send its requests with"""
+from __future__ import annotations
+
+from threading import Lock
+from typing import Optional
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from .retry import TransientError
+
+httpx_err = None
+try:
+    import httpx
+except Exception as e:
+    httpx = None
+    httpx_err = e
+
+
+class HTTPBackend:
+    """
+    Base class of the transports used by the Requests class.
+
+    request() is called with the arguments of requests.request. It has to return a requests.Response
+    (see make_response) and raise a TransientError for failures that are worth retrying (connection errors, timeouts).
+    Rate limiting, retries, caching and error handling are done by the Requests class, not by the backend.
+    """
+    name: str = ""
+
+    def request(self, method: str, url: str, *, proxies: Optional[dict] = None, **kwargs) -> requests.Response:
+        raise NotImplementedError
+
+    def close(self):
+        """
+        Closes all open connections.
+        """
+
+
+def make_response(*, status_code: int, headers, content: bytes, url: str, encoding: Optional[str] = None,
+                  reason: Optional[str] = None) -> requests.Response:
+    """
+    Builds a requests.Response, so responses of all backends can be handled the same way.
+    """
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers = CaseInsensitiveDict(headers)
+    response._content = content
+    response._content_consumed = True
+    response.url = url
+    response.encoding = encoding
+    response.reason = reason
+    return response
+
+
+class _StreamReader:
+    # File-like wrapper around a streamed httpx response
+    def __init__(self, response, chunk_size: int = 64 * 1024):
+        self._response = response
+        self._chunks = response.iter_bytes(chunk_size)
+        self._buffer = bytearray()
+
+    def read(self, amt: Optional[int] = None, *args, **kwargs) -> bytes:
+        while amt is None or len(self._buffer) < amt:
+            try:
+                self._buffer += next(self._chunks)
+            except StopIteration:
+                self.close()
+                break
+        if amt is None:
+            amt = len(self._buffer)
+        data = bytes(self._buffer[:amt])
+        del self._buffer[:amt]
+        return data
+
+    def close(self):
+        self._response.close()
+
+    def release_conn(self):
+        self.close()
+
+
+class HttpxBackend(HTTPBackend):
+    """
+    Sends the requests with httpx. With http2=True (requires the h2 package: pip install httpx[http2]),
+    concurrent requests to the same host are multiplexed over a single connection.
+    """
+    name = "httpx"
+
+    def __init__(self, *, http2: bool = True, max_connections: int = 100, max_keepalive_connections: int = 20):
+        if httpx is None:
+            raise httpx_err or ModuleNotFoundError("The httpx backend requires httpx: pip install httpx[http2]")
+        self.http2 = http2
+        self.limits = httpx.Limits(max_connections=max_connections,
+                                   max_keepalive_connections=max_keepalive_connections)
+        self._client: Optional[httpx.Client] = None
+        self._client_proxies = None
+        self._lock = Lock()
+
+    def _get_client(self, proxies: Optional[dict]) -> httpx.Client:
+        # The client is created again if the proxies change (like the pooled sessions of the requests backend)
+        with self._lock:
+            if self._client is None or proxies != self._client_proxies:
+                if self._client is not None:
+                    self._client.close()
+                mounts = None
+                if proxies:
+                    mounts = {f"{scheme}://": httpx.HTTPTransport(proxy=proxy, http2=self.http2, limits=self.limits)
+                              for scheme, proxy in proxies.items()}
+                # Redirects are followed, like the requests library does
+                self._client = httpx.Client(http2=self.http2, limits=self.limits, mounts=mounts,
+                                            follow_redirects=True)
+                self._client_proxies = dict(proxies) if proxies else None
+            return self._client
+
+    def request(self, method: str, url: str, *, proxies: Optional[dict] = None, data=None, json=None, headers=None,
+                cookies=None, params=None, timeout=None, files=None, stream: bool = False,
+                **kwargs) -> requests.Response:
+        headers = dict(headers or {})
+        if cookies:
+            # httpx deprecated per-request cookies, and response cookies must not be kept anyway
+            headers["Cookie"] = "; ".join(f"{k}={v}" for k, v in cookies.items())
+        if params:
+            params = {k: v for k, v in params.items() if v is not None}
+        content = None
+        if isinstance(data, (str, bytes)):
+            content, data = data, None
+
+        try:
+            client = self._get_client(proxies)
+            request = client.build_request(method, url, content=content, data=data, json=json, headers=headers,
+                                           params=params, files=files, timeout=timeout, **kwargs)
+            r = client.send(request, stream=stream)
+        except (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError) as e:
+            raise TransientError(e)
+        if stream:
+            response = make_response(status_code=r.status_code, headers=r.headers.items(), content=False,
+                                     url=str(r.url), encoding=r.encoding, reason=r.reason_phrase)
+            # requests.Response.iter_content reads the body from raw
+            response._content_consumed = False
+            response.raw = _StreamReader(r)
+            return response
+        return make_response(status_code=r.status_code, headers=r.headers.items(), content=r.content,
+                             url=str(r.url), encoding=r.encoding, reason=r.reason_phrase)
+
+    def close(self):
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
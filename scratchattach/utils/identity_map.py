@@ -0,0 +1,73 @@
+"""Identity map that lets repeated lookups of the same site component reuse one object"""
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Hashable, Optional
+
+
+class IdentityMap:
+    """
+    Bounded LRU map from (class, primary key, session) to an already updated site component (user, project, studio ...).
+
+    An object is reused for ttl seconds after it was fetched, after that it is fetched (and updated) again.
+    Once the map holds max_entries objects, the least recently used ones are dropped.
+    """
+
+    def __init__(self, *, max_entries: int = 1024, ttl: float = 60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, tuple[Any, float]] = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def key(__class: type, identificator_name: str, identificator, session=None) -> tuple:
+        return __class, identificator_name, identificator, session
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Returns the object stored for the key, or None if there is none or it is outdated.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() >= entry[1]:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, obj: Any):
+        with self._lock:
+            self._entries[key] = (obj, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, __class: Optional[type] = None, identificator=None):
+        """
+        Removes the objects of a class (only the one with the given identificator, if provided),
+        or all objects if no class is given.
+        """
+        with self._lock:
+            if __class is None:
+                self._entries.clear()
+                return
+            for key in [key for key in self._entries
+                        if key[0] is __class and (identificator is None or key[2] == identificator)]:
+                del self._entries[key]
+
+    def clear(self):
+        self.invalidate()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
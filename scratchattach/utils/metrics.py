@@ -0,0 +1,242 @@
+"""Instrumentation hooks and metrics for the Requests layer"""
+from __future__ import annotations
+
+import bisect
+import re
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from threading import Lock
+from typing import Any, Callable, Optional
+from urllib.parse import urlsplit
+
+
+@dataclass
+class RequestRecord:
+    """
+    Describes a finished request. Passed to every hook.
+
+    Attributes:
+        endpoint: The endpoint template of the url, e.g. "api.scratch.mit.edu/users/{username}/followers/"
+
+        status_code: None if the request failed without a response
+
+        elapsed: Seconds from the first attempt until the response (including retries and rate limiter waits)
+
+        size: Size of the response body in bytes
+
+        retries: How often the request was retried (because of 429 errors, connection errors or 5xx responses)
+
+        error: The exception if the request failed without a response
+    """
+    method: str
+    url: str
+    endpoint: str
+    status_code: Optional[int]
+    elapsed: float
+    size: int
+    retries: int
+    error: Optional[BaseException] = None
+
+
+hooks: list[Callable[[RequestRecord], Any]] = []
+"""Functions called with a RequestRecord after every request. No records are created if there are no hooks."""
+
+collector: Optional[MetricsCollector] = None
+
+_id_segment = re.compile(r"^\d+$")
+_md5_segment = re.compile(r"^[0-9a-fA-F]{32}(\.\w+)?$")
+_username_collections = ("users", "user")
+
+
+def endpoint_template(url: str) -> str:
+    """
+    Returns the url without query and with ids, usernames and asset hashes replaced by placeholders.
+    """
+    parts = urlsplit(url)
+    segments = parts.path.split("/")
+    for i, segment in enumerate(segments):
+        if not segment:
+            continue
+        if _id_segment.match(segment):
+            segments[i] = "{id}"
+        elif _md5_segment.match(segment):
+            segments[i] = "{md5}"
+        elif i > 0 and segments[i - 1] in _username_collections:
+            segments[i] = "{username}"
+    return parts.netloc + "/".join(segments)
+
+
+def add_hook(hook: Callable[[RequestRecord], Any]):
+    hooks.append(hook)
+
+
+def remove_hook(hook: Callable[[RequestRecord], Any]):
+    if hook in hooks:
+        hooks.remove(hook)
+
+
+def record(method: str, url: str, response, start: float, retries: int, error: Optional[BaseException] = None):
+    """
+    Called by the Requests layer after a request. start is the time.perf_counter() value of the first attempt.
+    """
+    if not hooks:
+        return
+    _record = RequestRecord(
+        method=method, url=url, endpoint=endpoint_template(url),
+        status_code=None if response is None else response.status_code,
+        elapsed=time.perf_counter() - start,
+        size=0 if response is None else _response_size(response),
+        retries=retries, error=error
+    )
+    for hook in list(hooks):
+        try:
+            hook(_record)
+        except Exception as e:
+            print("Warning raised by scratchattach: request hook failed", hook, "error", e)
+
+
+def _response_size(response) -> int:
+    # requests.Response keeps the body in _content, AsyncResponse in content. Streamed bodies aren't read here.
+    content = vars(response).get("_content", vars(response).get("content"))
+    if isinstance(content, bytes):
+        return len(content)
+    try:
+        return int(response.headers.get("Content-Length", 0))
+    except ValueError:
+        return 0
+
+
+default_buckets: tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+"""Upper bounds (in seconds) of the latency histogram buckets"""
+
+
+class _EndpointStats:
+    def __init__(self, buckets: tuple[float, ...]):
+        self.count = 0
+        self.errors = 0
+        self.retries = 0
+        self.latency_sum = 0.0
+        self.latency_buckets = [0] * (len(buckets) + 1)  # The last bucket is +Inf
+        self.size_sum = 0
+        self.statuses: defaultdict[int, int] = defaultdict(int)
+
+
+class MetricsCollector:
+    """
+    Hook that aggregates the request records by method and endpoint template:
+    call counts, latency histograms, response sizes, status codes and retry counts.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = default_buckets):
+        self.buckets = tuple(sorted(buckets))
+        self._stats: dict[tuple[str, str], _EndpointStats] = {}
+        self._lock = Lock()
+
+    def __call__(self, _record: RequestRecord):
+        key = (_record.method, _record.endpoint)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = _EndpointStats(self.buckets)
+            stats.count += 1
+            stats.retries += _record.retries
+            stats.latency_sum += _record.elapsed
+            stats.latency_buckets[bisect.bisect_left(self.buckets, _record.elapsed)] += 1
+            stats.size_sum += _record.size
+            if _record.status_code is None:
+                stats.errors += 1
+            else:
+                stats.statuses[_record.status_code] += 1
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def to_dict(self) -> dict:
+        """
+        Returns the metrics as {"METHOD endpoint": {...}} dict.
+        """
+        result = {}
+        with self._lock:
+            for (method, endpoint), stats in self._stats.items():
+                cumulative = 0
+                histogram = {}
+                for bound, count in zip(self.buckets + (float("inf"),), stats.latency_buckets):
+                    cumulative += count
+                    histogram[bound] = cumulative
+                result[f"{method} {endpoint}"] = {
+                    "count": stats.count,
+                    "errors": stats.errors,
+                    "retries": stats.retries,
+                    "statuses": dict(stats.statuses),
+                    "latency_sum": stats.latency_sum,
+                    "latency_avg": stats.latency_sum / stats.count,
+                    "latency_histogram": histogram,
+                    "size_sum": stats.size_sum,
+                    "size_avg": stats.size_sum / stats.count,
+                }
+        return result
+
+    def to_prometheus(self, prefix: str = "scratchattach_http") -> str:
+        """
+        Returns the metrics in the Prometheus text exposition format.
+        """
+        requests_lines, latency_lines, size_lines, retries_lines = [], [], [], []
+        with self._lock:
+            for (method, endpoint), stats in sorted(self._stats.items()):
+                labels = f'method="{_escape(method)}",endpoint="{_escape(endpoint)}"'
+                for status, count in sorted(stats.statuses.items()):
+                    requests_lines.append(f'{prefix}_requests_total{{{labels},status="{status}"}} {count}')
+                if stats.errors:
+                    requests_lines.append(f'{prefix}_requests_total{{{labels},status="error"}} {stats.errors}')
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), stats.latency_buckets):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(float(bound))
+                    latency_lines.append(f'{prefix}_request_duration_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+                latency_lines.append(f"{prefix}_request_duration_seconds_sum{{{labels}}} {stats.latency_sum}")
+                latency_lines.append(f"{prefix}_request_duration_seconds_count{{{labels}}} {stats.count}")
+                size_lines.append(f"{prefix}_response_size_bytes_sum{{{labels}}} {stats.size_sum}")
+                size_lines.append(f"{prefix}_response_size_bytes_count{{{labels}}} {stats.count}")
+                retries_lines.append(f"{prefix}_retries_total{{{labels}}} {stats.retries}")
+
+        return "\n".join([
+            f"# HELP {prefix}_requests_total Requests by endpoint and status code",
+            f"# TYPE {prefix}_requests_total counter",
+            *requests_lines,
+            f"# HELP {prefix}_request_duration_seconds Request latency including retries",
+            f"# TYPE {prefix}_request_duration_seconds histogram",
+            *latency_lines,
+            f"# HELP {prefix}_response_size_bytes Size of the response bodies",
+            f"# TYPE {prefix}_response_size_bytes summary",
+            *size_lines,
+            f"# HELP {prefix}_retries_total Retried attempts",
+            f"# TYPE {prefix}_retries_total counter",
+            *retries_lines,
+        ]) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def enable_metrics(buckets: tuple[float, ...] = default_buckets) -> MetricsCollector:
+    """
+    Starts collecting metrics for all requests.
+
+    Returns:
+        MetricsCollector: Call .to_dict() or .to_prometheus() on it to export the metrics.
+    """
+    global collector
+    disable_metrics()
+    collector = MetricsCollector(buckets)
+    add_hook(collector)
+    return collector
+
+
+def disable_metrics():
+    global collector
+    if collector is not None:
+        remove_hook(collector)
+        collector = None
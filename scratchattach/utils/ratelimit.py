@@ -0,0 +1,387 @@
+"""Token buckets and the rate limiters used by the Requests layer and for cloud variable sets"""
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from threading import Lock
+from typing import Optional
+from urllib.parse import urlsplit
+
+from . import exceptions
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. Tokens are refilled continuously at a rate of `rate` tokens per second,
+    up to `capacity` tokens. A rate of None means that the bucket never runs out of tokens.
+
+    Tokens are reserved instead of being waited for, so callers are served in the order they reserved their tokens.
+    """
+
+    def __init__(self, rate: Optional[float] = None, capacity: float = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.last_refill = time.monotonic()
+        self._lock = Lock()
+
+    def _refill(self, now: float):
+        # last_refill is in the future while the bucket is blocked
+        if now <= self.last_refill:
+            return
+        if self.rate is None:
+            self.tokens = self.capacity
+        else:
+            self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    def reserve(self, n: float = 1) -> float:
+        """
+        Takes n tokens from the bucket.
+
+        Returns:
+            float: The time in seconds the caller has to wait before it can use the tokens
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            wait = max(0.0, self.last_refill - now)
+            if self.rate is None:
+                return wait
+            self.tokens -= n
+            if self.tokens < 0:
+                wait += -self.tokens / self.rate
+            return wait
+
+    def acquire(self, n: float = 1) -> float:
+        """
+        Takes n tokens from the bucket and sleeps until they can be used.
+
+        Returns:
+            float: The time in seconds that was waited
+        """
+        wait = self.reserve(n)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def try_acquire(self, n: float = 1) -> bool:
+        """
+        Takes n tokens from the bucket if they are available right now.
+
+        Returns:
+            bool: Whether the tokens were taken
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if now < self.last_refill:
+                return False
+            if self.rate is None:
+                return True
+            if self.tokens < n:
+                return False
+            self.tokens -= n
+            return True
+
+    def set_rate(self, rate: Optional[float], capacity: float):
+        """
+        Changes the rate and the capacity of the bucket. The tokens refilled until now are kept (up to the new capacity).
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = rate
+            self.capacity = capacity
+            self.tokens = min(self.tokens, capacity)
+
+    def block(self, duration: float):
+        """
+        Stops handing out tokens for the given amount of seconds (e.g. because the server sent a Retry-After header).
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens = min(self.tokens, 0)
+            self.last_refill = max(self.last_refill, now + duration)
+
+    @property
+    def available(self) -> float:
+        """
+        The amount of tokens that can be taken right now without waiting (negative if callers are queued).
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if now < self.last_refill:
+                return min(self.tokens, 0)
+            return float("inf") if self.rate is None else self.tokens
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parses the value of a Retry-After header (either an amount of seconds or an HTTP date) to seconds.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimiter:
+    """
+    Keeps a token bucket for every host and endpoint class (reading and writing requests are limited separately)
+    and adapts the rates to the 429 responses the server sends.
+
+    By default, requests are not limited until the server responds with a 429 error. From then on, the bucket's rate is
+    set to a fraction of the rate at which requests were sent, and slowly increased again with every successful request.
+    This way, the limiter finds the highest rate the server allows.
+
+    Attributes:
+        default_rate: The rate (requests per second) of new buckets. None means unlimited.
+
+        default_capacity: The burst size of new buckets
+
+        decrease_factor: When a 429 error is received, the bucket's rate is multiplied by this factor
+
+        increase_step: After every successful request, the rate of a slowed down bucket is increased by this amount
+
+        min_rate: The rate is never decreased below this value
+
+        default_penalty: How long requests are paused after a 429 error without Retry-After header (in seconds)
+
+        max_wait: If the server asks to wait longer than this (in seconds), the 429 error is raised instead
+
+        max_retries: How often a request that got a 429 error is queued again before the error is raised
+    """
+
+    def __init__(self, *, default_rate: Optional[float] = None, default_capacity: float = 10,
+                 decrease_factor: float = 0.5, increase_step: float = 0.05, min_rate: float = 0.2,
+                 default_penalty: float = 2, max_wait: float = 60, max_retries: int = 5):
+        self.default_rate = default_rate
+        self.default_capacity = default_capacity
+        self.decrease_factor = decrease_factor
+        self.increase_step = increase_step
+        self.min_rate = min_rate
+        self.default_penalty = default_penalty
+        self.max_wait = max_wait
+        self.max_retries = max_retries
+
+        self.buckets: dict[tuple[str, str], TokenBucket] = {}
+        self._configured: dict[tuple[str, Optional[str]], tuple[Optional[float], float]] = {}
+        self._recent: dict[tuple[str, str], deque[float]] = {}
+        self._lock = Lock()
+
+    @staticmethod
+    def endpoint_class(method: str, url: str) -> str:
+        """
+        Returns the endpoint class of a request. Reading and writing requests are limited separately by Scratch.
+        """
+        return "read" if method.upper() in ("GET", "HEAD", "OPTIONS") else "write"
+
+    def _key(self, method: str, url: str) -> tuple[str, str]:
+        return urlsplit(url).netloc.lower(), self.endpoint_class(method, url)
+
+    def _configured_rate(self, key: tuple[str, str]) -> tuple[Optional[float], float]:
+        host, endpoint_class = key
+        return self._configured.get(key, self._configured.get(
+            (host, None), (self.default_rate, self.default_capacity)))
+
+    def set_rate(self, host: str, rate: Optional[float], capacity: Optional[float] = None, *,
+                 endpoint_class: Optional[str] = None):
+        """
+        Sets the max. rate for requests to a host.
+
+        Args:
+            host (str): The host, e.g. "api.scratch.mit.edu"
+            rate (float or None): Max. requests per second. None means unlimited.
+            capacity (float): Max. burst size. Defaults to default_capacity.
+
+        Keyword Arguments:
+            endpoint_class (str or None): "read" or "write". If None, the rate applies to both endpoint classes.
+        """
+        if capacity is None:
+            capacity = self.default_capacity
+        host = host.lower()
+        with self._lock:
+            self._configured[(host, endpoint_class)] = (rate, capacity)
+            for key, bucket in self.buckets.items():
+                if key[0] == host and endpoint_class in (None, key[1]):
+                    bucket.set_rate(*self._configured_rate(key))
+
+    def bucket(self, method: str, url: str) -> TokenBucket:
+        """
+        Returns the token bucket used for a request.
+        """
+        key = self._key(method, url)
+        with self._lock:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = self.buckets[key] = TokenBucket(*self._configured_rate(key))
+                self._recent[key] = deque(maxlen=50)
+            self._recent[key].append(time.monotonic())
+            return bucket
+
+    def reserve(self, method: str, url: str) -> float:
+        """
+        Reserves a token for a request.
+
+        Returns:
+            float: The time in seconds the caller has to wait before sending the request
+        """
+        return self.bucket(method, url).reserve()
+
+    def acquire(self, method: str, url: str) -> float:
+        """
+        Waits until a request may be sent.
+        """
+        return self.bucket(method, url).acquire()
+
+    def _observed_rate(self, key: tuple[str, str]) -> Optional[float]:
+        recent = self._recent.get(key)
+        if not recent or len(recent) < 2:
+            return None
+        duration = time.monotonic() - recent[0]
+        if duration <= 0:
+            return None
+        return len(recent) / duration
+
+    def feedback(self, method: str, url: str, status_code: int, retry_after: Optional[str] = None) -> float:
+        """
+        Adapts the rate of the bucket to the status code of a response.
+
+        Returns:
+            float: How long the server asked to wait (0 if the response wasn't a 429 error). The bucket is paused for
+            at most max_wait seconds, since the request isn't retried if the server asks to wait longer.
+        """
+        key = self._key(method, url)
+        bucket = self.bucket(method, url) if key not in self.buckets else self.buckets[key]
+        ceiling, capacity = self._configured_rate(key)
+        if status_code == 429:
+            with self._lock:
+                rate = bucket.rate if bucket.rate is not None else self._observed_rate(key)
+                if rate is not None:
+                    rate = max(self.min_rate, rate * self.decrease_factor)
+                    bucket.set_rate(rate, min(bucket.capacity, max(1.0, rate)))
+            wait = parse_retry_after(retry_after)
+            if wait is None:
+                wait = self.default_penalty
+            bucket.block(min(wait, self.max_wait))
+            return wait
+        if bucket.rate is not None and (ceiling is None or bucket.rate < ceiling):
+            with self._lock:
+                rate = bucket.rate + self.increase_step
+                if ceiling is not None:
+                    rate = min(rate, ceiling)
+                bucket.set_rate(rate, min(capacity, max(bucket.capacity, rate)))
+        return 0
+
+    def reset(self):
+        """
+        Forgets all adapted rates.
+        """
+        with self._lock:
+            self.buckets.clear()
+            self._recent.clear()
+
+
+class CloudRateLimiter:
+    """
+    Schedules cloud variable sets with two token buckets:
+
+    - short-term: at most one set every `shortterm` seconds
+    - long-term: one set every `longterm` seconds on average. The bucket holds enough tokens to set variables at the
+      short-term rate for `burst_duration` seconds, after which sets are slowed down to the long-term rate.
+
+    Callers sleep exactly until their tokens are available (no polling), and are served in the order they called.
+    A limiter can be shared by several cloud objects (assign it to their `ratelimiter` attribute), for example by
+    clouds that set variables of the same project, so they are limited together.
+
+    Args:
+        shortterm (float): Min. time between two sets in seconds. 0 means no limit.
+        longterm (float): Time per set in seconds that can be sustained long-term. 0 means no limit.
+
+    Keyword Arguments:
+        burst_duration (float): How long sets can be sent at the short-term rate (in seconds)
+    """
+
+    def __init__(self, shortterm: float = 0.06667, longterm: float = 0.1, *, burst_duration: float = 25):
+        self.shortterm_bucket = TokenBucket(1 / shortterm if shortterm > 0 else None, 1)
+        longterm_rate = 1 / longterm if longterm > 0 else None
+        burst = 1
+        if longterm_rate is not None and self.shortterm_bucket.rate is not None:
+            burst = max(1.0, burst_duration * (self.shortterm_bucket.rate - longterm_rate))
+        self.longterm_bucket = TokenBucket(longterm_rate, burst)
+
+    def reserve(self, n: int = 1) -> float:
+        """
+        Takes the tokens for n variable sets.
+
+        Returns:
+            float: The time in seconds the caller has to wait before it can set the variables
+        """
+        return max(self.shortterm_bucket.reserve(n), self.longterm_bucket.reserve(n))
+
+    def acquire(self, n: int = 1) -> float:
+        """
+        Takes the tokens for n variable sets and sleeps until they can be used.
+
+        Returns:
+            float: The time in seconds that was waited
+        """
+        wait = self.reserve(n)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def async_acquire(self, n: int = 1) -> float:
+        """
+        Asynchronous version of acquire (doesn't block the event loop).
+        """
+        wait = self.reserve(n)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    @property
+    def available(self) -> float:
+        """
+        The amount of variable sets that can be performed right now without waiting (negative if callers are queued).
+        """
+        return min(self.shortterm_bucket.available, self.longterm_bucket.available)
+
+    @property
+    def burst_budget(self) -> float:
+        """
+        The amount of variable sets that can still be performed at the short-term rate before sets are slowed down to the
+        long-term rate.
+        """
+        return self.longterm_bucket.available
+
+
+_enforced_ratelimits: dict[str, TokenBucket] = {}
+
+
+def enforce_ratelimit(__type: str, name: str, amount: int = 5, duration: int = 60) -> None:
+    """
+    Enforces a scratchattach-side rate limit of `amount` uses per `duration` seconds.
+    Raises a RateLimitedError if the rate limit is exceeded.
+    """
+    bucket = _enforced_ratelimits.get(__type)
+    if bucket is None:
+        bucket = _enforced_ratelimits[__type] = TokenBucket(amount / duration, amount)
+    if bucket.try_acquire():
+        return
+    raise exceptions.RateLimitedError(
+        f"Rate limit for {name} exceeded.\n"
+        "This rate limit is enforced by scratchattach, not by the Scratch API.\n"
+        "For security reasons, it cannot be turned off.\n\n"
+        "Don't spam-create studios or similar, it WILL get you banned."
+    )
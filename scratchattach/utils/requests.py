@@ -1,10 +1,220 @@
 from __future__ import annotations
 
+import copy
+import time
+from http.cookiejar import DefaultCookiePolicy
+from threading import Lock
+from typing import Optional
+from urllib.parse import urlsplit
+
 import requests
-from . import exceptions
+from requests.adapters import HTTPAdapter
+from . import exceptions, metrics
+from .cache import ResponseCache, SQLiteResponseCache
+from .cassette import CassetteBackend
+from .http_backends import HTTPBackend, HttpxBackend
+from .ratelimit import RateLimiter
+from .retry import RetryPolicy, TransientError
+from .singleflight import SingleFlight
 
 proxies = None
 
+ratelimiter = RateLimiter()
+"""
+Rate limiter shared by all requests. Slows down requests to a host when it responds with 429 errors and queues them
+instead of failing. Use ratelimiter.set_rate to configure fixed rates.
+"""
+
+retry_policy = RetryPolicy(max_attempts=3, base_delay=0.25, max_delay=2, max_elapsed=15)
+"""
+Retry policy for idempotent requests (GET, HEAD, PUT, DELETE) that fail because of a connection error, a timeout
+or a 502 / 503 / 504 response. POST requests are never retried.
+"""
+retry_statuses: tuple[int, ...] = (502, 503, 504)
+
+_idempotent_methods = ("GET", "HEAD", "PUT", "DELETE")
+
+cache: Optional[ResponseCache] = None
+"""Opt-in cache for GET responses (see enable_cache). None means responses aren't cached."""
+
+coalesce_requests: bool = True
+"""Whether concurrent identical GET requests (same url, params, headers and cookies) share one HTTP request"""
+_in_flight = SingleFlight()
+
+# Connection pool configuration (applies to sessions created after the change, use configure_pool to apply it at once)
+pool_maxsize: int = 10
+"""Default max. amount of keep-alive connections that are kept open to a single host"""
+pool_block: bool = False
+"""If True, pool_maxsize is a hard limit: requests wait for a free connection instead of opening an extra one"""
+host_pool_maxsize: dict[str, int] = {}
+"""Per-host overrides for pool_maxsize, e.g. {"api.scratch.mit.edu": 32}"""
+
+_sessions: dict[str, requests.Session] = {}
+_sessions_lock = Lock()
+_sessions_proxies = None
+
+
+class _RejectCookiesPolicy(DefaultCookiePolicy):
+    """
+    The pooled sessions are shared by all logins, so cookies set by a response must never be sent with later requests.
+    Cookies passed to a request explicitly are not affected by this.
+    """
+
+    def set_ok(self, cookie, request):
+        return False
+
+
+def _make_session(host: str) -> requests.Session:
+    session = requests.Session()
+    session.cookies.set_policy(_RejectCookiesPolicy())
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=host_pool_maxsize.get(host, pool_maxsize),
+                          pool_block=pool_block)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def _close_sessions():
+    for session in _sessions.values():
+        try:
+            session.close()
+        except Exception:
+            pass
+    _sessions.clear()
+
+
+def get_session(url: str) -> requests.Session:
+    """
+    Returns the pooled keep-alive session used for requests to the host of the given url.
+    If the module-level proxies were changed since the pool was created, the pool is reset first.
+    """
+    global _sessions_proxies
+    host = urlsplit(url).netloc.lower()
+    with _sessions_lock:
+        if proxies != _sessions_proxies:
+            _close_sessions()
+            _sessions_proxies = dict(proxies) if proxies is not None else None
+        session = _sessions.get(host)
+        if session is None:
+            session = _sessions[host] = _make_session(host)
+        return session
+
+
+def reset_pool():
+    """
+    Closes all pooled connections. New connections are opened on the next request.
+    """
+    with _sessions_lock:
+        _close_sessions()
+
+
+class RequestsBackend(HTTPBackend):
+    """
+    Default backend: Sends the requests with the pooled keep-alive sessions of the requests library (see get_session).
+    """
+    name = "requests"
+
+    def request(self, method: str, url: str, *, proxies: Optional[dict] = None, **kwargs) -> requests.Response:
+        try:
+            return get_session(url).request(method, url, proxies=proxies, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            raise TransientError(e)
+
+    def close(self):
+        reset_pool()
+
+
+backend: HTTPBackend = RequestsBackend()
+"""The transport all requests are sent with (see set_backend)"""
+
+_backends: dict[str, type[HTTPBackend]] = {"requests": RequestsBackend, "httpx": HttpxBackend,
+                                           "cassette": CassetteBackend}
+
+
+def set_backend(new_backend: str | HTTPBackend, **options) -> HTTPBackend:
+    """
+    Sets the transport that requests are sent with.
+
+    Args:
+        new_backend (str or HTTPBackend): "requests" (default), "httpx" (supports HTTP/2, requires httpx and h2),
+            "cassette" (records / replays responses, see scratchattach.utils.cassette.CassetteBackend)
+            or an instance of a custom scratchattach.utils.http_backends.HTTPBackend subclass
+        options: Passed to the backend class if a name is given,
+            e.g. set_backend("httpx", http2=True) or set_backend("cassette", path="api.jsonl.gz", mode="replay")
+
+    Returns:
+        HTTPBackend: The new backend
+    """
+    global backend
+    if isinstance(new_backend, str):
+        if new_backend not in _backends:
+            raise ValueError(f"Unknown backend {new_backend!r}, must be one of {', '.join(_backends)}")
+        # The old backend is closed first, e.g. so that a cassette it recorded is complete before it's read again
+        backend.close()
+        new_backend = _backends[new_backend](**options)
+    elif backend is not new_backend:
+        backend.close()
+    backend = new_backend
+    return backend
+
+
+def _freeze(d: Optional[dict]) -> tuple:
+    return tuple(sorted((str(k), str(v)) for k, v in d.items())) if d else ()
+
+
+def enable_cache(rules: Optional[list[tuple[str, float]]] = None, *, max_entries: int = 1024,
+                 path: Optional[str] = None, max_bytes: Optional[int] = None) -> ResponseCache:
+    """
+    Enables caching of GET responses.
+
+    Args:
+        rules (list): (url regex pattern, ttl in seconds) tuples. Only responses to matching urls are cached.
+            Defaults to scratchattach.utils.cache.default_rules (users, projects, studios, featured, news and stats).
+        max_entries (int): The least recently used responses are evicted once the cache holds this many responses.
+        path (str): If provided, the responses are stored in an SQLite database at this path, so they are still
+            cached after a restart. Otherwise, they are kept in memory.
+        max_bytes (int): Max. total size of the cached response bodies. Only used if a path is provided.
+
+    Returns:
+        scratchattach.utils.cache.ResponseCache: The cache. Call .stats() on it to get the hit and miss counters.
+    """
+    global cache
+    if path is None:
+        cache = ResponseCache(rules, max_entries=max_entries)
+    else:
+        cache = SQLiteResponseCache(path, rules, max_entries=max_entries, max_bytes=max_bytes)
+    return cache
+
+
+def disable_cache():
+    """
+    Disables caching of GET responses and drops all cached responses (the file of a persistent cache is kept).
+    """
+    global cache
+    if isinstance(cache, SQLiteResponseCache):
+        cache.close()
+    cache = None
+
+
+def configure_pool(maxsize: Optional[int] = None, *, host: Optional[str] = None, block: Optional[bool] = None):
+    """
+    Configures the connection pool and resets it so the new configuration is used right away.
+
+    Args:
+        maxsize (int): Max. amount of keep-alive connections per host
+        host (str): If provided, maxsize only applies to this host (e.g. "api.scratch.mit.edu")
+        block (bool): Whether maxsize is a hard limit for the amount of concurrent connections to a host
+    """
+    global pool_maxsize, pool_block
+    if maxsize is not None:
+        if host is None:
+            pool_maxsize = maxsize
+        else:
+            host_pool_maxsize[host.lower()] = maxsize
+    if block is not None:
+        pool_block = block
+    reset_pool()
+
 
 class Requests:
     """
@@ -19,49 +229,138 @@ class Requests:
             raise exceptions.APIError("Internal Scratch server error")
         if r.status_code == 429:
             raise exceptions.Response429("You are being rate-limited (or blocked) by Scratch")
+        if not getattr(r, "_content_consumed", True):
+            # The body of a streamed response is not read here
+            return
         if r.text == '{"code":"BadRequest","message":""}':
             raise exceptions.BadRequest("Make sure all provided arguments are valid")
         if r.text == '{"code":"BadRequest","message":""}':
             raise exceptions.BadRequest("Make sure all provided arguments are valid")
 
     @staticmethod
-    def get(url, *, data=None, json=None, headers=None, cookies=None, timeout=None, params=None):
-        try:
-            r = requests.get(url, data=data, json=json, headers=headers, cookies=cookies, params=params,
-                             timeout=timeout, proxies=proxies)
-        except Exception as e:
-            raise exceptions.FetchError(e)
-        Requests.check_response(r)
+    def _send(method, url, _on_retry=None, **kwargs):
+        # Sends a single request (429 errors are queued by the rate limiter). Raises TransientError on retryable failures
+        retries = 0
+        while True:
+            time.sleep(ratelimiter.reserve(method, url))
+            try:
+                r = backend.request(method, url, proxies=proxies, **kwargs)
+            except TransientError:
+                raise
+            except Exception as e:
+                raise exceptions.FetchError(e)
+            wait = ratelimiter.feedback(method, url, r.status_code, r.headers.get("Retry-After"))
+            # 429 errors are retried once the server allows it, unless it asks to wait too long
+            if r.status_code != 429 or retries >= ratelimiter.max_retries or wait > ratelimiter.max_wait:
+                break
+            r.close()
+            retries += 1
+            if _on_retry is not None:
+                _on_retry()
+        if r.status_code in retry_statuses:
+            raise TransientError(response=r)
         return r
 
     @staticmethod
-    def post(url, *, data=None, json=None, headers=None, cookies=None, timeout=None, params=None, files=None, errorhandling=True, ):
+    def _fetch(method, url, **kwargs):
+        start = time.perf_counter()
+        retries = 0
+
+        def on_retry(*_):
+            nonlocal retries
+            retries += 1
+
         try:
-            r = requests.post(url, data=data, json=json, headers=headers, cookies=cookies, params=params,
-                              timeout=timeout, proxies=proxies, files=files)
-        except Exception as e:
-            raise exceptions.FetchError(e)
+            if method in _idempotent_methods:
+                r = retry_policy.call(lambda: Requests._send(method, url, on_retry, **kwargs), on_retry=on_retry)
+            else:
+                r = Requests._send(method, url, on_retry, **kwargs)
+        except TransientError as e:
+            if e.response is None:
+                metrics.record(method, url, None, start, retries, e.cause)
+                raise exceptions.FetchError(e.cause)
+            r = e.response
+        except exceptions.FetchError as e:
+            metrics.record(method, url, None, start, retries, e)
+            raise
+        metrics.record(method, url, r, start, retries)
+        return r
+
+    @staticmethod
+    def _cached_get(_cache: ResponseCache, url, **kwargs):
+        rule = _cache.rule_for(url)
+        if rule is None:
+            return Requests._fetch("GET", url, **kwargs)
+        pattern, ttl = rule
+        key = _cache.key(url, params=kwargs.get("params"), headers=kwargs.get("headers"),
+                         cookies=kwargs.get("cookies"))
+        entry = _cache.get(key)
+        if entry is not None and entry.fresh:
+            _cache.record(pattern, hit=True)
+            return _cache.copy_response(entry.response)
+
+        if entry is not None and entry.revalidatable:
+            kwargs["headers"] = _cache.conditional_headers(entry, kwargs.get("headers"))
+        r = Requests._fetch("GET", url, **kwargs)
+        if entry is not None and r.status_code == 304:
+            # The cached response is still up-to-date
+            _cache.refresh(key, entry, ttl)
+            _cache.record(pattern, hit=True, revalidated=True)
+            return _cache.copy_response(entry.response)
+
+        _cache.record(pattern, hit=False)
+        if r.status_code == 200:
+            _cache.store(key, r, ttl)
+            return _cache.copy_response(r)
+        return r
+
+    @staticmethod
+    def _get(_cache: Optional[ResponseCache], url, **kwargs):
+        if _cache is None:
+            return Requests._fetch("GET", url, **kwargs)
+        return Requests._cached_get(_cache, url, **kwargs)
+
+    @staticmethod
+    def _request(method, url, *, errorhandling=True, **kwargs):
+        _cache = cache
+        if method != "GET":
+            if _cache is not None:
+                # Writing requests make the cached responses for the same url outdated
+                _cache.invalidate(url)
+            r = Requests._fetch(method, url, **kwargs)
+        elif kwargs.get("stream"):
+            # Streamed bodies can only be read once, so they are neither cached nor shared
+            r = Requests._fetch(method, url, **kwargs)
+        elif coalesce_requests and kwargs.get("data") is None and kwargs.get("json") is None:
+            key = (url, _freeze(kwargs.get("params")), _freeze(kwargs.get("headers")), _freeze(kwargs.get("cookies")))
+            r, shared = _in_flight.do(key, lambda: Requests._get(_cache, url, **kwargs))
+            if shared:
+                r = copy.copy(r)
+        else:
+            r = Requests._get(_cache, url, **kwargs)
         if errorhandling:
             Requests.check_response(r)
         return r
 
+    @staticmethod
+    def get(url, *, data=None, json=None, headers=None, cookies=None, timeout=None, params=None, stream=False):
+        """
+        With stream=True, the body isn't downloaded right away. Read it with response.iter_content and close the response.
+        """
+        return Requests._request("GET", url, data=data, json=json, headers=headers, cookies=cookies, params=params,
+                                 timeout=timeout, stream=stream)
+
+    @staticmethod
+    def post(url, *, data=None, json=None, headers=None, cookies=None, timeout=None, params=None, files=None, errorhandling=True, ):
+        return Requests._request("POST", url, data=data, json=json, headers=headers, cookies=cookies, params=params,
+                                 timeout=timeout, files=files, errorhandling=errorhandling)
+
     @staticmethod
     def delete(url, *, data=None, json=None, headers=None, cookies=None, timeout=None, params=None):
-        try:
-            r = requests.delete(url, data=data, json=json, headers=headers, cookies=cookies, params=params,
-                                timeout=timeout, proxies=proxies)
-        except Exception as e:
-            raise exceptions.FetchError(e)
-        Requests.check_response(r)
-        return r
+        return Requests._request("DELETE", url, data=data, json=json, headers=headers, cookies=cookies, params=params,
+                                 timeout=timeout)
 
     @staticmethod
     def put(url, *, data=None, json=None, headers=None, cookies=None, timeout=None, params=None):
-        try:
-            r = requests.put(url, data=data, json=json, headers=headers, cookies=cookies, params=params,
-                             timeout=timeout, proxies=proxies)
-        except Exception as e:
-            raise exceptions.FetchError(e)
-        Requests.check_response(r)
-        return r
-
+        return Requests._request("PUT", url, data=data, json=json, headers=headers, cookies=cookies, params=params,
+                                 timeout=timeout)
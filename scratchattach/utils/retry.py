@@ -0,0 +1,127 @@
+"""Retry policy with exponential backoff used for HTTP requests and cloud websocket sends"""
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from typing import Callable, Optional, Any, Awaitable
+
+
+class TransientError(Exception):
+    """
+    Raised for failures that are worth retrying, like connection errors, timeouts or 502 / 503 / 504 responses.
+
+    Attributes:
+        cause: The exception that caused the failure (None if the failure is a response)
+
+        response: The response that caused the failure (None if the failure is an exception)
+    """
+
+    def __init__(self, cause: Optional[BaseException] = None, response=None):
+        self.cause = cause
+        self.response = response
+        super().__init__(str(cause) if response is None else f"Server responded with {response.status_code}")
+
+
+class RetryPolicy:
+    """
+    Decides whether and when a failed operation is retried.
+
+    The n-th retry is delayed by base_delay * multiplier ** (n-1), capped at max_delay. A random part of the delay
+    (given by jitter, 0 = none, 1 = the full delay) is subtracted so that clients that failed at the same time don't
+    retry at the same time.
+
+    Attributes:
+        max_attempts: Max. amount of attempts (including the first one). None means no limit.
+
+        base_delay: Delay before the first retry (in seconds)
+
+        multiplier: Factor the delay is multiplied with after every retry
+
+        max_delay: Upper bound for a single delay (in seconds)
+
+        jitter: Fraction of every delay that is randomized
+
+        max_elapsed: The operation is not retried if this many seconds would have passed since the first attempt
+            before the retry. None means no limit.
+
+        retry_on: Exception classes that are retryable
+
+        giveup_on: Exception classes that are never retried (takes precedence over retry_on)
+    """
+
+    def __init__(self, *, max_attempts: Optional[int] = 4, base_delay: float = 0.1, multiplier: float = 2,
+                 max_delay: float = 5, jitter: float = 0.5, max_elapsed: Optional[float] = 10,
+                 retry_on: tuple[type[BaseException], ...] = (TransientError,),
+                 giveup_on: tuple[type[BaseException], ...] = ()):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.multiplier = multiplier
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.max_elapsed = max_elapsed
+        self.retry_on = retry_on
+        self.giveup_on = giveup_on
+
+    def is_retryable(self, error: BaseException) -> bool:
+        return isinstance(error, self.retry_on) and not isinstance(error, self.giveup_on)
+
+    def delay(self, attempt: int) -> float:
+        """
+        Returns the delay before the retry that follows the given (failed) attempt.
+        """
+        try:
+            delay = min(self.max_delay, self.base_delay * self.multiplier ** (attempt - 1))
+        except OverflowError:
+            # After many attempts (without max_attempts limit)
+            delay = self.max_delay
+        return delay * (1 - self.jitter * random.random())
+
+    def _next_delay(self, error: Exception, attempt: int, start: float) -> Optional[float]:
+        # Returns None if the operation should not be retried
+        if not self.is_retryable(error) or (self.max_attempts is not None and attempt >= self.max_attempts):
+            return None
+        delay = self.delay(attempt)
+        if self.max_elapsed is not None and time.monotonic() - start + delay > self.max_elapsed:
+            return None
+        return delay
+
+    def call(self, func: Callable[[], Any], *, on_retry: Optional[Callable[[Exception, int], Any]] = None) -> Any:
+        """
+        Calls func until it succeeds or the policy gives up. If the policy gives up, the last error is raised.
+
+        Keyword Arguments:
+            on_retry: Called with the error and the number of the failed attempt before every retry
+        """
+        start = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                return func()
+            except Exception as e:
+                delay = self._next_delay(e, attempt, start)
+                if delay is None:
+                    raise
+                if on_retry is not None:
+                    on_retry(e, attempt)
+                time.sleep(delay)
+
+    async def async_call(self, func: Callable[[], Awaitable[Any]], *,
+                         on_retry: Optional[Callable[[Exception, int], Any]] = None) -> Any:
+        """
+        Asynchronous version of call. func has to be a coroutine function.
+        """
+        start = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                return await func()
+            except Exception as e:
+                delay = self._next_delay(e, attempt, start)
+                if delay is None:
+                    raise
+                if on_retry is not None:
+                    on_retry(e, attempt)
+                await asyncio.sleep(delay)
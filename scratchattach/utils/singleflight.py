@@ -0,0 +1,64 @@
+"""Request coalescing: concurrent identical calls share one execution"""
+from __future__ import annotations
+
+from threading import Event, Lock
+from typing import Any, Callable, Hashable, Optional
+
+
+class _Call:
+    def __init__(self):
+        self.done = Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    While a call for a key is in flight, other threads that make a call with the same key don't execute it again,
+    but wait for the running call and get its result (or its exception).
+    """
+
+    def __init__(self):
+        self._calls: dict[Hashable, _Call] = {}
+        self._lock = Lock()
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> tuple[Any, bool]:
+        """
+        Executes func, unless a call with the same key is already in flight.
+
+        Returns:
+            tuple: The result and whether it is shared with another caller
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = func()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, call.waiters > 0
+
+    def in_flight(self) -> int:
+        """
+        Returns the amount of calls that are currently in flight.
+        """
+        with self._lock:
+            return len(self._calls)
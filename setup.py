@@ -17,6 +17,7 @@ setup(
     long_description=open('README.md', encoding='utf-8').read(),
     packages=find_packages(),
     install_requires=["websocket-client","requests","bs4","SimpleWebSocketServer"],
+    extras_require={"async": ["aiohttp"], "http2": ["httpx[http2]"]},
     keywords=['scratch api', 'scratchattach', 'scratch api python', 'scratch python', 'scratch for python', 'scratch', 'scratch cloud', 'scratch cloud variables', 'scratch bot'],
     url='https://scratchattach.tim1de.net',
     classifiers=[
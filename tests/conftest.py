@@ -0,0 +1,234 @@
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+sys.path.insert(0, ".")
+
+import pytest
+
+from scratchattach.utils import requests as _requests
+from scratchattach.utils.http_backends import HTTPBackend, make_response
+from scratchattach.utils.ratelimit import RateLimiter
+
+
+class ScriptedBackend(HTTPBackend):
+    """
+    Answers the requests of the Requests class with queued (status_code, headers, content) tuples
+    (the last one is repeated) and records the requested urls.
+    """
+    name = "scripted"
+
+    def __init__(self, *responses):
+        self.responses = list(responses) or [(200, {}, b"{}")]
+        self.requests = []
+
+    def request(self, method, url, *, proxies=None, **kwargs):
+        self.requests.append((method, url, kwargs))
+        status_code, headers, content = self.responses.pop(0) if len(self.responses) > 1 else self.responses[0]
+        return make_response(status_code=status_code, headers=headers, content=content, url=url)
+
+
+class _EchoHandler(BaseHTTPRequestHandler):
+    # /redirect/<path> redirects to /<path>, every other path responds with the request as JSON
+    # (and sets a cookie if the query contains set_cookie)
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.request_count += 1
+        parts = urlsplit(self.path)
+        if parts.path.startswith("/redirect/"):
+            self.send_response(302)
+            self.send_header("Location", parts.path[len("/redirect"):] + (f"?{parts.query}" if parts.query else ""))
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = json.dumps({"path": parts.path, "query": parts.query, "cookie": self.headers.get("Cookie"),
+                           "count": self.server.request_count, "client_port": self.client_address[1]}).encode()
+        self.send_response(200)
+        if "set_cookie" in parts.query:
+            self.send_header("Set-Cookie", "tracking=1; Path=/")
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def http_server():
+    """Local HTTP server that echoes the requests and redirects /redirect/<path> to /<path>"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _EchoHandler)
+    server.daemon_threads = True
+    server.request_count = 0
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    """Replaces the transport and rate limiter of the Requests class for one test"""
+    scripted = ScriptedBackend()
+    monkeypatch.setattr(_requests, "backend", scripted)
+    monkeypatch.setattr(_requests, "ratelimiter", RateLimiter())
+    monkeypatch.setattr(_requests, "cache", None)
+    return scripted
+
+
+@pytest.fixture
+def fake_api(monkeypatch):
+    """FakeScratchAPI installed for one test (with the response cache disabled)"""
+    from scratchattach.testing import FakeScratchAPI
+    monkeypatch.setattr(_requests, "ratelimiter", RateLimiter())
+    monkeypatch.setattr(_requests, "cache", None)
+    with FakeScratchAPI(users=50, projects=50, studios=10, followers=95, studio_projects=30) as api:
+        yield api
+
+
+class CloudServer:
+    """
+    Cloud variable server for the tests (runs on its own event loop in a background thread).
+    Sends the current values after the handshake and forwards sets to the other clients, like Scratch's server.
+
+    Attributes:
+        connections: Amount of connections that were opened
+
+        received: The packets sent by the clients
+    """
+
+    def __init__(self):
+        import asyncio
+        import threading
+
+        self.variables = {}
+        self.connections = 0
+        self.received = []
+        self._clients = set()
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        self.port = self._run(self._start())
+
+    @property
+    def url(self):
+        return f"ws://127.0.0.1:{self.port}/"
+
+    def _run(self, coro, timeout=5):
+        import asyncio
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result(timeout)
+
+    async def _start(self):
+        from aiohttp import web
+        app = web.Application()
+        app.router.add_get("/", self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        return self._runner.addresses[0][1]
+
+    async def _handle(self, request):
+        import json
+        from aiohttp import web, WSMsgType
+        ws = web.WebSocketResponse()
+        # Counted before the client gets the handshake response
+        self.connections += 1
+        await ws.prepare(request)
+        try:
+            async for message in ws:
+                if message.type != WSMsgType.TEXT:
+                    continue
+                for line in message.data.splitlines():
+                    packet = json.loads(line)
+                    self.received.append(packet)
+                    if packet["method"] == "handshake":
+                        # Like Scratch's server, sets are only forwarded to clients that did the handshake
+                        self._clients.add(ws)
+                        if self.variables:
+                            # The current values (nothing is sent if no variable was set)
+                            await ws.send_str("\n".join(self._set_message(name, value)
+                                                        for name, value in self.variables.items()))
+                    elif packet["method"] == "set":
+                        self.variables[packet["name"]] = packet["value"]
+                        for client in list(self._clients - {ws}):
+                            await client.send_str(self._set_message(packet["name"], packet["value"]))
+        finally:
+            self._clients.discard(ws)
+        return ws
+
+    @staticmethod
+    def _set_message(name, value):
+        import json
+        return json.dumps({"method": "set", "name": name, "value": value})
+
+    def wait_for_handshakes(self, amount=1, timeout=5):
+        """Waits until the server received the given amount of handshakes"""
+        import time
+        deadline = time.monotonic() + timeout
+        while sum(packet["method"] == "handshake" for packet in self.received) < amount:
+            assert time.monotonic() < deadline, "No handshake received"
+            time.sleep(0.01)
+
+    def sets(self):
+        return [(packet["name"], packet["value"]) for packet in self.received if packet["method"] == "set"]
+
+    def broadcast(self, name, value):
+        """Sends a set to all clients, as if another client had set the variable"""
+        self.variables[name] = value
+
+        async def send():
+            for client in list(self._clients):
+                await client.send_str(self._set_message(name, value))
+
+        self._run(send())
+
+    def drop_connections(self):
+        async def drop():
+            for client in list(self._clients):
+                await client.close()
+
+        self._run(drop())
+
+    def close(self):
+        if not self._thread.is_alive():
+            return
+        self.drop_connections()
+        self._run(self._runner.cleanup())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(5)
+
+
+@pytest.fixture
+def cloud_server():
+    pytest.importorskip("aiohttp")
+    server = CloudServer()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def make_cloud(cloud_server):
+    """Returns CustomCloud objects connected to the test cloud server (without rate limits)"""
+    from scratchattach.cloud import CustomCloud
+    clouds = []
+
+    def make_cloud(**kwargs):
+        kwargs.setdefault("ws_shortterm_ratelimit", 0)
+        kwargs.setdefault("ws_longterm_ratelimit", 0)
+        kwargs.setdefault("project_id", 1)
+        cloud = CustomCloud(cloud_host=cloud_server.url, allow_non_numeric=True, **kwargs)
+        clouds.append(cloud)
+        return cloud
+
+    yield make_cloud
+    for cloud in clouds:
+        cloud.disconnect()
+        if cloud.event_hub is not None:
+            cloud.event_hub.close()
@@ -0,0 +1,151 @@
+import hashlib
+import os
+import stat
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from scratchattach.testing import FakeScratchAPI
+from scratchattach.utils import asset_store, exceptions
+from scratchattach.utils import requests as _requests
+from scratchattach.utils.asset_store import AssetStore
+
+
+def md5ext_of(data, ext="png"):
+    return f"{hashlib.md5(data).hexdigest()}.{ext}"
+
+
+@pytest.fixture
+def api(monkeypatch):
+    monkeypatch.setattr(_requests, "cache", None)
+    monkeypatch.setattr(asset_store, "default_store", None)
+    with FakeScratchAPI(assets=10) as api:
+        yield api
+
+
+def asset_url(md5ext):
+    return f"https://assets.scratch.mit.edu/internalapi/asset/{md5ext}/get/"
+
+
+def test_put_and_get(tmp_path):
+    store = AssetStore(str(tmp_path))
+    data = b"costume"
+    md5ext = md5ext_of(data)
+    path = store.put(md5ext, data)
+    assert path == os.path.join(str(tmp_path), md5ext[:2], md5ext)
+    assert store.has(md5ext) and store.get(md5ext) == data
+    assert store.get(md5ext_of(b"other")) is None
+    assert store.size() == len(data)
+
+
+def test_put_verifies_the_content(tmp_path):
+    store = AssetStore(str(tmp_path))
+    with pytest.raises(exceptions.ChecksumError):
+        store.put(md5ext_of(b"a"), b"b")
+    with pytest.raises(ValueError):
+        store.put("costume1.png", b"a")
+    assert not store.storable("../" + md5ext_of(b"a"))
+    assert store.size() == 0
+
+
+def test_least_recently_used_assets_are_evicted(tmp_path):
+    store = AssetStore(str(tmp_path), max_bytes=250)
+    assets = [bytes([i]) * 100 for i in range(3)]
+    store.put(md5ext_of(assets[0]), assets[0])
+    store.put(md5ext_of(assets[1]), assets[1])
+    store.get(md5ext_of(assets[0]))
+    store.put(md5ext_of(assets[2]), assets[2])
+    assert store.has(md5ext_of(assets[0])) and not store.has(md5ext_of(assets[1]))
+    assert store.size() == 200
+
+
+def test_the_index_is_built_from_the_modification_times(tmp_path, monkeypatch):
+    assets = [bytes([i]) * 100 for i in range(3)]
+    for data in assets[:2]:
+        AssetStore(str(tmp_path)).put(md5ext_of(data), data)
+    past = time.time() - 10
+    os.utime(AssetStore(str(tmp_path)).path(md5ext_of(assets[1])), (past, past))
+
+    walks = []
+    walk = os.walk
+    monkeypatch.setattr(os, "walk", lambda *args: walks.append(args) or walk(*args))
+    store = AssetStore(str(tmp_path), max_bytes=250)
+    for data in assets[2:] * 3:
+        store.put(md5ext_of(data), data)
+    assert store.has(md5ext_of(assets[0])) and not store.has(md5ext_of(assets[1]))
+    assert store.size() == 200
+    # The store is only walked once, when its size isn't known yet
+    assert len(walks) == 1
+
+
+def test_fetch_downloads_once(api, tmp_path):
+    store = AssetStore(str(tmp_path))
+    md5ext, content = api.asset_data(1)
+    first = store.fetch(md5ext, asset_url(md5ext))
+    second = store.fetch(md5ext, asset_url(md5ext))
+    assert first == second
+    assert api.request_count == 1
+    assert store.get(md5ext) == content
+
+
+def test_concurrent_fetches_share_one_download(api, tmp_path):
+    store = AssetStore(str(tmp_path))
+    store.size()
+    api.latency = 0.2
+    md5ext, content = api.asset_data(1)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        paths = list(pool.map(lambda _: store.fetch(md5ext, asset_url(md5ext)), range(4)))
+    assert len(set(paths)) == 1
+    assert api.request_count == 1
+    assert store.size() == len(content)
+
+
+def test_fetch_asset_larger_than_the_store(api, tmp_path):
+    md5ext, content = api.asset_data(2)
+    asset_store.enable_asset_store(str(tmp_path), max_bytes=1)
+    try:
+        assert asset_store.fetch_asset(md5ext, asset_url(md5ext)) == content
+        assert not asset_store.default_store.has(md5ext)
+    finally:
+        asset_store.disable_asset_store()
+
+
+def test_fetch_asset_uses_the_default_store(api, tmp_path):
+    md5ext, content = api.asset_data(2)
+    assert asset_store.fetch_asset(md5ext, asset_url(md5ext)) == content
+    asset_store.enable_asset_store(str(tmp_path))
+    try:
+        for _ in range(3):
+            assert asset_store.fetch_asset(md5ext, asset_url(md5ext)) == content
+        assert api.request_count == 2
+        assert asset_store.default_store.has(md5ext)
+    finally:
+        asset_store.disable_asset_store()
+
+
+def test_save_asset(api, tmp_path):
+    md5ext, content = api.asset_data(3)
+    store = asset_store.enable_asset_store(str(tmp_path / "store"))
+    try:
+        target = tmp_path / "saved.png"
+        asset_store.save_asset(md5ext, asset_url(md5ext), str(target), verify=True)
+        asset_store.save_asset(md5ext, asset_url(md5ext), str(target), verify=True)
+        assert target.read_bytes() == content
+        assert api.request_count == 1
+        assert store.has(md5ext)
+        with open(tmp_path / "reference", "wb"):
+            pass
+        # Stored and saved files get the same permissions as files written with open()
+        reference = stat.S_IMODE(os.stat(tmp_path / "reference").st_mode)
+        assert stat.S_IMODE(os.stat(target).st_mode) == reference
+        assert stat.S_IMODE(os.stat(store.put(*api.asset_data(4))).st_mode) == reference
+    finally:
+        asset_store.disable_asset_store()
+
+
+def test_clear(tmp_path):
+    store = AssetStore(str(tmp_path))
+    store.put(md5ext_of(b"a"), b"a")
+    store.clear()
+    assert store.size() == 0 and not store.has(md5ext_of(b"a"))
@@ -0,0 +1,123 @@
+import asyncio
+
+from scratchattach.cloud import AsyncCloud
+from scratchattach.utils.retry import RetryPolicy
+
+
+async def wait_for(condition, timeout=5):
+    for _ in range(int(timeout / 0.01)):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("Condition wasn't met in time")
+
+
+def test_set_vars(cloud_server, make_cloud):
+    async def main():
+        async with AsyncCloud(make_cloud()) as cloud:
+            await cloud.set_var("score", 10)
+            await cloud.set_vars({"a": 1, "b": 2})
+            await wait_for(lambda: len(cloud_server.sets()) == 3)
+
+    asyncio.run(main())
+    assert cloud_server.sets() == [("☁ score", 10), ("☁ a", 1), ("☁ b", 2)]
+
+
+def receive_after_window(cloud_server, make_cloud):
+    async def main():
+        async with AsyncCloud(make_cloud()) as cloud:
+            events = cloud.events(initial_window=0.2)
+            first = asyncio.ensure_future(events.__anext__())
+            await asyncio.sleep(0.3)
+            cloud_server.broadcast("☁ score", "5")
+            activity = await asyncio.wait_for(first, 5)
+            await events.aclose()
+            return activity
+
+    return asyncio.run(main())
+
+
+def test_events_skip_initial_values(cloud_server, make_cloud):
+    cloud_server.variables["☁ initial"] = "1"
+    activity = receive_after_window(cloud_server, make_cloud)
+    assert (activity.var, activity.value) == ("score", "5")
+
+
+def test_events_without_initial_values(cloud_server, make_cloud):
+    # No variables are set, so the server sends nothing after the handshake. The first set must not be skipped.
+    activity = receive_after_window(cloud_server, make_cloud)
+    assert (activity.var, activity.value) == ("score", "5")
+
+
+def test_events_include_initial(cloud_server, make_cloud):
+    cloud_server.variables["☁ initial"] = "1"
+
+    async def main():
+        async with AsyncCloud(make_cloud()) as cloud:
+            events = cloud.events(include_initial=True)
+            activity = await asyncio.wait_for(events.__anext__(), 5)
+            await events.aclose()
+            return activity
+
+    activity = asyncio.run(main())
+    assert (activity.var, activity.value) == ("initial", "1")
+
+
+def test_disconnect_ends_events(cloud_server, make_cloud):
+    async def main():
+        cloud = AsyncCloud(make_cloud())
+        received = []
+
+        async def consume():
+            async for activity in cloud:
+                received.append(activity)
+
+        task = asyncio.create_task(consume())
+        await wait_for(lambda: cloud.active_connection)
+        await cloud.disconnect()
+        await asyncio.wait_for(task, 5)
+        return cloud
+
+    cloud = asyncio.run(main())
+    assert cloud.closed and not cloud.active_connection
+    assert cloud_server.connections == 1
+
+
+def test_events_reconnect_after_connection_loss(cloud_server, make_cloud):
+    policy = RetryPolicy(max_attempts=None, base_delay=0.01, max_elapsed=None, retry_on=(Exception,))
+
+    async def main():
+        async with AsyncCloud(make_cloud(), reconnect_policy=policy) as cloud:
+            events = cloud.events(initial_window=0.1)
+            first = asyncio.ensure_future(events.__anext__())
+            await asyncio.sleep(0.2)
+            cloud_server.broadcast("☁ a", "1")
+            first = await asyncio.wait_for(first, 5)
+            cloud_server.drop_connections()
+            second = asyncio.ensure_future(events.__anext__())
+            await wait_for(lambda: cloud_server.connections == 2 and cloud.active_connection)
+            # The values the server sends after the new handshake are skipped
+            await asyncio.sleep(0.2)
+            cloud_server.broadcast("☁ a", "2")
+            second = await asyncio.wait_for(second, 5)
+            await events.aclose()
+            return first, second
+
+    first, second = asyncio.run(main())
+    assert (first.value, second.value) == ("1", "2")
+
+
+def test_retry_policy_without_attempt_limit():
+    policy = RetryPolicy(max_attempts=None, base_delay=0, max_delay=0, max_elapsed=None, retry_on=(ValueError,))
+    attempts = []
+
+    def func():
+        attempts.append(1)
+        if len(attempts) < 50:
+            raise ValueError
+        return "done"
+
+    assert policy.call(func) == "done"
+    assert len(attempts) == 50
+    # The delay stays capped after many attempts
+    assert RetryPolicy(max_attempts=None, max_delay=30, jitter=0).delay(5000) == 30
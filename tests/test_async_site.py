@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+
+import scratchattach as sa
+from scratchattach.utils import async_requests, exceptions
+from scratchattach.utils.async_requests import AsyncRequests
+
+pytest.importorskip("aiohttp")
+
+
+def run(coro):
+    async def main():
+        try:
+            return await coro
+        finally:
+            await async_requests.close()
+
+    return asyncio.run(main())
+
+
+def test_async_get_objects(fake_api):
+    async def main():
+        return await asyncio.gather(sa.async_get_user("user4"), sa.async_get_project(9), sa.async_get_studio(2))
+
+    user, project, studio = run(main())
+    assert (user.username, user.id) == ("user4", sa.get_user("user4").id)
+    assert (project.id, project.title) == (9, "Project 9")
+    assert (studio.id, studio.title) == (2, "Studio 2")
+
+
+def test_async_get_missing_object(fake_api):
+    with pytest.raises(exceptions.UserNotFound):
+        run(sa.async_get_user("nobody"))
+    with pytest.raises(exceptions.ProjectNotFound):
+        run(sa.async_get_project(51))
+
+
+def test_async_pagination_matches_sync(fake_api):
+    user = sa.get_user("user1")
+    followers = run(user.async_followers(limit=90, offset=3))
+    assert [u.username for u in followers] == [u.username for u in user.followers(limit=90, offset=3)]
+    assert len(followers) == 90
+    # Only 95 followers exist, the pagination stops at the last (partial) page
+    assert len(run(user.async_followers(limit=200))) == 95
+
+
+def test_async_response(fake_api):
+    response = run(AsyncRequests.get("https://api.scratch.mit.edu/users/user2"))
+    assert response.ok and response.status_code == 200
+    assert response.json()["username"] == "user2"
+    assert '"user2"' in response.text
+    with pytest.raises(exceptions.Unauthorized):
+        run(AsyncRequests.get("https://projects.scratch.mit.edu/2"))
+
+
+def test_session_per_event_loop(fake_api):
+    async def session():
+        return async_requests.get_session()
+
+    async def main():
+        first, second = await session(), await session()
+        await async_requests.close()
+        return first, second, first.closed
+
+    first, second, closed = asyncio.run(main())
+    assert first is second and closed
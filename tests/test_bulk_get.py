@@ -0,0 +1,41 @@
+import pytest
+
+import scratchattach as sa
+from scratchattach.utils import commons, exceptions
+
+
+def test_get_users(fake_api):
+    found, not_found = sa.get_users(["user3", "user1", "nobody", "user3", "user99"])
+    assert list(found) == ["user3", "user1"]
+    assert found["user1"].id == 10001
+    assert not_found == ["nobody", "user99"]
+    # The duplicate username was fetched once
+    assert fake_api.request_count == 4
+
+
+@pytest.mark.parametrize("max_workers", [1, 8])
+def test_get_projects(fake_api, max_workers):
+    found, not_found = sa.get_projects([5, 60, 1, 2], max_workers=max_workers)
+    assert {i: p.title for i, p in found.items()} == {5: "Project 5", 1: "Project 1", 2: "Project 2"}
+    assert list(found) == [5, 1, 2]
+    assert not_found == [60]
+
+
+def test_get_studios(fake_api):
+    found, not_found = sa.get_studios(range(8, 13))
+    assert sorted(found) == [8, 9, 10]
+    assert not_found == [11, 12]
+
+
+def test_other_errors_are_raised(backend):
+    backend.responses = [(500, {}, b"")]
+    with pytest.raises(exceptions.APIError):
+        sa.get_projects([1, 2])
+
+
+def test_other_errors_can_be_collected(backend):
+    backend.responses = [(500, {}, b"")]
+    errors = {}
+    found, not_found = commons._get_objects("id", [1, 2], sa.Project, exceptions.ProjectNotFound, errors=errors)
+    assert (found, not_found) == ({}, [])
+    assert sorted(errors) == [1, 2] and all(isinstance(e, exceptions.APIError) for e in errors.values())
@@ -0,0 +1,90 @@
+import gzip
+
+import pytest
+
+from scratchattach.utils import requests as _requests
+from scratchattach.utils.cassette import CassetteBackend
+from tests.conftest import ScriptedBackend
+
+URL = "https://api.scratch.mit.edu/users/griffpatch"
+
+
+def record(path, *responses, mode="record", urls=(URL,)):
+    backend = CassetteBackend(path, mode=mode, inner=ScriptedBackend(*responses))
+    for url in urls:
+        backend.request("GET", url)
+    backend.close()
+    return backend
+
+
+def test_replay_returns_recorded_responses(tmp_path):
+    path = str(tmp_path / "api.jsonl.gz")
+    record(path, (200, {"Content-Type": "application/json"}, b'{"id": 1}'))
+    backend = CassetteBackend(path, mode="replay")
+    r = backend.request("GET", URL)
+    assert (r.status_code, r.json(), r.headers["content-type"]) == (200, {"id": 1}, "application/json")
+    with pytest.raises(LookupError):
+        backend.request("GET", URL + "/projects")
+
+
+def test_credentials_are_not_recorded(tmp_path):
+    path = str(tmp_path / "api.jsonl.gz")
+    headers = {"Content-Type": "application/json", "Set-Cookie": "scratchsessionsid=secret", "X-Token": "secret",
+               "authorization": "Bearer secret"}
+    record(path, (200, headers, b"{}"))
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        assert "secret" not in f.read()
+    r = CassetteBackend(path, mode="replay").request("GET", URL)
+    assert dict(r.headers) == {"Content-Type": "application/json"}
+
+
+def test_repeated_requests_are_replayed_in_order(tmp_path):
+    path = str(tmp_path / "api.jsonl.gz")
+    record(path, (200, {}, b"1"), (200, {}, b"2"), urls=(URL, URL))
+    backend = CassetteBackend(path, mode="replay")
+    assert [backend.request("GET", URL).content for _ in range(3)] == [b"1", b"2", b"2"]
+
+
+def test_params_are_part_of_the_key(tmp_path):
+    path = str(tmp_path / "api.jsonl.gz")
+    backend = CassetteBackend(path, mode="record", inner=ScriptedBackend((200, {}, b"a"), (200, {}, b"b")))
+    backend.request("GET", URL, params={"offset": 0})
+    backend.request("GET", URL, params={"offset": 40})
+    backend.close()
+    backend = CassetteBackend(path, mode="replay")
+    assert backend.request("GET", URL, params={"offset": 40}).content == b"b"
+
+
+def test_recording_again_replaces_the_cassette(tmp_path):
+    path = str(tmp_path / "api.jsonl.gz")
+    record(path, (200, {}, b"old"))
+    record(path, (200, {}, b"new"))
+    backend = CassetteBackend(path, mode="replay")
+    assert len(backend._recorded[("GET", URL)]) == 1
+    assert backend.request("GET", URL).content == b"new"
+
+
+def test_auto_mode_appends_new_requests(tmp_path):
+    path = str(tmp_path / "api.jsonl.gz")
+    record(path, (200, {}, b"user"))
+    inner = ScriptedBackend((200, {}, b"projects"))
+    backend = CassetteBackend(path, mode="auto", inner=inner)
+    assert backend.request("GET", URL).content == b"user"
+    assert backend.request("GET", URL + "/projects").content == b"projects"
+    backend.close()
+    assert len(inner.requests) == 1
+
+    backend = CassetteBackend(path, mode="replay")
+    assert backend.request("GET", URL).content == b"user"
+    assert backend.request("GET", URL + "/projects").content == b"projects"
+
+
+def test_requests_with_cassette_backend(tmp_path, monkeypatch):
+    path = str(tmp_path / "api.jsonl.gz")
+    record(path, (200, {}, b'{"username": "griffpatch"}'))
+    monkeypatch.setattr(_requests, "backend", _requests.backend)
+    _requests.set_backend("cassette", path=path, mode="replay")
+    try:
+        assert _requests.Requests.get(URL).json() == {"username": "griffpatch"}
+    finally:
+        _requests.set_backend("requests")
@@ -0,0 +1,140 @@
+import threading
+import time
+
+import pytest
+
+from scratchattach.cloud import CustomCloud
+from scratchattach.cloud._base import CloudEventHub
+from scratchattach.utils import exceptions
+from scratchattach.utils.retry import RetryPolicy
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("Condition wasn't met in time")
+        time.sleep(0.01)
+
+
+def read_all(stream, amount):
+    return [(activity["name"], activity["value"]) for activity in stream.read(amount)]
+
+
+def fast_hub(cloud):
+    cloud.event_hub = CloudEventHub(cloud, reconnect_policy=RetryPolicy(base_delay=0.01, max_delay=0.05))
+    return cloud.event_hub
+
+
+def test_streams_share_one_connection(cloud_server, make_cloud):
+    cloud = make_cloud()
+    first = cloud.create_event_stream()
+    second = cloud.create_event_stream()
+    events = cloud.events()  # CloudEvents (and CloudRecorder, CloudRequests) subscribe too
+    assert cloud_server.connections == 1
+    assert len(cloud.event_hub.subscriptions) == 3
+    cloud_server.wait_for_handshakes()
+
+    cloud_server.broadcast("☁ score", "7")
+    assert read_all(first, 1) == [("☁ score", "7")]
+    assert read_all(second, 1) == [("☁ score", "7")]
+    assert read_all(events.source_stream, 1) == [("☁ score", "7")]
+
+
+def test_connection_closes_with_last_subscription(cloud_server, make_cloud):
+    cloud = make_cloud()
+    first = cloud.create_event_stream()
+    second = cloud.create_event_stream()
+    first.close()
+    assert cloud.event_hub._thread is not None
+    second.close()
+    assert cloud.event_hub._thread is None and cloud.event_hub.subscriptions == []
+
+
+def test_disconnect_closes_the_event_hub(cloud_server, make_cloud):
+    cloud = make_cloud()
+    cloud.connect()
+    stream = cloud.create_event_stream()
+    source_cloud = cloud.event_hub._source_cloud
+    cloud.disconnect()
+    assert stream.closed and cloud.event_hub.subscriptions == []
+    assert cloud.event_hub._thread is None and not source_cloud.active_connection
+
+
+def test_receiving_connection_has_its_own_state(cloud_server, make_cloud):
+    cloud = make_cloud(username="receiver", origin="https://example.com")
+    cloud.create_event_stream()
+    source_cloud = cloud.event_hub._source_cloud
+    assert type(source_cloud) is type(cloud) and source_cloud is not cloud
+    assert (source_cloud.cloud_host, source_cloud.username, source_cloud.origin) == \
+        (cloud.cloud_host, "receiver", "https://example.com")
+    assert source_cloud.ws_timeout is None
+    assert source_cloud._pending_sets is not cloud._pending_sets
+    assert source_cloud._pending_condition is not cloud._pending_condition
+    assert source_cloud._get_ratelimiter() is not cloud._get_ratelimiter()
+
+
+def test_failed_subscribe_registers_nothing():
+    cloud = CustomCloud(project_id=1, cloud_host="ws://127.0.0.1:1/")
+    with pytest.raises(Exception):
+        cloud.create_event_stream()
+    assert cloud.event_hub.subscriptions == []
+    assert cloud.event_hub._thread is None
+
+
+def test_slow_subscribers_drop_oldest_activity(cloud_server, make_cloud):
+    cloud = make_cloud()
+    slow = cloud.create_event_stream()
+    fast = cloud.event_hub.subscribe(queue_size=100)
+    slow._queue.maxsize = 2
+    cloud_server.wait_for_handshakes()
+    for i in range(5):
+        cloud_server.broadcast("☁ n", str(i))
+    assert len(read_all(fast, 5)) == 5
+    wait_for(lambda: slow.dropped == 3)
+    assert read_all(slow, 2) == [("☁ n", "3"), ("☁ n", "4")]
+
+
+def test_reconnects_are_reported(cloud_server, make_cloud):
+    cloud = make_cloud()
+    # No variables are set yet, so the server sends no values after the handshake
+    stream = fast_hub(cloud).subscribe()
+    cloud_server.wait_for_handshakes()
+    cloud_server.broadcast("☁ a", "1")
+    cloud_server.drop_connections()
+    assert read_all(stream, 1) == [("☁ a", "1")]
+    with pytest.raises(exceptions.CloudConnectionError):
+        read_all(stream, 1)
+    assert cloud_server.connections == 2
+    assert read_all(stream, 1) == [("☁ a", "1")]  # the current values sent after the handshake
+    cloud_server.wait_for_handshakes(2)
+    cloud_server.broadcast("☁ a", "2")
+    assert read_all(stream, 1) == [("☁ a", "2")]
+
+
+def test_cloud_events_on_reconnect(cloud_server, make_cloud):
+    cloud = make_cloud()
+    fast_hub(cloud)
+    events = cloud.events()
+    reconnected = threading.Event()
+    received = []
+
+    @events.event
+    def on_set(activity):
+        received.append(activity.value)
+
+    @events.event
+    def on_reconnect():
+        reconnected.set()
+
+    events.start()
+    try:
+        time.sleep(0.6)  # CloudEvents ignores the activity of the first 0.5 seconds
+        cloud_server.drop_connections()
+        assert reconnected.wait(5)
+        cloud_server.wait_for_handshakes(2)
+        cloud_server.broadcast("☁ a", "1")
+        wait_for(lambda: received == ["1"])
+    finally:
+        events.stop()
+        events.disconnect()
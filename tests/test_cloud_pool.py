@@ -0,0 +1,181 @@
+import asyncio
+
+import pytest
+
+from scratchattach.cloud import CustomCloud
+from scratchattach.cloud.cloud_pool import CloudPool
+from scratchattach.utils.retry import RetryPolicy
+
+
+async def next_items(subscription, amount):
+    return [(project_id, activity.var, activity.value)
+            for project_id, activity in [await asyncio.wait_for(subscription.__anext__(), 5) for _ in range(amount)]]
+
+
+def test_activity_of_all_projects(cloud_server, make_cloud):
+    async def main():
+        async with CloudPool(lambda project_id: make_cloud(project_id=project_id), initial_window=0) as pool:
+            subscription = pool.subscribe()
+            assert await pool.add_many([1, 2]) == {}
+            cloud_server.wait_for_handshakes(2)
+            # The test server sends every set to the clients of all projects
+            cloud_server.broadcast("☁ score", "3")
+            return sorted(await next_items(subscription, 2)), pool.project_ids
+
+    items, project_ids = asyncio.run(main())
+    assert items == [(1, "score", "3"), (2, "score", "3")]
+    assert sorted(project_ids) == [1, 2]
+
+
+def test_subscribe_to_some_projects(cloud_server, make_cloud):
+    async def main():
+        async with CloudPool(initial_window=0) as pool:
+            await pool.add(make_cloud(project_id=1))
+            await pool.add(make_cloud(project_id=2))
+            subscription = pool.subscribe([2])
+            cloud_server.wait_for_handshakes(2)
+            cloud_server.broadcast("☁ a", "1")
+            cloud_server.broadcast("☁ a", "2")
+            return await next_items(subscription, 2)
+
+    assert asyncio.run(main()) == [(2, "a", "1"), (2, "a", "2")]
+
+
+def test_projects_are_added_once(cloud_server, make_cloud):
+    async def main():
+        async with CloudPool(lambda project_id: make_cloud(project_id=project_id)) as pool:
+            first, second = await asyncio.gather(pool.add(1), pool.add(1))
+            return first is second, len(pool)
+
+    assert asyncio.run(main()) == (True, 1)
+
+
+def test_failed_connects_are_reported(cloud_server, make_cloud):
+    def factory(project_id):
+        if project_id == 2:
+            return CustomCloud(project_id=2, cloud_host="ws://127.0.0.1:1/")
+        return make_cloud(project_id=project_id)
+
+    async def main():
+        async with CloudPool(factory) as pool:
+            failed = await pool.add_many([1, 2])
+            return failed, pool.project_ids
+
+    failed, project_ids = asyncio.run(main())
+    assert list(failed) == [2] and project_ids == [1]
+
+
+def test_add_by_id_requires_factory():
+    async def main():
+        async with CloudPool() as pool:
+            await pool.add(1)
+
+    with pytest.raises(ValueError):
+        asyncio.run(main())
+
+
+def test_set_var(cloud_server, make_cloud):
+    async def main():
+        async with CloudPool(lambda project_id: make_cloud(project_id=project_id)) as pool:
+            await pool.add(7)
+            await pool.set_var(7, "a", 1)
+            await pool.set_vars(7, {"b": 2})
+            for _ in range(500):
+                if len(cloud_server.sets()) == 2:
+                    break
+                await asyncio.sleep(0.01)
+
+    asyncio.run(main())
+    assert cloud_server.sets() == [("☁ a", 1), ("☁ b", 2)]
+
+
+def test_full_queues_drop_the_oldest_activity(cloud_server, make_cloud):
+    async def main():
+        async with CloudPool(queue_size=2, initial_window=0) as pool:
+            subscription = pool.subscribe()
+            await pool.add(make_cloud())
+            cloud_server.wait_for_handshakes()
+            for i in range(4):
+                cloud_server.broadcast("☁ n", str(i))
+            for _ in range(500):
+                if subscription.dropped == 2:
+                    break
+                await asyncio.sleep(0.01)
+            return await next_items(subscription, 2), subscription.dropped
+
+    items, dropped = asyncio.run(main())
+    assert items == [(1, "n", "2"), (1, "n", "3")] and dropped == 2
+
+
+def test_close_ends_subscriptions(cloud_server, make_cloud):
+    async def main():
+        pool = CloudPool()
+        async_cloud = await pool.add(make_cloud())
+        subscription = pool.subscribe()
+        reader = asyncio.ensure_future(next_items(subscription, 1))
+        await asyncio.sleep(0.05)
+        await pool.close()
+        with pytest.raises(StopAsyncIteration):
+            await reader
+        return async_cloud, len(pool)
+
+    async_cloud, size = asyncio.run(main())
+    assert async_cloud.closed and size == 0
+
+
+def test_close_keeps_unread_activity(cloud_server, make_cloud):
+    async def main():
+        pool = CloudPool(queue_size=2, initial_window=0)
+        await pool.add(make_cloud())
+        subscription = pool.subscribe()
+        cloud_server.wait_for_handshakes()
+        cloud_server.broadcast("☁ n", "1")
+        cloud_server.broadcast("☁ n", "2")
+        for _ in range(500):
+            if subscription._queue.full():
+                break
+            await asyncio.sleep(0.01)
+        await pool.close()
+        items = [(project_id, activity.value) async for project_id, activity in subscription]
+        return items, subscription.dropped
+
+    assert asyncio.run(main()) == ([(1, "1"), (1, "2")], 0)
+
+
+def test_given_up_connections_are_closed(cloud_server, make_cloud):
+    policy = RetryPolicy(max_attempts=1, base_delay=0.01, retry_on=(Exception,))
+
+    async def main():
+        pool = CloudPool(reconnect_policy=policy, initial_window=0)
+        async_cloud = await pool.add(make_cloud())
+        cloud_server.wait_for_handshakes()
+        cloud_server.close()
+        for _ in range(500):
+            if 1 in pool.errors:
+                break
+            await asyncio.sleep(0.01)
+        return async_cloud, pool
+
+    async_cloud, pool = asyncio.run(main())
+    assert 1 in pool.errors and len(pool) == 0
+    assert async_cloud.closed and not async_cloud.active_connection
+
+
+def test_lost_connections_are_reestablished(cloud_server, make_cloud):
+    policy = RetryPolicy(max_attempts=None, base_delay=0.01, max_elapsed=None, retry_on=(Exception,))
+
+    async def main():
+        async with CloudPool(reconnect_policy=policy, initial_window=0) as pool:
+            subscription = pool.subscribe()
+            await pool.add(make_cloud())
+            cloud_server.wait_for_handshakes()
+            cloud_server.drop_connections()
+            for _ in range(500):
+                if cloud_server.connections == 2 and pool.clouds[1].active_connection:
+                    break
+                await asyncio.sleep(0.01)
+            cloud_server.wait_for_handshakes(2)
+            cloud_server.broadcast("☁ a", "1")
+            return await next_items(subscription, 1)
+
+    assert asyncio.run(main()) == [(1, "a", "1")]
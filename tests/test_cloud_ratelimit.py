@@ -0,0 +1,87 @@
+import asyncio
+import time
+
+import pytest
+
+from scratchattach.cloud.async_cloud import AsyncCloud
+from scratchattach.utils.ratelimit import CloudRateLimiter
+
+
+def test_shortterm_spacing():
+    limiter = CloudRateLimiter(0.05, 0)
+    waits = [limiter.reserve() for _ in range(4)]
+    assert waits == pytest.approx([0, 0.05, 0.1, 0.15], abs=0.01)
+    assert limiter.available < 0
+
+
+def test_burst_then_longterm_rate():
+    limiter = CloudRateLimiter(0.01, 0.1, burst_duration=0.5)
+    # 0.5 seconds at 100 sets / s, of which 10 sets / s are refilled by the long-term bucket
+    assert limiter.burst_budget == pytest.approx(45)
+    waits = [limiter.reserve() for _ in range(60)]
+    assert waits[44] == pytest.approx(0.44, abs=0.01)
+    # After the burst, one set per 0.1 seconds
+    assert waits[59] == pytest.approx((60 - 45) * 0.1, abs=0.02)
+    assert limiter.burst_budget < 0
+
+
+def test_reserve_many():
+    limiter = CloudRateLimiter(0.05, 0)
+    # Sent together, so the caller waits until the tokens of all three sets are available
+    assert limiter.reserve(3) == pytest.approx(0.1, abs=0.01)
+    assert limiter.reserve() == pytest.approx(0.15, abs=0.01)
+
+
+def test_no_limits():
+    limiter = CloudRateLimiter(0, 0)
+    assert all(limiter.reserve() == 0 for _ in range(1000))
+
+
+def test_acquire_sleeps():
+    limiter = CloudRateLimiter(0.05, 0)
+    start = time.monotonic()
+    for _ in range(3):
+        limiter.acquire()
+    assert time.monotonic() - start == pytest.approx(0.1, abs=0.04)
+
+
+def test_async_acquire():
+    limiter = CloudRateLimiter(0.05, 0)
+
+    async def main():
+        start = time.monotonic()
+        await asyncio.gather(*(limiter.async_acquire() for _ in range(3)))
+        return time.monotonic() - start
+
+    assert asyncio.run(main()) == pytest.approx(0.1, abs=0.04)
+
+
+def test_clouds_share_a_limiter(cloud_server, make_cloud):
+    limiter = CloudRateLimiter(0.05, 0)
+    first, second = make_cloud(), make_cloud()
+    first.ratelimiter = second.ratelimiter = limiter
+    start = time.monotonic()
+    first.set_var("a", 1)
+    second.set_var("b", 2)
+    first.set_var("a", 3)
+    assert time.monotonic() - start == pytest.approx(0.1, abs=0.04)
+
+
+def test_cloud_creates_limiter_from_its_limits(make_cloud):
+    cloud = make_cloud(ws_shortterm_ratelimit=0.05, ws_longterm_ratelimit=0.2)
+    limiter = cloud._get_ratelimiter()
+    assert limiter is cloud._get_ratelimiter()
+    assert (limiter.shortterm_bucket.rate, limiter.longterm_bucket.rate) == (20, 5)
+
+
+def test_async_cloud_uses_the_limiter(cloud_server, make_cloud):
+    cloud = make_cloud(ws_shortterm_ratelimit=0.05)
+
+    async def main():
+        async with AsyncCloud(cloud) as async_cloud:
+            start = time.monotonic()
+            for i in range(3):
+                await async_cloud.set_var("a", i)
+            return time.monotonic() - start
+
+    assert asyncio.run(main()) == pytest.approx(0.1, abs=0.04)
@@ -0,0 +1,52 @@
+import pytest
+
+from scratchattach.utils import requests as _requests
+from scratchattach.utils.requests import RequestsBackend
+
+
+@pytest.fixture
+def pool(monkeypatch, http_server):
+    monkeypatch.setattr(_requests, "backend", RequestsBackend())
+    monkeypatch.setattr(_requests, "cache", None)
+    monkeypatch.setattr(_requests, "host_pool_maxsize", {})
+    _requests.reset_pool()
+    yield
+    _requests.reset_pool()
+
+
+def test_one_session_per_host(pool):
+    a = _requests.get_session("https://api.scratch.mit.edu/users/a")
+    assert _requests.get_session("https://API.scratch.mit.edu/projects/1") is a
+    assert _requests.get_session("https://scratch.mit.edu/") is not a
+
+
+def test_connections_are_kept_alive(pool, http_server):
+    ports = {_requests.Requests.get(f"{http_server.url}/users/{i}").json()["client_port"] for i in range(5)}
+    assert len(ports) == 1
+
+
+def test_response_cookies_are_not_kept(pool, http_server):
+    _requests.Requests.get(f"{http_server.url}/login", params={"set_cookie": 1})
+    assert _requests.Requests.get(f"{http_server.url}/users/a").json()["cookie"] is None
+    # Cookies passed explicitly are still sent
+    r = _requests.Requests.get(f"{http_server.url}/users/a", cookies={"scratchsessionsid": "x"})
+    assert r.json()["cookie"] == "scratchsessionsid=x"
+
+
+def test_configure_pool(pool, monkeypatch):
+    monkeypatch.setattr(_requests, "pool_maxsize", _requests.pool_maxsize)
+    monkeypatch.setattr(_requests, "pool_block", _requests.pool_block)
+    session = _requests.get_session("https://api.scratch.mit.edu/")
+    _requests.configure_pool(32, host="api.scratch.mit.edu", block=True)
+    new_session = _requests.get_session("https://api.scratch.mit.edu/")
+    assert new_session is not session
+    adapter = new_session.get_adapter("https://api.scratch.mit.edu/")
+    assert (adapter._pool_maxsize, adapter._pool_block) == (32, True)
+    other = _requests.get_session("https://scratch.mit.edu/").get_adapter("https://scratch.mit.edu/")
+    assert other._pool_maxsize == _requests.pool_maxsize
+
+
+def test_changed_proxies_reset_the_pool(pool, monkeypatch):
+    session = _requests.get_session("https://api.scratch.mit.edu/")
+    monkeypatch.setattr(_requests, "proxies", {"https": "http://127.0.0.1:1"})
+    assert _requests.get_session("https://api.scratch.mit.edu/") is not session
@@ -0,0 +1,83 @@
+import hashlib
+import os
+import stat
+
+import pytest
+
+from scratchattach.site import project
+from scratchattach.testing import FakeScratchAPI
+from scratchattach.utils import asset_store, exceptions
+from scratchattach.utils import requests as _requests
+from scratchattach.utils.download import download_to_file, md5_from_asset_id
+
+
+@pytest.fixture
+def api(monkeypatch):
+    monkeypatch.setattr(_requests, "cache", None)
+    monkeypatch.setattr(asset_store, "default_store", None)
+    with FakeScratchAPI(projects=5, assets=5) as api:
+        yield api
+
+
+def asset_url(md5ext):
+    return f"https://assets.scratch.mit.edu/internalapi/asset/{md5ext}/get/"
+
+
+def test_md5_from_asset_id():
+    assert md5_from_asset_id("83A9787D4CB6F3B7632B4DDFEBF74367.wav") == "83a9787d4cb6f3b7632b4ddfebf74367"
+    assert md5_from_asset_id("costume1.svg") is None
+
+
+@pytest.mark.parametrize("chunk_size", [None, 7])
+def test_download_to_file(api, tmp_path, chunk_size):
+    md5ext, content = api.asset_data(1)
+    path = str(tmp_path / md5ext)
+    checksum = download_to_file(asset_url(md5ext), path, md5=md5_from_asset_id(md5ext), chunk_size=chunk_size)
+    assert checksum == hashlib.md5(content).hexdigest()
+    with open(path, "rb") as f:
+        assert f.read() == content
+    assert os.listdir(tmp_path) == [md5ext]
+
+
+def test_downloaded_files_follow_the_umask(api, tmp_path):
+    md5ext, _ = api.asset_data(2)
+    path = str(tmp_path / md5ext)
+    download_to_file(asset_url(md5ext), path)
+    with open(tmp_path / "reference", "wb"):
+        pass
+    assert stat.S_IMODE(os.stat(path).st_mode) == stat.S_IMODE(os.stat(tmp_path / "reference").st_mode)
+
+
+def test_umask_changes_are_followed(api, tmp_path):
+    md5ext, _ = api.asset_data(2)
+    previous = os.umask(0o077)
+    try:
+        download_to_file(asset_url(md5ext), str(tmp_path / "private"))
+        os.umask(0o022)
+        download_to_file(asset_url(md5ext), str(tmp_path / "shared"))
+    finally:
+        os.umask(previous)
+    assert stat.S_IMODE(os.stat(tmp_path / "private").st_mode) == 0o600
+    assert stat.S_IMODE(os.stat(tmp_path / "shared").st_mode) == 0o644
+
+
+def test_checksum_mismatch_keeps_the_old_file(api, tmp_path):
+    md5ext, _ = api.asset_data(3)
+    path = tmp_path / "asset"
+    path.write_bytes(b"old")
+    with pytest.raises(exceptions.ChecksumError):
+        download_to_file(asset_url(md5ext), str(path), md5="0" * 32)
+    assert path.read_bytes() == b"old"
+    assert os.listdir(tmp_path) == ["asset"]
+
+
+def test_failed_download_writes_nothing(api, tmp_path):
+    with pytest.raises(exceptions.FetchError):
+        download_to_file(asset_url("0" * 32 + ".png"), str(tmp_path / "missing.png"))
+    assert os.listdir(tmp_path) == []
+
+
+def test_project_download(api, tmp_path):
+    project.get_project(1).download(dir=str(tmp_path))
+    with open(tmp_path / "1.sb3") as f:
+        assert "targets" in f.read()
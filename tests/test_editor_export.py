@@ -0,0 +1,55 @@
+import zipfile
+
+import pytest
+
+from scratchattach.editor import asset, project
+from scratchattach.utils import asset_store
+
+
+@pytest.fixture
+def api(fake_api, monkeypatch):
+    monkeypatch.setattr(asset_store, "default_store", None)
+    return fake_api
+
+
+def asset_files(api, indices):
+    return [asset.AssetFile(api.asset_data(i)[0]) for i in indices]
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_prefetch(api, max_workers):
+    files = asset_files(api, [1, 2, 3, 1])
+    progress = []
+    downloaded = asset.prefetch(files, max_workers=max_workers,
+                                on_progress=lambda done, total, asset_file: progress.append((done, total)))
+    # The duplicate file is downloaded once
+    assert [f.filename for f in downloaded] == [f.filename for f in files[:3]]
+    assert api.request_count == 3
+    assert progress == [(1, 3), (2, 3), (3, 3)]
+    assert [f._data for f in files[:3]] == [api.asset_data(i)[1] for i in (1, 2, 3)]
+    # Files that were loaded already (including the duplicate) are skipped
+    assert asset.prefetch(files) == []
+    assert api.request_count == 3
+
+
+def test_prefetch_errors(api):
+    files = asset_files(api, [1, 2]) + [asset.AssetFile("0" * 32 + ".png")]
+    with pytest.raises(ValueError):
+        asset.prefetch(files, max_workers=2)
+
+
+def test_export(api, tmp_path):
+    project_json = api.project_json(3)
+    editor_project = project.Project.from_json(project_json)
+    progress = []
+    path = tmp_path / "project.sb3"
+    editor_project.export(str(path), on_progress=lambda *args: progress.append(args))
+
+    expected = {api.asset_data(i)[0]: api.asset_data(i)[1] for i in range(api.assets)}
+    md5exts = {costume["md5ext"] for target in project_json["targets"] for costume in target["costumes"]} | \
+        {sound["md5ext"] for target in project_json["targets"] for sound in target["sounds"]}
+    with zipfile.ZipFile(path) as archive:
+        assert sorted(archive.namelist()) == sorted(md5exts | {"project.json"})
+        for md5ext in md5exts:
+            assert archive.read(md5ext) == expected[md5ext]
+    assert len(progress) == len(md5exts) == api.request_count
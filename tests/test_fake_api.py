@@ -0,0 +1,78 @@
+import asyncio
+import time
+
+import pytest
+
+import scratchattach as sa
+from scratchattach.testing import FakeScratchAPI
+from scratchattach.utils import async_requests, exceptions
+from scratchattach.utils import requests as _requests
+from scratchattach.utils.requests import Requests
+
+
+def test_user(fake_api):
+    user = sa.get_user("user3")
+    assert user.id == 10003
+    assert user.about_me == "Hi, I'm user3!"
+    assert fake_api.request_count == 1
+    with pytest.raises(exceptions.UserNotFound):
+        sa.get_user("user50")
+
+
+def test_deterministic_data():
+    assert FakeScratchAPI(seed=1).project_data(7) == FakeScratchAPI(seed=1).project_data(7)
+    assert FakeScratchAPI(seed=1).user_data(7) != FakeScratchAPI(seed=2).user_data(7)
+
+
+def test_pagination(fake_api):
+    response = Requests.get("https://api.scratch.mit.edu/users/user1/followers", params={"limit": 40, "offset": 80})
+    assert [user["username"] for user in response.json()] == [f"user{(1 + i + 1) % 50}" for i in range(80, 95)]
+
+
+def test_project_json_requires_token(fake_api):
+    with pytest.raises(exceptions.Unauthorized):
+        Requests.get("https://projects.scratch.mit.edu/2")
+    token = fake_api.project_data(2)["project_token"]
+    assert Requests.get("https://projects.scratch.mit.edu/2", params={"token": token}).json() == fake_api.project_json(2)
+
+
+def test_async_requests(fake_api):
+    async def main():
+        try:
+            return await async_requests.AsyncRequests.get("https://api.scratch.mit.edu/studios/4")
+        finally:
+            await async_requests.close()
+
+    assert asyncio.run(main()).json() == fake_api.studio_data(4)
+
+
+def test_async_requests_to_other_hosts_keep_the_proxy(fake_api, monkeypatch):
+    sent = []
+
+    class Backend(async_requests.AsyncHTTPBackend):
+        async def request(self, method, url, *, proxy=None, **kwargs):
+            sent.append((url, proxy))
+            return async_requests.AsyncResponse(status_code=200, headers={}, content=b"{}", url=url)
+
+    monkeypatch.setattr(async_requests.backend, "inner", Backend())
+    monkeypatch.setattr(_requests, "proxies", {"https": "http://proxy:8080"})
+
+    async def main():
+        await async_requests.AsyncRequests.get("https://example.com/a")
+        await async_requests.AsyncRequests.get("https://api.scratch.mit.edu/studios/4")
+
+    asyncio.run(main())
+    assert sent == [("https://example.com/a", "http://proxy:8080"), (f"{fake_api.url}/api.scratch.mit.edu/studios/4", None)]
+
+
+def test_uninstall():
+    backend, async_backend = _requests.backend, async_requests.backend
+    api = FakeScratchAPI()
+    api.start()
+    api.install()
+    assert _requests.backend is not backend and async_requests.backend is not async_backend
+    api.uninstall()
+    start = time.perf_counter()
+    api.stop()
+    assert _requests.backend is backend and async_requests.backend is async_backend
+    assert time.perf_counter() - start < 0.3
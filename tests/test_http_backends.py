@@ -0,0 +1,64 @@
+import pytest
+
+from scratchattach.utils import requests as _requests
+from scratchattach.utils.http_backends import HttpxBackend
+from scratchattach.utils.requests import RequestsBackend
+
+
+def make_backend(name):
+    if name == "httpx":
+        pytest.importorskip("httpx")
+        return HttpxBackend(http2=False)
+    return RequestsBackend()
+
+
+@pytest.fixture(params=["requests", "httpx"])
+def http_backend(request):
+    backend = make_backend(request.param)
+    yield backend
+    backend.close()
+
+
+def test_get(http_backend, http_server):
+    r = http_backend.request("GET", f"{http_server.url}/users/a", params={"limit": 5, "offset": None},
+                             cookies={"scratchsessionsid": "x"})
+    assert r.status_code == 200
+    assert r.json()["path"] == "/users/a"
+    assert r.json()["query"] == "limit=5"
+    assert r.json()["cookie"] == "scratchsessionsid=x"
+    assert r.headers["content-type"] == "application/json"
+
+
+def test_redirects_are_followed(http_backend, http_server):
+    r = http_backend.request("GET", f"{http_server.url}/redirect/target", params={"a": "1"})
+    assert r.status_code == 200
+    assert r.json()["path"] == "/target"
+    assert r.url == f"{http_server.url}/target?a=1"
+
+
+def test_streamed_body(http_backend, http_server):
+    r = http_backend.request("GET", f"{http_server.url}/stream", stream=True)
+    assert b"".join(r.iter_content(4)).startswith(b'{"path": "/stream"')
+    r.close()
+
+
+def test_backends_return_the_same_response(http_server):
+    responses = []
+    for name in ("requests", "httpx"):
+        backend = make_backend(name)
+        r = backend.request("GET", f"{http_server.url}/redirect/x")
+        responses.append((r.status_code, r.url, r.json()["path"]))
+        backend.close()
+    assert responses[0] == responses[1]
+
+
+def test_set_backend(monkeypatch):
+    pytest.importorskip("httpx")
+    monkeypatch.setattr(_requests, "backend", RequestsBackend())
+    backend = _requests.set_backend("httpx", http2=False)
+    try:
+        assert isinstance(_requests.backend, HttpxBackend)
+        with pytest.raises(ValueError):
+            _requests.set_backend("curl")
+    finally:
+        backend.close()
@@ -0,0 +1,71 @@
+import asyncio
+import time
+
+import pytest
+
+import scratchattach as sa
+from scratchattach.utils import async_requests, commons
+
+
+@pytest.fixture
+def identity_map():
+    identity_map = commons.enable_identity_map(max_entries=2, ttl=60)
+    yield identity_map
+    commons.disable_identity_map()
+
+
+def test_lookups_reuse_objects(fake_api, identity_map):
+    user = sa.get_user("user1")
+    assert sa.get_user("user1") is user
+    assert fake_api.request_count == 1
+    assert identity_map.stats() == {"hits": 1, "misses": 1, "entries": 1}
+
+
+def test_disabled_by_default(fake_api):
+    assert commons.identity_map is None
+    assert sa.get_user("user1") is not sa.get_user("user1")
+    assert fake_api.request_count == 2
+
+
+def test_classes_are_kept_apart(fake_api, identity_map):
+    project, studio = sa.get_project(1), sa.get_studio(1)
+    assert isinstance(project, sa.Project) and isinstance(studio, sa.Studio)
+    assert sa.get_project(1) is project and sa.get_studio(1) is studio
+
+
+def test_objects_expire(fake_api, identity_map):
+    identity_map.ttl = 0.05
+    user = sa.get_user("user1")
+    time.sleep(0.06)
+    assert sa.get_user("user1") is not user
+    assert fake_api.request_count == 2
+
+
+def test_invalidate(fake_api, identity_map):
+    user, other = sa.get_user("user1"), sa.get_user("user2")
+    identity_map.invalidate(sa.User, "user1")
+    assert sa.get_user("user1") is not user
+    assert sa.get_user("user2") is other
+    identity_map.invalidate()
+    assert len(identity_map) == 0
+
+
+def test_least_recently_used_objects_are_dropped(fake_api, identity_map):
+    first = sa.get_user("user1")
+    sa.get_user("user2")
+    sa.get_user("user1")
+    sa.get_user("user3")
+    assert sa.get_user("user1") is first
+    assert fake_api.request_count == 3
+
+
+def test_async_lookups(fake_api, identity_map):
+    async def main():
+        try:
+            return await sa.async_get_user("user1"), await sa.async_get_user("user1")
+        finally:
+            await async_requests.close()
+
+    first, second = asyncio.run(main())
+    assert first is second and sa.get_user("user1") is first
+    assert fake_api.request_count == 1
@@ -0,0 +1,94 @@
+import pytest
+
+import scratchattach as sa
+from scratchattach.utils import exceptions, metrics
+from scratchattach.utils import requests as _requests
+from scratchattach.utils.requests import Requests
+from scratchattach.utils.retry import RetryPolicy, TransientError
+from tests.conftest import ScriptedBackend
+
+
+@pytest.fixture
+def collector():
+    collector = metrics.enable_metrics(buckets=(0.1, 1))
+    yield collector
+    metrics.disable_metrics()
+
+
+@pytest.fixture
+def records(monkeypatch):
+    records = []
+    monkeypatch.setattr(metrics, "hooks", [records.append])
+    return records
+
+
+@pytest.mark.parametrize("url, template", [
+    ("https://api.scratch.mit.edu/users/griffpatch/followers/?limit=40",
+     "api.scratch.mit.edu/users/{username}/followers/"),
+    ("https://api.scratch.mit.edu/projects/104/comments/5/replies",
+     "api.scratch.mit.edu/projects/{id}/comments/{id}/replies"),
+    ("https://assets.scratch.mit.edu/internalapi/asset/83a9787d4cb6f3b7632b4ddfebf74367.wav/get/",
+     "assets.scratch.mit.edu/internalapi/asset/{md5}/get/"),
+])
+def test_endpoint_template(url, template):
+    assert metrics.endpoint_template(url) == template
+
+
+def test_records(fake_api, records):
+    sa.get_user("user1")
+    with pytest.raises(exceptions.UserNotFound):
+        sa.get_user("nobody")
+    assert [(r.method, r.endpoint, r.status_code, r.retries) for r in records] == [
+        ("GET", "api.scratch.mit.edu/users/{username}", 200, 0),
+        ("GET", "api.scratch.mit.edu/users/{username}", 404, 0),
+    ]
+    assert records[0].size > 0 and records[0].elapsed > 0
+
+
+def test_retries_and_errors_are_recorded(backend, records, monkeypatch):
+    monkeypatch.setattr(_requests, "retry_policy", RetryPolicy(max_attempts=2, base_delay=0))
+    backend.responses = [(503, {}, b""), (200, {}, b"{}")]
+    Requests.get("https://api.scratch.mit.edu/projects/1")
+    assert (records[-1].status_code, records[-1].retries) == (200, 1)
+
+    class FailingBackend(ScriptedBackend):
+        def request(self, method, url, *, proxies=None, **kwargs):
+            raise TransientError(ConnectionError("refused"))
+
+    monkeypatch.setattr(_requests, "backend", FailingBackend())
+    with pytest.raises(exceptions.FetchError):
+        Requests.get("https://api.scratch.mit.edu/projects/1")
+    assert records[-1].status_code is None and isinstance(records[-1].error, ConnectionError)
+
+
+def test_failing_hooks_are_ignored(backend, records):
+    def broken(_record):
+        raise ValueError()
+
+    metrics.add_hook(broken)
+    Requests.get("https://api.scratch.mit.edu/projects/1")
+    assert len(records) == 1
+    metrics.remove_hook(broken)
+
+
+def test_collector(fake_api, collector):
+    for project_id in (1, 2, 3):
+        sa.get_project(project_id)
+    with pytest.raises(exceptions.ProjectNotFound):
+        sa.get_project(99)
+    stats = collector.to_dict()["GET api.scratch.mit.edu/projects/{id}"]
+    assert stats["count"] == 4 and stats["statuses"] == {200: 3, 404: 1}
+    assert stats["latency_histogram"][float("inf")] == 4
+    assert stats["size_sum"] > 0
+
+    text = collector.to_prometheus()
+    labels = 'method="GET",endpoint="api.scratch.mit.edu/projects/{id}"'
+    assert f'scratchattach_http_requests_total{{{labels},status="200"}} 3' in text.splitlines()
+    assert 'le="+Inf"} 4' in text
+    collector.reset()
+    assert collector.to_dict() == {}
+
+
+def test_disable_metrics(collector):
+    metrics.disable_metrics()
+    assert metrics.collector is None and collector not in metrics.hooks
@@ -0,0 +1,117 @@
+from itertools import islice
+
+import pytest
+
+import scratchattach as sa
+from scratchattach.utils import commons, exceptions
+
+
+def pages(total):
+    """Fetch function over the items 0..total-1 that records the requested offsets"""
+    requested = []
+
+    def fetch(offset, limit):
+        requested.append(offset)
+        return list(range(offset, min(offset + limit, total))) or None
+
+    return fetch, requested
+
+
+def test_gen_is_lazy():
+    fetch, requested = pages(100)
+    items = commons.api_iterative_gen(fetch, None, 0, max_req_limit=10)
+    assert requested == []
+    assert list(islice(items, 15)) == list(range(15))
+    assert requested == [0, 10]
+
+
+def test_gen_limit_and_offset():
+    fetch, requested = pages(100)
+    assert list(commons.api_iterative_gen(fetch, 25, 5, max_req_limit=10)) == list(range(5, 30))
+    assert requested == [5, 15, 25]
+
+
+def test_gen_stops_at_short_page():
+    fetch, requested = pages(25)
+    assert list(commons.api_iterative_gen(fetch, max_req_limit=10)) == list(range(25))
+    assert requested == [0, 10, 20]
+
+
+def test_iter_followers(fake_api):
+    user = sa.get_user("user1")
+    followers = user.iter_followers()
+    assert fake_api.request_count == 1
+    first = list(islice(followers, 3))
+    assert fake_api.request_count == 2
+    assert [u.username for u in first] == [u.username for u in user.followers(limit=3)]
+    # The remaining followers: 95 followers in pages of 40
+    assert len(list(followers)) == 92
+    assert fake_api.request_count == 2 + 1 + 2
+
+
+def test_iter_stop_when(fake_api):
+    studio = sa.get_studio(1)
+    sixth = studio.projects(limit=6)[5].id
+    projects = list(studio.iter_projects(stop_when=lambda project: project.id == sixth))
+    assert len(projects) == 5
+    # Only the first of the studio's pages was requested
+    assert fake_api.request_count == 3
+
+
+def test_iter_arguments_are_checked():
+    with pytest.raises(exceptions.BadRequest):
+        commons.api_iterative_iter("https://api.scratch.mit.edu/users/a/followers/", offset=-1)
+
+
+def concurrent_pages(total, delay=0.05):
+    """Like pages, but also records the max. amount of concurrent calls"""
+    import threading
+    import time
+    lock = threading.Lock()
+    state = {"running": 0, "max": 0, "requested": []}
+
+    def fetch(offset, limit):
+        with lock:
+            state["running"] += 1
+            state["max"] = max(state["max"], state["running"])
+            state["requested"].append(offset)
+        time.sleep(delay)
+        with lock:
+            state["running"] -= 1
+        return list(range(offset, min(offset + limit, total))) or None
+
+    return fetch, state
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_prefetch_returns_pages_in_order(max_workers):
+    fetch, state = concurrent_pages(1000)
+    assert commons.api_iterative_data(fetch, 200, 10, max_req_limit=40, max_workers=max_workers) == \
+        list(range(10, 210))
+    assert state["max"] == min(max_workers, 5)
+    assert sorted(state["requested"]) == [10, 50, 90, 130, 170]
+
+
+def test_prefetch_stops_at_short_page():
+    fetch, state = concurrent_pages(100)
+    assert commons.api_iterative_data(fetch, 400, 0, max_req_limit=40, max_workers=3) == list(range(100))
+    # The first window of 3 pages contains the short page, so no further window is requested
+    assert sorted(state["requested"]) == [0, 40, 80]
+
+
+def test_prefetch_errors_propagate():
+    def fetch(offset, limit):
+        if offset == 40:
+            raise exceptions.BadRequest("invalid")
+        return list(range(offset, offset + limit))
+
+    with pytest.raises(exceptions.BadRequest):
+        commons.api_iterative_data(fetch, 200, 0, max_workers=4)
+
+
+def test_prefetch_default_workers(fake_api, monkeypatch):
+    monkeypatch.setattr(commons, "prefetch_workers", 3)
+    user = sa.get_user("user1")
+    sequential = commons.api_iterative("https://api.scratch.mit.edu/users/user1/followers/", limit=95, offset=0,
+                                       max_workers=1)
+    assert [u.username for u in user.followers(limit=95)] == [u["username"] for u in sequential]
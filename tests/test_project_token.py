@@ -0,0 +1,78 @@
+import json
+import time
+
+import pytest
+
+from scratchattach.site import project
+from scratchattach.utils import requests as _requests
+from scratchattach.utils.http_backends import HTTPBackend, make_response
+
+
+class ProjectServer(HTTPBackend):
+    # Serves the metadata of project 1 and its JSON, which is only returned for the latest project token
+    def __init__(self):
+        self.token_number = 0
+        self.expires_at = int(time.time()) + 3600
+        self.metadata_requests = 0
+        self.json_requests = 0
+
+    @property
+    def token(self):
+        return f"{self.expires_at}_{self.token_number}"
+
+    def rotate(self, expires_at=None):
+        self.token_number += 1
+        if expires_at is not None:
+            self.expires_at = expires_at
+
+    def request(self, method, url, **kwargs):
+        if url.startswith("https://api.scratch.mit.edu/projects/1"):
+            self.metadata_requests += 1
+            body = {"id": 1, "title": "Project 1", "author": {"username": "user1"}, "project_token": self.token}
+            return make_response(status_code=200, headers={}, content=json.dumps(body).encode(), url=url)
+        self.json_requests += 1
+        if url == f"https://projects.scratch.mit.edu/1?token={self.token}":
+            return make_response(status_code=200, headers={}, content=b'{"targets": []}', url=url)
+        return make_response(status_code=403, headers={}, content=b'{"code": "Forbidden"}', url=url)
+
+
+@pytest.fixture
+def server(monkeypatch):
+    server = ProjectServer()
+    monkeypatch.setattr(_requests, "backend", server)
+    monkeypatch.setattr(_requests, "cache", None)
+    return server
+
+
+def test_token_is_reused(server):
+    p = project.get_project(1)
+    assert p.get_json() == '{"targets": []}'
+    assert p.get_json() == '{"targets": []}'
+    assert (server.metadata_requests, server.json_requests) == (1, 2)
+
+
+def test_rejected_token_is_refreshed(server):
+    p = project.get_project(1)
+    server.rotate()
+    assert p.get_json() == '{"targets": []}'
+    assert p.project_token == server.token
+    assert (server.metadata_requests, server.json_requests) == (2, 2)
+
+
+def test_expired_token_is_refreshed_before_the_request(server):
+    server.expires_at = int(time.time()) + 10  # within project_token_margin
+    p = project.get_project(1)
+    server.rotate(expires_at=int(time.time()) + 3600)
+    assert p.get_json() == '{"targets": []}'
+    assert (server.metadata_requests, server.json_requests) == (2, 1)
+
+
+def test_rejected_token_is_refreshed_with_cache_enabled(server):
+    _requests.enable_cache()
+    try:
+        p = project.get_project(1)
+        server.rotate()
+        assert p.get_json() == '{"targets": []}'
+        assert p.project_token == server.token
+    finally:
+        _requests.disable_cache()
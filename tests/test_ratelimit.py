@@ -0,0 +1,106 @@
+import time
+
+import pytest
+
+from scratchattach.utils import exceptions
+from scratchattach.utils import requests as _requests
+from scratchattach.utils.ratelimit import RateLimiter, TokenBucket, parse_retry_after
+
+URL = "https://api.scratch.mit.edu/users/griffpatch"
+
+
+def test_token_bucket_reserves_in_order():
+    bucket = TokenBucket(rate=10, capacity=2)
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.02)
+    assert bucket.reserve() == pytest.approx(0.2, abs=0.02)
+    assert not bucket.try_acquire()
+
+
+def test_unlimited_bucket_never_waits():
+    bucket = TokenBucket()
+    assert all(bucket.reserve() == 0 for _ in range(1000))
+
+
+def test_block_pauses_bucket():
+    bucket = TokenBucket()
+    bucket.block(5)
+    assert bucket.reserve() == pytest.approx(5, abs=0.1)
+    assert bucket.available <= 0
+
+
+def test_set_rate_keeps_refilled_tokens():
+    bucket = TokenBucket(rate=10, capacity=5)
+    bucket.set_rate(1, 2)
+    assert (bucket.rate, bucket.capacity) == (1, 2)
+    assert bucket.available == pytest.approx(2)
+    bucket.reserve(3)
+    assert bucket.reserve() == pytest.approx(2, abs=0.02)
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("12") == 12
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+    date = time.strftime("%a, %d %b %Y %H:%M:%S GMT", time.gmtime(time.time() + 30))
+    assert parse_retry_after(date) == pytest.approx(30, abs=2)
+
+
+def test_429_feedback_blocks_for_retry_after():
+    limiter = RateLimiter()
+    assert limiter.feedback("GET", URL, 429, "3") == 3
+    assert limiter.reserve("GET", URL) == pytest.approx(3, abs=0.1)
+    # Writing requests are limited separately
+    assert limiter.reserve("POST", URL) == 0
+
+
+def test_429_feedback_without_retry_after_uses_default_penalty():
+    limiter = RateLimiter(default_penalty=1.5)
+    assert limiter.feedback("GET", URL, 429) == 1.5
+    assert limiter.reserve("GET", URL) == pytest.approx(1.5, abs=0.1)
+
+
+def test_long_retry_after_is_capped_at_max_wait():
+    limiter = RateLimiter(max_wait=5)
+    # The server's wait is reported, so the caller can raise the 429 error
+    assert limiter.feedback("GET", URL, 429, "3600") == 3600
+    # ... but later requests to the host aren't paused for an hour
+    assert limiter.reserve("GET", URL) <= 5.1
+
+
+def test_429_feedback_slows_down_and_recovers():
+    limiter = RateLimiter(decrease_factor=0.5, increase_step=1, min_rate=0.2)
+    limiter.set_rate("api.scratch.mit.edu", 10)
+    limiter.feedback("GET", URL, 429, "0")
+    bucket = limiter.bucket("GET", URL)
+    assert bucket.rate == 5
+    for _ in range(10):
+        limiter.feedback("GET", URL, 200)
+    # The rate never exceeds the configured rate
+    assert bucket.rate == 10
+
+
+def test_requests_retry_429_after_retry_after(backend):
+    backend.responses = [(429, {"Retry-After": "0.1"}, b""), (200, {}, b'{"ok": true}')]
+    start = time.monotonic()
+    assert _requests.Requests.get(URL).json() == {"ok": True}
+    assert time.monotonic() - start >= 0.09
+    assert len(backend.requests) == 2
+
+
+def test_requests_raise_429_when_retry_after_exceeds_max_wait(backend):
+    _requests.ratelimiter.max_wait = 5
+    backend.responses = [(429, {"Retry-After": "3600"}, b""), (200, {}, b"{}")]
+    with pytest.raises(exceptions.Response429):
+        _requests.Requests.get(URL)
+    assert len(backend.requests) == 1
+    assert _requests.ratelimiter.reserve("GET", URL) <= 5.1
+
+
+def test_requests_raise_429_after_max_retries(backend):
+    _requests.ratelimiter.max_retries = 2
+    backend.responses = [(429, {"Retry-After": "0"}, b"")]
+    with pytest.raises(exceptions.Response429):
+        _requests.Requests.get(URL)
+    assert len(backend.requests) == 3
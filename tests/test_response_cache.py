@@ -0,0 +1,99 @@
+import time
+
+import pytest
+
+from scratchattach.utils import requests as _requests
+from scratchattach.utils.cache import ResponseCache
+from scratchattach.utils.http_backends import make_response
+from scratchattach.utils.requests import Requests
+
+USER_URL = "https://api.scratch.mit.edu/users/griffpatch"
+RULES = [(r"/users/[^/]+$", 60), (r"/projects/\d+$", 0)]
+
+
+@pytest.fixture
+def cache(backend, monkeypatch):
+    cache = ResponseCache(RULES, max_entries=2)
+    monkeypatch.setattr(_requests, "cache", cache)
+    return cache
+
+
+def test_fresh_responses_are_cached(backend, cache):
+    backend.responses = [(200, {}, b'{"n": 1}'), (200, {}, b'{"n": 2}')]
+    assert Requests.get(USER_URL).json() == {"n": 1}
+    assert Requests.get(USER_URL).json() == {"n": 1}
+    assert len(backend.requests) == 1
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+    assert stats["rules"] == {RULES[0][0]: {"hits": 1, "misses": 1}}
+
+
+def test_expired_responses_are_fetched_again(backend, cache):
+    url = "https://api.scratch.mit.edu/projects/1"
+    backend.responses = [(200, {}, b'{"n": 1}'), (200, {}, b'{"n": 2}')]
+    assert Requests.get(url).json() == {"n": 1}
+    assert Requests.get(url).json() == {"n": 2}
+    assert cache.stats()["misses"] == 2
+
+
+def test_urls_without_rule_are_not_cached(backend, cache):
+    url = "https://api.scratch.mit.edu/users/griffpatch/followers"
+    Requests.get(url)
+    Requests.get(url)
+    assert len(backend.requests) == 2 and len(cache) == 0
+
+
+def test_revalidation(backend, cache):
+    url = "https://api.scratch.mit.edu/projects/1"
+    backend.responses = [(200, {"ETag": '"v1"'}, b'{"n": 1}'), (304, {}, b"")]
+    assert Requests.get(url).json() == {"n": 1}
+    assert Requests.get(url).json() == {"n": 1}
+    assert backend.requests[1][2]["headers"]["If-None-Match"] == '"v1"'
+    assert cache.stats()["revalidations"] == 1
+
+
+def test_lru_eviction(backend, cache):
+    for name in ("a", "b", "a", "c"):
+        Requests.get(f"https://api.scratch.mit.edu/users/{name}")
+    # b was the least recently used response
+    assert len(backend.requests) == 3 and cache.evictions == 1
+    Requests.get("https://api.scratch.mit.edu/users/a")
+    Requests.get("https://api.scratch.mit.edu/users/b")
+    assert len(backend.requests) == 4
+
+
+def test_logins_are_cached_separately(backend, cache):
+    Requests.get(USER_URL, headers={"X-Token": "a"})
+    Requests.get(USER_URL, cookies={"scratchsessionsid": "b"})
+    assert len(backend.requests) == 2
+    Requests.get(USER_URL, headers={"x-token": "a"})
+    Requests.get(USER_URL, cookies={"scratchsessionsid": "b"})
+    assert len(backend.requests) == 2
+
+
+def test_writing_requests_invalidate(backend, cache):
+    Requests.get(USER_URL)
+    Requests.put(USER_URL)
+    Requests.get(USER_URL)
+    assert [method for method, *_ in backend.requests] == ["GET", "PUT", "GET"]
+
+
+def test_errors_are_not_cached(backend, cache):
+    backend.responses = [(404, {}, b"{}"), (200, {}, b"{}")]
+    assert Requests.get(USER_URL).status_code == 404
+    assert Requests.get(USER_URL).status_code == 200
+
+
+def test_cached_responses_are_copies(backend, cache):
+    first = Requests.get(USER_URL)
+    first.status_code = 500
+    assert Requests.get(USER_URL).status_code == 200
+
+
+def test_entry_expiry():
+    cache = ResponseCache([(".", 0.05)])
+    entry = cache.store(cache.key(USER_URL), make_response(status_code=200, headers={}, content=b"", url=USER_URL),
+                         0.05)
+    assert entry.fresh
+    time.sleep(0.06)
+    assert not entry.fresh
@@ -0,0 +1,135 @@
+import time
+
+import pytest
+
+from scratchattach.utils import exceptions
+from scratchattach.utils import requests as _requests
+from scratchattach.utils.requests import Requests
+from scratchattach.utils.retry import RetryPolicy, TransientError
+from tests.conftest import ScriptedBackend
+
+URL = "https://api.scratch.mit.edu/users/griffpatch"
+
+
+@pytest.fixture
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(_requests, "retry_policy", RetryPolicy(max_attempts=3, base_delay=0, max_delay=0))
+
+
+class ConnectionErrorBackend(ScriptedBackend):
+    """Fails with a connection error the first `failures` times"""
+
+    def __init__(self, failures, *responses):
+        super().__init__(*responses)
+        self.failures = failures
+
+    def request(self, method, url, *, proxies=None, **kwargs):
+        if self.failures:
+            self.failures -= 1
+            self.requests.append((method, url, kwargs))
+            raise TransientError(ConnectionError("connection reset"))
+        return super().request(method, url, proxies=proxies, **kwargs)
+
+
+def flaky(failures, error=TransientError):
+    calls = []
+
+    def func():
+        calls.append(time.monotonic())
+        if len(calls) <= failures:
+            raise error()
+        return "ok"
+
+    return func, calls
+
+
+def test_call_retries_until_success():
+    func, calls = flaky(2)
+    retried = []
+    policy = RetryPolicy(max_attempts=3, base_delay=0.01, jitter=0)
+    assert policy.call(func, on_retry=lambda e, attempt: retried.append(attempt)) == "ok"
+    assert len(calls) == 3 and retried == [1, 2]
+
+
+def test_call_gives_up_after_max_attempts():
+    func, calls = flaky(5)
+    with pytest.raises(TransientError):
+        RetryPolicy(max_attempts=3, base_delay=0).call(func)
+    assert len(calls) == 3
+
+
+def test_call_does_not_retry_other_errors():
+    func, calls = flaky(1, ValueError)
+    with pytest.raises(ValueError):
+        RetryPolicy(base_delay=0).call(func)
+    func, calls = flaky(1, exceptions.Unauthenticated)
+    with pytest.raises(exceptions.Unauthenticated):
+        RetryPolicy(base_delay=0, retry_on=(Exception,), giveup_on=(exceptions.Unauthenticated,)).call(func)
+    assert len(calls) == 1
+
+
+def test_call_gives_up_after_max_elapsed():
+    func, calls = flaky(10)
+    with pytest.raises(TransientError):
+        RetryPolicy(max_attempts=None, base_delay=0.1, multiplier=1, jitter=0, max_elapsed=0.25).call(func)
+    assert len(calls) == 3
+
+
+def test_delay_backoff():
+    policy = RetryPolicy(base_delay=1, multiplier=2, max_delay=5, jitter=0)
+    assert [policy.delay(attempt) for attempt in range(1, 6)] == [1, 2, 4, 5, 5]
+    jittered = RetryPolicy(base_delay=1, jitter=0.5)
+    assert all(0.5 <= jittered.delay(1) <= 1 for _ in range(100))
+
+
+def test_get_retries_5xx(backend, fast_retries):
+    backend.responses = [(503, {}, b""), (502, {}, b""), (200, {}, b'{"ok": true}')]
+    assert Requests.get(URL).json() == {"ok": True}
+    assert len(backend.requests) == 3
+
+
+def test_get_returns_last_response_when_giving_up(backend, fast_retries):
+    backend.responses = [(503, {}, b"")]
+    assert Requests.get(URL).status_code == 503
+    assert len(backend.requests) == 3
+
+
+def test_post_is_not_retried(backend, fast_retries):
+    backend.responses = [(503, {}, b""), (200, {}, b"{}")]
+    assert Requests.post(URL).status_code == 503
+    assert len(backend.requests) == 1
+
+
+def test_connection_errors(monkeypatch, backend, fast_retries):
+    flaky_backend = ConnectionErrorBackend(2)
+    monkeypatch.setattr(_requests, "backend", flaky_backend)
+    assert Requests.get(URL).status_code == 200
+    assert len(flaky_backend.requests) == 3
+
+    flaky_backend.failures = 3
+    with pytest.raises(exceptions.FetchError):
+        Requests.get(URL)
+    flaky_backend.failures = 1
+    with pytest.raises(exceptions.FetchError):
+        Requests.post(URL)
+
+
+class BrokenWebSocket:
+    def send(self, data):
+        raise BrokenPipeError()
+
+    def close(self):
+        pass
+
+
+def test_cloud_send_reconnects(cloud_server, make_cloud):
+    cloud = make_cloud()
+    cloud.send_retry_policy = RetryPolicy(base_delay=0, retry_on=(Exception,))
+    cloud.connect()
+    cloud.websocket = BrokenWebSocket()
+    cloud.set_var("score", 1)
+    assert cloud_server.connections == 2
+    deadline = time.monotonic() + 5
+    while not cloud_server.sets() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert cloud_server.sets() == [("☁ score", 1)]
@@ -0,0 +1,100 @@
+import hashlib
+import json
+import os
+import stat
+import zipfile
+
+import pytest
+
+from scratchattach.other.project_json_capabilities import project_json_assets, write_sb3
+from scratchattach.site import project
+from scratchattach.testing import FakeScratchAPI
+from scratchattach.utils import asset_store, exceptions
+from scratchattach.utils import requests as _requests
+from scratchattach.utils.http_backends import HTTPBackend
+
+
+class FailingBackend(HTTPBackend):
+    # Fails the requests whose url contains one of the given strings
+    def __init__(self, inner, *fail_on):
+        self.inner = inner
+        self.fail_on = fail_on
+
+    def request(self, method, url, **kwargs):
+        if any(part in url for part in self.fail_on):
+            raise RuntimeError(f"Request to {url} failed")
+        return self.inner.request(method, url, **kwargs)
+
+
+@pytest.fixture
+def api(monkeypatch):
+    monkeypatch.setattr(_requests, "cache", None)
+    monkeypatch.setattr(asset_store, "default_store", None)
+    with FakeScratchAPI(projects=20, assets=30, project_assets=6) as api:
+        yield api
+
+
+def sb3_contents(path):
+    with zipfile.ZipFile(path) as z:
+        return json.loads(z.read("project.json")), set(z.namelist())
+
+
+def test_write_sb3(api, tmp_path):
+    project_json = api.project_json(1)
+    path = write_sb3(project_json, str(tmp_path / "1.sb3"))
+    written_json, names = sb3_contents(path)
+    assert written_json == project_json
+    assert names == {"project.json", *project_json_assets(project_json)}
+
+
+def test_sb3_files_follow_the_umask(api, tmp_path):
+    path = write_sb3(api.project_json(1), str(tmp_path / "1.sb3"))
+    with open(tmp_path / "reference", "wb"):
+        pass
+    assert stat.S_IMODE(os.stat(path).st_mode) == stat.S_IMODE(os.stat(tmp_path / "reference").st_mode)
+
+
+def test_write_sb3_reports_progress(api, tmp_path):
+    progress = []
+    project_json = api.project_json(2)
+    write_sb3(project_json, str(tmp_path / "2.sb3"), on_progress=lambda *args: progress.append(args))
+    total = len(project_json_assets(project_json))
+    assert sorted(done for done, _, _ in progress) == list(range(1, total + 1))
+    assert all(t == total for _, t, _ in progress)
+
+
+def test_write_sb3_raises_for_mismatching_assets(backend, monkeypatch, tmp_path):
+    monkeypatch.setattr(asset_store, "default_store", None)
+    backend.responses = [(200, {}, b"other content")]
+    md5ext = hashlib.md5(b"costume").hexdigest() + ".png"
+    project_json = {"targets": [{"costumes": [{"md5ext": md5ext}], "sounds": []}]}
+    with pytest.raises(exceptions.ChecksumError):
+        write_sb3(project_json, str(tmp_path / "1.sb3"))
+    # The asset isn't downloaded a second time
+    assert len(backend.requests) == 1
+    assert not os.path.exists(tmp_path / "1.sb3")
+
+
+def test_project_download_sb3(api, tmp_path):
+    path = project.get_project(3).download_sb3(dir=str(tmp_path))
+    assert path.endswith("3.sb3")
+    assert sb3_contents(path)[0] == api.project_json(3)
+
+
+def test_download_sb3s_shares_assets(api, tmp_path):
+    asset_store.enable_asset_store(str(tmp_path / "store"))
+    saved, failed = project.download_sb3s([1, 2, 3, 3], dir=str(tmp_path))
+    assert sorted(saved) == [1, 2, 3] and failed == {}
+    assets = {md5ext for i in (1, 2, 3) for md5ext in project_json_assets(api.project_json(i))}
+    asset_requests = api.request_count - 3 * 2  # metadata and project JSON of every project
+    assert asset_requests == len(assets)
+
+
+def test_download_sb3s_collects_failures(api, tmp_path, monkeypatch):
+    monkeypatch.setattr(_requests, "backend", FailingBackend(_requests.backend, "/projects/2"))
+    progress = []
+    saved, failed = project.download_sb3s([1, 2, 3, 999], dir=str(tmp_path), lookup_workers=2,
+                                          on_progress=lambda *args: progress.append(args))
+    assert sorted(saved) == [1, 3]
+    assert sorted(failed) == [2, 999]
+    assert max(progress)[:2] == (4, 4)
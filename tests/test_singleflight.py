@@ -0,0 +1,88 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import scratchattach as sa
+from scratchattach.utils import requests as _requests
+from scratchattach.utils.requests import Requests
+from scratchattach.utils.singleflight import SingleFlight
+
+
+def run_concurrently(func, amount=5):
+    with ThreadPoolExecutor(amount) as executor:
+        return list(executor.map(lambda _: func(), range(amount)))
+
+
+def test_concurrent_calls_share_one_execution():
+    flights = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def func():
+        calls.append(1)
+        release.wait(5)
+        return "result"
+
+    with ThreadPoolExecutor(3) as executor:
+        futures = [executor.submit(flights.do, "key", func) for _ in range(3)]
+        while flights._calls.get("key") is None or flights._calls["key"].waiters < 2:
+            time.sleep(0.001)
+        release.set()
+        results = [future.result() for future in futures]
+    assert calls == [1]
+    assert results == [("result", True)] * 3
+    assert flights.in_flight() == 0
+    # Later calls execute again
+    assert flights.do("key", lambda: "new") == ("new", False)
+
+
+def test_errors_are_shared():
+    flights = SingleFlight()
+    release = threading.Event()
+
+    def func():
+        release.wait(5)
+        raise ValueError("failed")
+
+    with ThreadPoolExecutor(2) as executor:
+        futures = [executor.submit(flights.do, "key", func) for _ in range(2)]
+        while flights._calls.get("key") is None or flights._calls["key"].waiters < 1:
+            time.sleep(0.001)
+        release.set()
+        for future in futures:
+            with pytest.raises(ValueError):
+                future.result()
+    assert flights.in_flight() == 0
+
+
+def test_identical_gets_are_coalesced(fake_api):
+    fake_api.latency = 0.3
+    responses = run_concurrently(lambda: Requests.get("https://api.scratch.mit.edu/users/user1"))
+    assert fake_api.request_count == 1
+    assert all(r.json()["username"] == "user1" for r in responses)
+    # Every caller gets its own response object
+    assert len({id(r) for r in responses}) == 5
+
+
+def test_coalescing_can_be_disabled(fake_api, monkeypatch):
+    monkeypatch.setattr(_requests, "coalesce_requests", False)
+    fake_api.latency = 0.1
+    run_concurrently(lambda: Requests.get("https://api.scratch.mit.edu/users/user1"))
+    assert fake_api.request_count == 5
+
+
+def test_different_requests_are_not_coalesced(fake_api):
+    fake_api.latency = 0.1
+    with ThreadPoolExecutor(2) as executor:
+        list(executor.map(lambda limit: Requests.get("https://api.scratch.mit.edu/users/user1/followers",
+                                                      params={"limit": limit}), (10, 20)))
+    assert fake_api.request_count == 2
+
+
+def test_concurrent_object_lookups_share_the_object(fake_api):
+    fake_api.latency = 0.3
+    users = run_concurrently(lambda: sa.get_user("user2"))
+    assert fake_api.request_count == 1
+    assert all(user is users[0] for user in users)
@@ -0,0 +1,82 @@
+import sqlite3
+
+import pytest
+
+from scratchattach.utils import requests as _requests
+from scratchattach.utils.cache import SQLiteResponseCache
+from scratchattach.utils.requests import RequestsBackend
+
+RULES = [(r"^http://127\.0\.0\.1", 60)]
+
+
+@pytest.fixture
+def sqlite_cache(tmp_path, monkeypatch, http_server):
+    monkeypatch.setattr(_requests, "backend", RequestsBackend())
+    cache = _requests.enable_cache(RULES, path=str(tmp_path / "cache.sqlite"))
+    yield cache
+    _requests.disable_cache()
+
+
+def test_responses_survive_restarts(sqlite_cache, http_server, tmp_path):
+    url = f"{http_server.url}/users/a"
+    assert _requests.Requests.get(url).json()["count"] == 1
+    _requests.disable_cache()
+
+    _requests.enable_cache(RULES, path=str(tmp_path / "cache.sqlite"))
+    r = _requests.Requests.get(url)
+    assert r.json()["count"] == 1
+    assert r.url == url
+    assert http_server.request_count == 1
+
+
+def test_invalidate_entries_with_params(sqlite_cache, http_server):
+    url = f"{http_server.url}/users/a/projects"
+    _requests.Requests.get(url, params={"limit": 5})
+    assert len(sqlite_cache) == 1
+    sqlite_cache.invalidate(url)
+    assert len(sqlite_cache) == 0
+
+
+def test_invalidate_redirected_entries(sqlite_cache, http_server):
+    url = f"{http_server.url}/redirect/users/a"
+    r = _requests.Requests.get(url)
+    assert r.url == f"{http_server.url}/users/a"
+    assert len(sqlite_cache) == 1
+    # The cached response keeps the url it was redirected to
+    assert _requests.Requests.get(url).url == f"{http_server.url}/users/a"
+    sqlite_cache.invalidate(url)
+    assert len(sqlite_cache) == 0
+
+
+def test_writing_requests_invalidate_the_url(sqlite_cache, http_server):
+    url = f"{http_server.url}/users/a"
+    _requests.Requests.get(url, params={"x": 1})
+    sqlite_cache.invalidate(url)
+    assert _requests.Requests.get(url, params={"x": 1}).json()["count"] == 2
+
+
+def test_max_bytes_evicts_least_recently_used(tmp_path, backend):
+    backend.responses = [(200, {}, b"x" * 100)]
+    cache = _requests.enable_cache([(r"^https://api\.scratch\.mit\.edu/", 60)], path=str(tmp_path / "c.sqlite"),
+                                   max_bytes=250)
+    try:
+        for i in range(3):
+            _requests.Requests.get(f"https://api.scratch.mit.edu/users/user{i}")
+        assert len(cache) == 2
+        assert cache.stats()["evictions"] == 1
+    finally:
+        _requests.disable_cache()
+
+
+def test_old_cache_files_are_started_over(tmp_path):
+    path = str(tmp_path / "old.sqlite")
+    db = sqlite3.connect(path)
+    db.execute("CREATE TABLE responses (key TEXT PRIMARY KEY, url TEXT, status INTEGER, headers TEXT, "
+               "content BLOB, encoding TEXT, expires_at REAL, etag TEXT, last_modified TEXT, last_used REAL, "
+               "size INTEGER)")
+    db.execute("INSERT INTO responses VALUES ('k', 'u', 200, '{}', x'00', NULL, 0, NULL, NULL, 0, 1)")
+    db.commit()
+    db.close()
+    cache = SQLiteResponseCache(path, RULES)
+    assert len(cache) == 0
+    cache.close()
@@ -0,0 +1,79 @@
+import time
+
+from scratchattach.utils import exceptions
+from scratchattach.utils.retry import RetryPolicy
+
+
+def wait_for_sets(cloud_server, amount, timeout=5):
+    deadline = time.monotonic() + timeout
+    while len(cloud_server.sets()) < amount and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return cloud_server.sets()
+
+
+def slow_cloud(make_cloud):
+    cloud = make_cloud(ws_shortterm_ratelimit=0.2)
+    cloud.connect()
+    # The writer has to wait for the rate limiter before it sends the first frame
+    cloud._get_ratelimiter().reserve()
+    return cloud
+
+
+def test_queue_var_returns_immediately(cloud_server, make_cloud):
+    cloud = slow_cloud(make_cloud)
+    start = time.monotonic()
+    future = cloud.queue_var("score", 5)
+    assert time.monotonic() - start < 0.1
+    assert not future.done() and cloud.pending_vars() == {"☁ score": 5}
+    assert future.result(5) is None
+    assert cloud.pending_vars() == {}
+    # CloudRequests uses the time of the last set to detect idle connections
+    assert time.time() - cloud.last_var_set < 5
+    assert wait_for_sets(cloud_server, 1) == [("☁ score", 5)]
+
+
+def test_only_the_latest_value_is_sent(cloud_server, make_cloud):
+    cloud = slow_cloud(make_cloud)
+    futures = [cloud.queue_var("a", i) for i in range(1, 4)]
+    futures.append(cloud.queue_vars({"b": 1, "a": 4}))
+    assert cloud.pending_vars() == {"☁ a": 4, "☁ b": 1}
+    assert cloud.flush(5)
+    assert all(future.done() and future.exception() is None for future in futures)
+    # The variables keep the position they were first queued at
+    assert wait_for_sets(cloud_server, 2) == [("☁ a", 4), ("☁ b", 1)]
+
+
+def test_batches(cloud_server, make_cloud):
+    cloud = make_cloud(ws_shortterm_ratelimit=0.1)
+    cloud.write_behind_batch_size = 2
+    start = time.monotonic()
+    cloud.queue_vars({f"v{i}": i for i in range(5)}).result(5)
+    # Three frames of 2, 2 and 1 variables, each frame waits for the tokens of its variables
+    assert time.monotonic() - start >= 0.3
+    assert wait_for_sets(cloud_server, 5) == [(f"☁ v{i}", i) for i in range(5)]
+
+
+def test_set_var_replaces_queued_value(cloud_server, make_cloud):
+    cloud = slow_cloud(make_cloud)
+    future = cloud.queue_var("a", 1)
+    cloud.set_var("a", 2)
+    assert future.done() and future.exception() is None
+    assert cloud.pending_vars() == {}
+    time.sleep(0.3)
+    assert cloud_server.sets() == [("☁ a", 2)]
+
+
+def test_failed_sends_fail_the_future(cloud_server, make_cloud):
+    class BrokenWebSocket:
+        def send(self, data):
+            raise BrokenPipeError()
+
+        def close(self):
+            pass
+
+    cloud = make_cloud()
+    cloud.send_retry_policy = RetryPolicy(max_attempts=1)
+    cloud.connect()
+    cloud.websocket = BrokenWebSocket()
+    future = cloud.queue_var("a", 1)
+    assert isinstance(future.exception(5), exceptions.CloudConnectionError)